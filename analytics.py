@@ -0,0 +1,236 @@
+# file: analytics.py
+# 사용자 전체를 보는 랭킹 / 통계: 누적 획득 상위(리더보드), 일별 완료 수, 인기 보상.
+#
+# 화면을 그릴 때마다 users 를 정렬하거나 todos / purchases 를 집계하지 않고, 미리 계산한 표를 읽는다.
+#   - leaderboard        상위 LEADERBOARD_SIZE 명 (user_stats 의 (total_earned, user_id) 인덱스에서 앞쪽 N 행만 읽어 만든다)
+#   - daily_completions  날짜별 완료 수 / 획득 포인트
+#   - reward_popularity  보상별 구매 수 / 사용 포인트
+# 일별/보상별 집계는 points_ledger 에서 마지막으로 반영한 원장 id(워터마크) 이후의 행만 더한다.
+# 원장은 추가 전용이므로 갱신 비용은 새로 쌓인 원장 행 수 + N 에 비례하고, 전체 사용자 수와는 무관하다.
+# 갱신된 결과는 프로세스 단위 캐시(ANALYTICS_TTL 초)로 모든 세션이 공유한다.
+import threading
+import time
+from typing import NamedTuple
+
+import archive
+import settings
+from db import transaction
+
+ANALYTICS_DDL = [
+    """CREATE TABLE IF NOT EXISTS leaderboard (
+           position INTEGER PRIMARY KEY,
+           user_id INTEGER NOT NULL,
+           name TEXT,
+           total_earned INTEGER NOT NULL,
+           completed_count INTEGER NOT NULL)""",
+    """CREATE TABLE IF NOT EXISTS daily_completions (
+           day TEXT PRIMARY KEY,
+           completions INTEGER NOT NULL DEFAULT 0,
+           points INTEGER NOT NULL DEFAULT 0)""",
+    """CREATE TABLE IF NOT EXISTS reward_popularity (
+           reward_id INTEGER PRIMARY KEY,
+           purchases INTEGER NOT NULL DEFAULT 0,
+           spent INTEGER NOT NULL DEFAULT 0)""",
+    # 집계마다 마지막으로 반영한 원장 id
+    """CREATE TABLE IF NOT EXISTS rollup_state (
+           name TEXT PRIMARY KEY,
+           ledger_id INTEGER NOT NULL)""",
+    # 리더보드 / 내 순위: ORDER BY total_earned DESC, user_id
+    """CREATE INDEX IF NOT EXISTS idx_user_stats_earned ON user_stats (total_earned DESC, user_id)""",
+]
+
+
+def create_tables(conn):
+    for stmt in ANALYTICS_DDL:
+        conn.execute(stmt)
+
+
+# ---------- 집계 갱신 ----------
+def _watermark(conn):
+    row = conn.execute("SELECT ledger_id FROM rollup_state WHERE name='ledger'").fetchone()
+    return row[0] if row else 0
+
+
+def _reward_of(conn):
+    # 구매 원장 행(ref_id = purchases.id)의 보상 id 식. 구매 행마다 기본키 조회로 찾는다.
+    # 구매는 보관 기한이 한참 지나야 옮겨지므로 증분 갱신에서는 대부분 본 테이블에서 찾고,
+    # 전체 재계산을 위해 보관 테이블(본 DB, 붙어 있으면 별도 보관 파일)도 차례로 본다.
+    sources = ["main.purchases", "main.purchases_archive"]
+    if archive.ARCHIVE_SCHEMA in {row[1] for row in conn.execute("PRAGMA database_list")}:
+        sources.append(f"{archive.ARCHIVE_SCHEMA}.purchases_archive")
+    return "COALESCE(" + ", ".join(f"(SELECT reward_id FROM {t} WHERE id = l.ref_id)" for t in sources) + ")"
+
+
+def _rollup_ledger(conn, after_id, upto_id):
+    # (after_id, upto_id] 범위의 원장 행을 일별/보상별 표에 더한다 (원장 기본키 범위 조회)
+    conn.execute(
+        """INSERT INTO daily_completions (day, completions, points)
+           SELECT substr(created_at, 1, 10), COUNT(*), SUM(delta) FROM points_ledger
+           WHERE id > ? AND id <= ? AND reason='todo' AND length(created_at) >= 10
+           GROUP BY 1
+           ON CONFLICT (day) DO UPDATE SET completions = completions + excluded.completions,
+                                           points = points + excluded.points""", (after_id, upto_id))
+    conn.execute(
+        f"""INSERT INTO reward_popularity (reward_id, purchases, spent)
+           SELECT reward_id, COUNT(*), -SUM(delta)
+           FROM (SELECT {_reward_of(conn)} AS reward_id, l.delta FROM points_ledger l
+                 WHERE l.id > ? AND l.id <= ? AND l.reason='purchase' AND l.ref_id IS NOT NULL)
+           WHERE reward_id IS NOT NULL
+           GROUP BY reward_id
+           ON CONFLICT (reward_id) DO UPDATE SET purchases = purchases + excluded.purchases,
+                                                 spent = spent + excluded.spent""", (after_id, upto_id))
+    conn.execute("INSERT OR REPLACE INTO rollup_state (name, ledger_id) VALUES ('ledger', ?)", (upto_id,))
+
+
+def _rebuild_leaderboard(conn, size):
+    conn.execute("DELETE FROM leaderboard")
+    conn.execute(
+        """INSERT INTO leaderboard (position, user_id, name, total_earned, completed_count)
+           SELECT ROW_NUMBER() OVER (ORDER BY s.total_earned DESC, s.user_id), s.user_id, u.name,
+                  s.total_earned, s.completed_count
+           FROM (SELECT user_id, total_earned, completed_count FROM user_stats
+                 ORDER BY total_earned DESC, user_id LIMIT ?) s
+           LEFT JOIN users u ON u.id = s.user_id""", (size,))
+
+
+def has_pending(conn):
+    # 워터마크 뒤에 새 원장 행이 있는지 쓰기 잠금 없이 확인한다 (기본키 조회 두 번)
+    upto_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM points_ledger").fetchone()[0]
+    return upto_id > _watermark(conn)
+
+
+def refresh(conn, size=None):
+    # 지난 갱신 이후 쌓인 원장만 반영한다. 새 원장이 없으면 조회 두 번으로 끝난다.
+    # 반영한 원장 행 수를 돌려준다.
+    size = settings.LEADERBOARD_SIZE if size is None else size
+    with transaction(conn):
+        after_id = _watermark(conn)
+        upto_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM points_ledger").fetchone()[0]
+        if upto_id <= after_id:
+            return 0
+        _rollup_ledger(conn, after_id, upto_id)
+        # 포인트 변화가 있었을 때만 상위 N 명을 다시 뽑는다
+        _rebuild_leaderboard(conn, size)
+    return upto_id - after_id
+
+
+def rebuild(conn, size=None):
+    # 원장 전체에서 집계를 처음부터 다시 만든다 (manage.py analytics --full / 벤치마크 비교용)
+    if not conn.in_transaction:
+        # 별도 파일로 보관된 구매도 보상별 집계에 넣는다 (ATTACH 는 트랜잭션 밖에서만 된다)
+        archive.attach(conn)
+    with transaction(conn):
+        return backfill(conn, size)
+
+
+def backfill(conn, size=None):
+    # rebuild 의 본문. 호출하는 쪽의 트랜잭션 안에서 실행한다 (마이그레이션 8 도 이것을 쓴다).
+    size = settings.LEADERBOARD_SIZE if size is None else size
+    conn.execute("DELETE FROM daily_completions")
+    conn.execute("DELETE FROM reward_popularity")
+    upto_id = conn.execute("SELECT COALESCE(MAX(id), 0) FROM points_ledger").fetchone()[0]
+    _rollup_ledger(conn, 0, upto_id)
+    _rebuild_leaderboard(conn, size)
+    return upto_id
+
+
+# ---------- 조회 ----------
+class Snapshot(NamedTuple):
+    # (position, user_id, name, total_earned, completed_count)
+    leaderboard: list
+    # (day, completions, points) 최근 ANALYTICS_DAYS 일, 날짜 오름차순
+    daily: list
+    # (reward_id, name, purchases, spent) 구매 수 내림차순 상위 10 개
+    popular_rewards: list
+    # 이 스냅샷을 만든 시각 (time.time())
+    refreshed_at: float
+
+
+def load(conn, days=None):
+    days = settings.ANALYTICS_DAYS if days is None else days
+    leaderboard = conn.execute(
+        "SELECT position, user_id, name, total_earned, completed_count FROM leaderboard ORDER BY position").fetchall()
+    daily = conn.execute(
+        "SELECT day, completions, points FROM daily_completions ORDER BY day DESC LIMIT ?", (days,)).fetchall()
+    popular = conn.execute(
+        """SELECT p.reward_id, r.name, p.purchases, p.spent FROM reward_popularity p
+           LEFT JOIN rewards r ON r.id = p.reward_id ORDER BY p.purchases DESC, p.reward_id LIMIT 10""").fetchall()
+    return Snapshot(leaderboard, daily[::-1], popular, time.time())
+
+
+def user_rank(conn, user_id):
+    # 누적 획득 기준 순위 (1부터). 통계 행이 없으면 None.
+    # 인덱스에서 앞선 사용자 수를 세므로 비용은 순위에 비례한다 (10만 명 꼴찌도 수 ms).
+    row = conn.execute("SELECT total_earned FROM user_stats WHERE user_id=?", (user_id,)).fetchone()
+    if row is None:
+        return None
+    # OR 로 묶으면 인덱스 범위를 못 쓰므로 두 범위를 따로 센다
+    ahead = conn.execute(
+        """SELECT (SELECT COUNT(*) FROM user_stats WHERE total_earned > ?)
+                + (SELECT COUNT(*) FROM user_stats WHERE total_earned = ? AND user_id < ?)""",
+        (row[0], row[0], user_id)).fetchone()[0]
+    return ahead + 1
+
+
+# ---------- 프로세스 단위 캐시 ----------
+class AnalyticsCache:
+    # 모든 세션이 같은 스냅샷을 공유한다. TTL 이 지나면 처음 요청한 한 세션만 갱신하고
+    # 그동안 다른 세션은 기존 스냅샷을 그대로 받는다 (첫 스냅샷은 모두 기다린다).
+    def __init__(self, ttl=None):
+        self.ttl = settings.ANALYTICS_TTL if ttl is None else ttl
+        self._lock = threading.Lock()
+        self._refresh_lock = threading.Lock()
+        self._snapshot = None
+        self._loaded_at = 0.0
+        self.hits = 0
+        self.refreshes = 0
+
+    def _fresh(self):
+        return self._snapshot is not None and time.monotonic() - self._loaded_at < self.ttl
+
+    def get(self, loader):
+        # loader() 는 집계를 갱신하고 Snapshot 을 돌려준다
+        with self._lock:
+            if self._fresh():
+                self.hits += 1
+                return self._snapshot
+            stale = self._snapshot
+        if stale is not None and not self._refresh_lock.acquire(blocking=False):
+            with self._lock:
+                self.hits += 1
+            return stale
+        if stale is None:
+            self._refresh_lock.acquire()
+        try:
+            with self._lock:
+                if self._fresh():
+                    return self._snapshot
+            snapshot = loader()
+            with self._lock:
+                self._snapshot = snapshot
+                self._loaded_at = time.monotonic()
+                self.refreshes += 1
+            return snapshot
+        finally:
+            self._refresh_lock.release()
+
+    def invalidate(self):
+        with self._lock:
+            self._snapshot = None
+
+    def stats(self):
+        with self._lock:
+            return {"hits": self.hits, "refreshes": self.refreshes, "cached": self._snapshot is not None}
+
+
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_cache(path):
+    with _caches_lock:
+        cache = _caches.get(path)
+        if cache is None:
+            cache = AnalyticsCache()
+            _caches[path] = cache
+        return cache
@@ -0,0 +1,408 @@
+# file: api.py
+# TodoStore 위의 가벼운 HTTP/JSON API (표준 라이브러리 asyncio 만 사용).
+# 모바일 클라이언트나 스크립트가 Streamlit 재실행 비용 없이 할일 추가/완료/구매를 할 수 있다.
+#
+#   python manage.py serve --port 8765
+#
+# 엔드포인트 (요청/응답 본문은 모두 JSON):
+#   GET  /health
+#   GET  /users?name=NAME                   닉네임으로 사용자 조회 (로그인)
+#   POST /users                 {"name"}    회원가입
+#   GET  /users/{id}                        사용자 + 통계
+#   GET  /users/{id}/todos?status=open|done&limit=N&cursor=JSON
+#   POST /users/{id}/todos      {"title", "points"}
+#   GET  /users/{id}/todos/search?q=TEXT&status=open|done&date_field=created_at|completed_at
+#        &from=YYYY-MM-DD&to=YYYY-MM-DD&min_points=N&max_points=N&order=rank|recent&limit=N&cursor=JSON
+#   POST /users/{id}/todos/complete  {"ids": [...]}
+#   POST /users/{id}/todos/delete    {"ids": [...]}
+#   GET  /rewards
+#   GET  /rewards/search?q=TEXT
+#   GET  /users/{id}/purchases?limit=N&cursor=JSON
+#   POST /users/{id}/purchases  {"reward_id"}
+#   GET  /cache                             보상 목록 캐시 적중/실패 카운터
+#   GET  /metrics[?format=json]             쿼리/요청 지연 히스토그램 (Prometheus 텍스트 또는 JSON)
+import asyncio
+import json
+import logging
+import re
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import date
+from http import HTTPStatus
+from urllib.parse import parse_qs, urlsplit
+
+import metrics
+import settings
+from services import PurchaseStatus
+
+MAX_BODY = 1024 * 1024
+log = logging.getLogger("todomaker.api")
+# 요청 계측 이름에서 숫자 경로 조각을 {id} 로 묶는다
+_ID = re.compile(r"/\d+")
+
+
+class HttpError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+        self.message = message
+
+
+def _user_json(row):
+    return {"id": row[0], "name": row[1], "points": row[2]}
+
+
+def _int_param(query, name, default, lo=1, hi=500):
+    raw = query.get(name, [None])[0]
+    if raw is None:
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        raise HttpError(400, f"{name} must be an integer") from None
+    return max(lo, min(hi, value))
+
+
+# SQLite INTEGER 범위. 넘으면 바인딩에서 OverflowError(500)가 나므로 미리 거른다.
+MAX_INT = (1 << 63) - 1
+
+
+def _is_a(value, t):
+    # bool 은 int 의 하위 클래스이므로 따로 거른다
+    if not isinstance(value, t) or isinstance(value, bool):
+        return False
+    return not isinstance(value, int) or -MAX_INT - 1 <= value <= MAX_INT
+
+
+def _is_int(value):
+    return _is_a(value, int)
+
+
+NUMBER = (int, float)
+
+
+def _date_param(query, name):
+    # ISO 날짜 (YYYY-MM-DD). 잘못된 값을 그대로 넘기면 빈 결과(200)가 되므로 400 으로 거절한다.
+    raw = query.get(name, [None])[0]
+    if raw is None:
+        return None
+    try:
+        return date.fromisoformat(raw).isoformat()
+    except ValueError:
+        raise HttpError(400, f"{name} must be an ISO date (YYYY-MM-DD)") from None
+
+
+def _cursor_param(query, *types):
+    # types: 엔드포인트의 정렬 키 모양 (예: 완료 목록은 (str, int) = (completed_at, id), 숫자는 NUMBER).
+    # 길이나 타입이 다르면 SQL 바인딩 오류(500)가 되기 전에 400 으로 거절한다.
+    raw = query.get("cursor", [None])[0]
+    if raw is None:
+        return None
+    try:
+        cursor = json.loads(raw)
+    except ValueError:
+        raise HttpError(400, "cursor must be JSON") from None
+    if not isinstance(cursor, list):
+        raise HttpError(400, "cursor must be a JSON list")
+    if len(cursor) != len(types) or not all(_is_a(v, t) for v, t in zip(cursor, types)):
+        shape = ", ".join("number" if t is NUMBER else t.__name__ for t in types)
+        raise HttpError(400, f"cursor must be a JSON list of [{shape}]")
+    return tuple(cursor)
+
+
+def _ids(body):
+    ids = body.get("ids")
+    if not isinstance(ids, list) or not all(_is_int(i) for i in ids):
+        raise HttpError(400, "ids must be a list of integers")
+    return ids
+
+
+class ApiServer:
+    def __init__(self, store, host=None, port=None, workers=None):
+        self.store = store
+        self.host = settings.API_HOST if host is None else host
+        self.port = settings.API_PORT if port is None else port
+        # SQLite 는 동기 API 이므로 핸들러는 스레드 풀에서 실행하고 이벤트 루프는 소켓 I/O 만 맡는다
+        self.executor = ThreadPoolExecutor(settings.API_WORKERS if workers is None else workers,
+                                           thread_name_prefix="todo-api")
+        self.server = None
+        self.routes = []
+        self._route("GET", r"/health", self.health)
+        self._route("GET", r"/users", self.find_user)
+        self._route("POST", r"/users", self.create_user)
+        self._route("GET", r"/users/(\d+)", self.get_user)
+        self._route("GET", r"/users/(\d+)/todos", self.list_todos)
+        self._route("POST", r"/users/(\d+)/todos", self.add_todo)
+        self._route("GET", r"/users/(\d+)/todos/search", self.search_todos)
+        self._route("POST", r"/users/(\d+)/todos/complete", self.complete_todos)
+        self._route("POST", r"/users/(\d+)/todos/delete", self.delete_todos)
+        self._route("GET", r"/rewards", self.list_rewards)
+        self._route("GET", r"/rewards/search", self.search_rewards)
+        self._route("GET", r"/users/(\d+)/purchases", self.list_purchases)
+        self._route("POST", r"/users/(\d+)/purchases", self.purchase)
+        self._route("GET", r"/analytics", self.get_analytics)
+        self._route("GET", r"/users/(\d+)/rank", self.get_rank)
+        self._route("GET", r"/cache", self.cache_stats)
+        self._route("GET", r"/metrics", self.export_metrics)
+
+    def _route(self, method, pattern, handler):
+        self.routes.append((method, re.compile(pattern + r"/?$"), handler))
+
+    # ---------- 핸들러 (작업 스레드에서 실행, (상태코드, JSON) 반환) ----------
+    def health(self, query, body):
+        return 200, {"ok": True}
+
+    def find_user(self, query, body):
+        name = query.get("name", [""])[0].strip()
+        if not name:
+            raise HttpError(400, "name is required")
+        row = self.store.get_user_by_name(name)
+        if row is None:
+            raise HttpError(404, "user not found")
+        return 200, _user_json(row)
+
+    def create_user(self, query, body):
+        name = str(body.get("name") or "").strip()
+        if not name:
+            raise HttpError(400, "name is required")
+        row = self.store.create_user(name)
+        if row is None:
+            raise HttpError(409, "name already exists")
+        return 201, _user_json(row)
+
+    def get_user(self, query, body, user_id):
+        row = self.store.get_user(user_id)
+        if row is None:
+            raise HttpError(404, "user not found")
+        stats = self.store.get_user_stats(user_id)
+        return 200, dict(_user_json(row), stats=stats._asdict() if stats else None)
+
+    def list_todos(self, query, body, user_id):
+        status = query.get("status", ["open"])[0]
+        limit = _int_param(query, "limit", settings.PAGE_SIZE)
+        if status == "open":
+            # 커서: (id,)
+            cursor = _cursor_param(query, int)
+            # 첫 페이지를 읽기 전에 때가 된 반복 미션 회차를 만든다
+            if cursor is None:
+                self.store.materialize_due(user_id)
+            page = self.store.list_in_progress(user_id, limit, cursor)
+            items = [{"id": r[0], "title": r[1], "points": r[2], "created_at": r[3]} for r in page.rows]
+        elif status == "done":
+            # 커서: (completed_at, id)
+            cursor = _cursor_param(query, str, int)
+            page = self.store.list_completed(user_id, limit, cursor)
+            items = [{"id": r[0], "title": r[1], "points": r[2], "completed_at": r[3]} for r in page.rows]
+        else:
+            raise HttpError(400, "status must be open or done")
+        return 200, {"items": items, "next_cursor": page.next_cursor}
+
+    def add_todo(self, query, body, user_id):
+        title = str(body.get("title") or "").strip()
+        if not title:
+            raise HttpError(400, "title is required")
+        points = body.get("points", 10)
+        if not _is_int(points) or points < 1:
+            raise HttpError(400, "points must be a positive integer")
+        if self.store.get_user(user_id) is None:
+            raise HttpError(404, "user not found")
+        return 201, {"id": self.store.add_todo(user_id, title, points)}
+
+    def search_todos(self, query, body, user_id):
+        text = query.get("q", [""])[0]
+        status = query.get("status", [None])[0]
+        if status not in (None, "open", "done"):
+            raise HttpError(400, "status must be open or done")
+        date_field = query.get("date_field", ["created_at"])[0]
+        if date_field not in ("created_at", "completed_at"):
+            raise HttpError(400, "date_field must be created_at or completed_at")
+        order = query.get("order", ["rank"])[0]
+        if order not in ("rank", "recent"):
+            raise HttpError(400, "order must be rank or recent")
+        # 커서: 관련도순은 (score, id), 최근순은 (id,)
+        cursor = _cursor_param(query, NUMBER, int) if order == "rank" else _cursor_param(query, int)
+        page = self.store.search_todos(
+            user_id, text, _int_param(query, "limit", settings.PAGE_SIZE), cursor,
+            status=status, date_field=date_field,
+            date_from=_date_param(query, "from"), date_to=_date_param(query, "to"),
+            min_points=_int_param(query, "min_points", None, 0, 1 << 31),
+            max_points=_int_param(query, "max_points", None, 0, 1 << 31), order=order)
+        items = [{"id": r[0], "title": r[1], "points": r[2], "completed": bool(r[3]),
+                  "created_at": r[4], "completed_at": r[5], "score": r[6]} for r in page.rows]
+        return 200, {"items": items, "next_cursor": page.next_cursor}
+
+    def complete_todos(self, query, body, user_id):
+        completed, earned = self.store.complete_todos(user_id, _ids(body))
+        return 200, {"completed": completed, "earned": earned}
+
+    def delete_todos(self, query, body, user_id):
+        return 200, {"deleted": self.store.delete_todos(user_id, _ids(body))}
+
+    def list_rewards(self, query, body):
+        rows = self.store.list_rewards()
+        return 200, [{"id": r[0], "name": r[1], "cost": r[2], "description": r[3], "stock": r[4]} for r in rows]
+
+    def search_rewards(self, query, body):
+        rows = self.store.search_rewards(query.get("q", [""])[0], _int_param(query, "limit", 50))
+        return 200, [{"id": r[0], "name": r[1], "cost": r[2], "description": r[3], "stock": r[4], "score": r[5]}
+                     for r in rows]
+
+    def list_purchases(self, query, body, user_id):
+        # 커서: (purchased_at, id)
+        page = self.store.list_purchases(user_id, _int_param(query, "limit", settings.PAGE_SIZE),
+                                         _cursor_param(query, str, int))
+        items = [{"id": r[0], "reward": r[1], "purchased_at": r[2]} for r in page.rows]
+        return 200, {"items": items, "next_cursor": page.next_cursor}
+
+    def purchase(self, query, body, user_id):
+        reward_id = body.get("reward_id")
+        if not _is_int(reward_id):
+            raise HttpError(400, "reward_id must be an integer")
+        result = self.store.purchase_reward(user_id, reward_id)
+        payload = {"status": result.status.value, "purchase_id": result.purchase_id,
+                   "points": result.points, "stock": result.stock}
+        if result.ok:
+            return 201, payload
+        return (404 if result.status is PurchaseStatus.NOT_FOUND else 409), payload
+
+    def get_analytics(self, query, body):
+        snap = self.store.analytics_snapshot()
+        return 200, {
+            "leaderboard": [{"rank": r[0], "user_id": r[1], "name": r[2], "total_earned": r[3], "completed": r[4]}
+                            for r in snap.leaderboard],
+            "daily": [{"day": r[0], "completions": r[1], "points": r[2]} for r in snap.daily],
+            "popular_rewards": [{"id": r[0], "name": r[1], "purchases": r[2], "spent": r[3]}
+                                for r in snap.popular_rewards],
+            "refreshed_at": snap.refreshed_at,
+        }
+
+    def get_rank(self, query, body, user_id):
+        rank = self.store.user_rank(user_id)
+        if rank is None:
+            raise HttpError(404, "user not found")
+        return 200, {"rank": rank}
+
+    def cache_stats(self, query, body):
+        return 200, {"rewards": self.store.catalog_stats(), "analytics": self.store.analytics.stats()}
+
+    def export_metrics(self, query, body):
+        if query.get("format", [""])[0] == "json":
+            return 200, json.loads(metrics.registry.to_json())
+        # 문자열을 돌려주면 text/plain 으로 나간다
+        return 200, metrics.registry.to_prometheus()
+
+    # ---------- HTTP ----------
+    def dispatch(self, method, target, body):
+        url = urlsplit(target)
+        query = parse_qs(url.query)
+        allowed = False
+        for route_method, pattern, handler in self.routes:
+            match = pattern.match(url.path)
+            if not match:
+                continue
+            if route_method != method:
+                allowed = True
+                continue
+            if body:
+                try:
+                    body = json.loads(body)
+                except ValueError:
+                    raise HttpError(400, "body must be JSON") from None
+            if not isinstance(body, dict):
+                body = {}
+            ids = [int(g) for g in match.groups()]
+            if any(i > MAX_INT for i in ids):
+                # DB 에 있을 수 없는 id
+                raise HttpError(404, "not found")
+            return handler(query, body, *ids)
+        raise HttpError(405 if allowed else 404, "method not allowed" if allowed else "not found")
+
+    async def handle(self, method, target, body):
+        loop = asyncio.get_running_loop()
+        path = urlsplit(target).path
+        start = time.perf_counter()
+        try:
+            status, payload = await loop.run_in_executor(self.executor, self.dispatch, method, target, body)
+        except HttpError as e:
+            status, payload = e.status, {"error": e.message}
+        except Exception:
+            # 내부 오류 내용(SQL 등)은 응답에 싣지 않고 로그에만 남긴다
+            log.exception("%s %s failed", method, path)
+            status, payload = 500, {"error": "internal server error"}
+        # 예외를 응답으로 바꾼 뒤에 기록하므로 5xx 응답을 오류로 센다
+        metrics.registry.observe("request", f"{method} {_ID.sub('/{id}', path)}",
+                                 time.perf_counter() - start, error=status >= 500)
+        return status, payload
+
+    async def _serve_client(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                try:
+                    method, target, version = request_line.decode("latin-1").split()
+                except ValueError:
+                    await self._write(writer, 400, {"error": "bad request line"}, False)
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b"\r\n", b"\n", b""):
+                        break
+                    key, _, value = line.decode("latin-1").partition(":")
+                    headers[key.strip().lower()] = value.strip()
+                if "chunked" in headers.get("transfer-encoding", "").lower():
+                    await self._write(writer, 411, {"error": "content-length required"}, False)
+                    break
+                try:
+                    length = int(headers.get("content-length") or 0)
+                except ValueError:
+                    length = -1
+                if length < 0:
+                    await self._write(writer, 400, {"error": "invalid content-length"}, False)
+                    break
+                if length > MAX_BODY:
+                    await self._write(writer, 413, {"error": "body too large"}, False)
+                    break
+                body = await reader.readexactly(length) if length else b""
+                connection = headers.get("connection", "").lower()
+                keep_alive = connection != "close" and (version == "HTTP/1.1" or connection == "keep-alive")
+                status, payload = await self.handle(method.upper(), target, body)
+                await self._write(writer, status, payload, keep_alive)
+                if not keep_alive:
+                    break
+        except (asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def _write(self, writer, status, payload, keep_alive):
+        if isinstance(payload, str):
+            data, ctype = payload.encode(), "text/plain; version=0.0.4"
+        else:
+            data, ctype = json.dumps(payload, ensure_ascii=False).encode(), "application/json"
+        head = (f"HTTP/1.1 {status} {HTTPStatus(status).phrase}\r\n"
+                f"Content-Type: {ctype}; charset=utf-8\r\n"
+                f"Content-Length: {len(data)}\r\n"
+                f"Connection: {'keep-alive' if keep_alive else 'close'}\r\n\r\n")
+        writer.write(head.encode("latin-1") + data)
+        await writer.drain()
+
+    async def start(self):
+        self.server = await asyncio.start_server(self._serve_client, self.host, self.port)
+        # port=0 이면 OS 가 고른 포트
+        self.port = self.server.sockets[0].getsockname()[1]
+        return self
+
+    async def serve_forever(self):
+        if self.server is None:
+            await self.start()
+        async with self.server:
+            await self.server.serve_forever()
+
+    async def close(self):
+        if self.server is not None:
+            self.server.close()
+            await self.server.wait_closed()
+        self.executor.shutdown(wait=True)
@@ -0,0 +1,203 @@
+# file: archive.py
+# 오래된 완료 할일 / 구매 이력 보관과 사용자 전체 기록 내보내기.
+#
+# 보관: 완료한 지 ARCHIVE_AFTER_DAYS 일이 지난 할일과 그만큼 지난 구매를 *_archive 테이블로 옮긴다.
+#   ARCHIVE_DB_PATH 를 지정하면 보관 테이블을 별도 파일에 두고 ATTACH 해서 쓴다 (본 DB 파일이 커지지 않는다).
+#   ARCHIVE_BATCH 행씩 짧은 트랜잭션으로 나눠 옮기므로 앱이 실행 중이어도 쓰기 잠금을 오래 잡지 않는다.
+#   포인트 원장(points_ledger)은 옮기지 않으므로 포인트/통계는 바뀌지 않는다.
+#
+# 내보내기: 보관분과 현재 테이블을 이어서 읽어 CSV / JSON Lines 문자열 조각을 하나씩 내보내는 제너레이터.
+#   커서를 한 행씩 읽으므로 기록이 많아도 메모리 사용량이 일정하다.
+import csv
+import io
+import json
+from datetime import datetime, timedelta
+
+import settings
+from db import transaction
+from services import _chunks
+
+ARCHIVE_SCHEMA = "archive"
+
+# {schema} 에 main 또는 archive 가 들어간다
+ARCHIVE_TABLES = [
+    """CREATE TABLE IF NOT EXISTS {schema}.todos_archive (
+            id INTEGER PRIMARY KEY,
+            user_id INTEGER,
+            title TEXT,
+            points_reward INTEGER,
+            created_at TEXT,
+            completed_at TEXT,
+            archived_at TEXT)""",
+    "CREATE INDEX IF NOT EXISTS {schema}.idx_todos_archive_user ON todos_archive (user_id, id)",
+    # 보상이 나중에 수정/삭제돼도 이력이 남도록 구매 당시 이름과 가격을 함께 저장한다
+    """CREATE TABLE IF NOT EXISTS {schema}.purchases_archive (
+            id INTEGER PRIMARY KEY,
+            user_id INTEGER,
+            reward_id INTEGER,
+            reward_name TEXT,
+            cost INTEGER,
+            purchased_at TEXT,
+            archived_at TEXT)""",
+    "CREATE INDEX IF NOT EXISTS {schema}.idx_purchases_archive_user ON purchases_archive (user_id, id)",
+]
+
+
+def create_tables(conn, schema="main"):
+    for stmt in ARCHIVE_TABLES:
+        conn.execute(stmt.format(schema=schema))
+
+
+def attach(conn, path=None):
+    # 보관 테이블이 있는 스키마 이름을 돌려준다. 별도 파일이면 이 연결에 한 번만 ATTACH 한다.
+    # (풀의 연결은 재사용되므로 ATTACH 도 연결과 함께 남는다)
+    path = settings.ARCHIVE_DB_PATH if path is None else path
+    if not path:
+        return "main"
+    attached = {row[1] for row in conn.execute("PRAGMA database_list")}
+    if ARCHIVE_SCHEMA not in attached:
+        conn.execute("ATTACH DATABASE ? AS " + ARCHIVE_SCHEMA, (path,))
+        create_tables(conn, ARCHIVE_SCHEMA)
+    return ARCHIVE_SCHEMA
+
+
+# ---------- 보관 ----------
+_MOVES = {
+    # 종류: (후보 조회, 보관 테이블로 복사, 보관 테이블 이름, 본 테이블 이름)
+    "todos": (
+        "SELECT id FROM main.todos WHERE id > ? AND completed=1 AND completed_at < ? ORDER BY id LIMIT ?",
+        """INSERT OR IGNORE INTO {schema}.todos_archive
+               (id,user_id,title,points_reward,created_at,completed_at,archived_at)
+           SELECT id,user_id,title,points_reward,created_at,completed_at,?
+           FROM main.todos WHERE id IN ({marks})""",
+        "todos_archive", "todos",
+    ),
+    "purchases": (
+        "SELECT id FROM main.purchases WHERE id > ? AND purchased_at < ? ORDER BY id LIMIT ?",
+        """INSERT OR IGNORE INTO {schema}.purchases_archive
+               (id,user_id,reward_id,reward_name,cost,purchased_at,archived_at)
+           SELECT p.id,p.user_id,p.reward_id,r.name,r.cost,p.purchased_at,?
+           FROM main.purchases p LEFT JOIN main.rewards r ON r.id = p.reward_id
+           WHERE p.id IN ({marks})""",
+        "purchases_archive", "purchases",
+    ),
+}
+
+
+def _move_batch(conn, schema, kind, ids, archived_at):
+    # 보관 테이블로 복사한 뒤, 보관 테이블에 있는 것이 확인된 id 만 본 테이블에서 지운다.
+    # 별도 파일(WAL)이면 두 파일에 걸친 커밋은 원자적이지 않으므로 복사와 삭제를 각각 한 파일만 쓰는
+    # 트랜잭션으로 나눈다. 복사 뒤에 끊기면 다음 실행에서 INSERT OR IGNORE 로 건너뛰고 삭제만 이어진다.
+    # 같은 파일이면 한 트랜잭션으로 충분하다.
+    # id 목록은 services._chunks 크기로 나누고 문장마다 한 번만 바인딩한다 (SQLite 변수 999개 제한).
+    _, copy_sql, archive_table, table = _MOVES[kind]
+    moved = 0
+    for chunk in _chunks(ids):
+        marks = ",".join("?" * len(chunk))
+        copy = copy_sql.format(schema=schema, marks=marks)
+        delete = (f"DELETE FROM main.{table} "
+                  f"WHERE id IN (SELECT id FROM {schema}.{archive_table} WHERE id IN ({marks}))")
+        if schema == "main":
+            with transaction(conn):
+                conn.execute(copy, [archived_at, *chunk])
+                moved += conn.execute(delete, chunk).rowcount
+            continue
+        with transaction(conn):
+            conn.execute(copy, [archived_at, *chunk])
+        with transaction(conn):
+            moved += conn.execute(delete, chunk).rowcount
+    return moved
+
+
+def archive_old(conn, older_than_days=None, batch=None, archive_path=None, now=None):
+    # 기준보다 오래된 완료 할일/구매를 옮기고 옮긴 행 수를 {"todos": n, "purchases": m} 로 돌려준다.
+    # 후보는 id 커서로 기본키 범위를 이어 읽으므로, 배치마다 테이블을 처음부터 다시 훑지 않는다.
+    days = settings.ARCHIVE_AFTER_DAYS if older_than_days is None else older_than_days
+    batch = settings.ARCHIVE_BATCH if batch is None else batch
+    now = now or datetime.now()
+    cutoff = (now - timedelta(days=days)).isoformat()
+    archived_at = now.isoformat()
+    schema = attach(conn, archive_path)
+
+    moved = {"todos": 0, "purchases": 0}
+    for kind in moved:
+        select_sql = _MOVES[kind][0]
+        last_id = 0
+        while True:
+            ids = [r[0] for r in conn.execute(select_sql, (last_id, cutoff, batch))]
+            if not ids:
+                break
+            moved[kind] += _move_batch(conn, schema, kind, ids, archived_at)
+            last_id = ids[-1]
+            if len(ids) < batch:
+                break
+    return moved
+
+
+def archive_counts(conn, archive_path=None):
+    schema = attach(conn, archive_path)
+    return {
+        "todos": conn.execute(f"SELECT COUNT(*) FROM {schema}.todos_archive").fetchone()[0],
+        "purchases": conn.execute(f"SELECT COUNT(*) FROM {schema}.purchases_archive").fetchone()[0],
+    }
+
+
+# ---------- 내보내기 ----------
+EXPORT_KINDS = ("todos", "purchases")
+EXPORT_FORMATS = ("csv", "jsonl")
+
+_EXPORT_COLUMNS = {
+    "todos": ["id", "title", "points", "completed", "created_at", "completed_at", "archived"],
+    "purchases": ["id", "reward_id", "reward", "cost", "purchased_at", "archived"],
+}
+
+
+def _export_queries(kind, schema):
+    # 보관분(더 오래된 기록) 먼저, 그다음 현재 테이블. 각각 id 순이라 대체로 시간 순이 된다.
+    if kind == "todos":
+        return [
+            f"""SELECT id,title,points_reward,1,created_at,completed_at,1
+                FROM {schema}.todos_archive WHERE user_id=? ORDER BY id""",
+            """SELECT id,title,points_reward,completed,created_at,completed_at,0
+               FROM todos WHERE user_id=? ORDER BY id""",
+        ]
+    return [
+        f"""SELECT id,reward_id,reward_name,cost,purchased_at,1
+            FROM {schema}.purchases_archive WHERE user_id=? ORDER BY id""",
+        """SELECT p.id,p.reward_id,r.name,r.cost,p.purchased_at,0
+           FROM purchases p LEFT JOIN rewards r ON r.id = p.reward_id WHERE p.user_id=? ORDER BY p.id""",
+    ]
+
+
+def export_rows(conn, user_id, kind, archive_path=None):
+    # 사용자의 기록을 한 행씩 내보낸다 (보관분 + 현재)
+    if kind not in EXPORT_KINDS:
+        raise ValueError(f"지원하지 않는 종류입니다: {kind}")
+    schema = attach(conn, archive_path)
+    for sql in _export_queries(kind, schema):
+        yield from conn.execute(sql, (user_id,))
+
+
+def export_history(conn, user_id, kind="todos", fmt="csv", archive_path=None, flush_rows=500):
+    # CSV 또는 JSON Lines 문자열 조각을 내보내는 제너레이터. 파일/HTTP 응답에 그대로 이어 쓰면 된다.
+    if fmt not in EXPORT_FORMATS:
+        raise ValueError(f"지원하지 않는 형식입니다: {fmt}")
+    columns = _EXPORT_COLUMNS.get(kind)
+    rows = export_rows(conn, user_id, kind, archive_path)
+    if fmt == "jsonl":
+        for row in rows:
+            yield json.dumps(dict(zip(columns, row)), ensure_ascii=False) + "\n"
+        return
+    buf = io.StringIO()
+    writer = csv.writer(buf)
+    writer.writerow(columns)
+    pending = 0
+    for row in rows:
+        writer.writerow(row)
+        pending += 1
+        if pending >= flush_rows:
+            yield buf.getvalue()
+            buf.seek(0)
+            buf.truncate()
+            pending = 0
+    yield buf.getvalue()
@@ -0,0 +1,86 @@
+# file: bench/bench_analytics.py
+# 랭킹 / 통계 비용 (기본 사용자 10만 명):
+#   - 재실행마다 직접 집계하는 경우 (users 정렬 + todos / purchases GROUP BY)
+#   - 집계 표 전체 재계산 (analytics.rebuild) vs 새 원장만 반영 (analytics.refresh)
+#   - 화면이 실제로 하는 일: 캐시된 스냅샷 읽기, 캐시가 만료됐을 때 표 읽기, 내 순위
+#
+#   python bench/bench_analytics.py --users 100000 --todos-per-user 5
+import argparse
+import random
+import time
+
+from common import percentile, temp_db_path, timed
+
+import analytics
+import datagen
+from store import TodoStore
+
+NAIVE_SQL = [
+    "SELECT id, name, points FROM users ORDER BY points DESC, id LIMIT 100",
+    """SELECT substr(completed_at, 1, 10) AS day, COUNT(*), SUM(points_reward) FROM todos
+       WHERE completed=1 GROUP BY day ORDER BY day DESC LIMIT 30""",
+    """SELECT p.reward_id, r.name, COUNT(*) FROM purchases p LEFT JOIN rewards r ON r.id = p.reward_id
+       GROUP BY p.reward_id ORDER BY COUNT(*) DESC LIMIT 10""",
+]
+
+
+def measure(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return percentile(samples, 50) * 1000, percentile(samples, 99) * 1000
+
+
+def complete_random(store, users, count, rng):
+    # 무작위 사용자 count 명이 할일을 하나씩 추가하고 완료한다 (원장 행 count 개)
+    for _ in range(count):
+        uid = rng.randint(1, users)
+        store.complete_todos(uid, [store.add_todo(uid, "bench", rng.randint(1, 50))])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=100_000)
+    parser.add_argument("--todos-per-user", type=int, default=5)
+    parser.add_argument("--repeat", type=int, default=50)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    path = temp_db_path()
+    start = time.perf_counter()
+    datagen.generate(path, users=args.users, todos_per_user=args.todos_per_user, purchases_per_user=1, seed=args.seed)
+    print(f"generated {args.users} users in {time.perf_counter() - start:.1f}s")
+    store = TodoStore.open(path, group_commit=False)
+
+    with store.connection() as conn:
+        ledger = conn.execute("SELECT COUNT(*) FROM points_ledger").fetchone()[0]
+        p50, p99 = measure(lambda: [conn.execute(sql).fetchall() for sql in NAIVE_SQL], 5)
+        print(f"naive per-rerun aggregation:      p50 {p50:8.2f}ms  p99 {p99:8.2f}ms")
+        elapsed, _ = timed(analytics.rebuild, conn)
+        print(f"full rebuild ({ledger} ledger rows): {elapsed * 1000:8.2f}ms")
+
+    for batch in (0, 100, 1000, 10000):
+        complete_random(store, args.users, batch, rng)
+        with store.connection() as conn:
+            elapsed, applied = timed(analytics.refresh, conn)
+        print(f"incremental refresh, {applied:>5} new:  {elapsed * 1000:8.2f}ms")
+
+    with store.connection() as conn:
+        elapsed, _ = timed(analytics.rebuild, conn)
+        print(f"full rebuild afterwards:          {elapsed * 1000:8.2f}ms")
+        p50, p99 = measure(lambda: analytics.load(conn), args.repeat)
+        print(f"snapshot load (cache miss):       p50 {p50:8.3f}ms  p99 {p99:8.3f}ms")
+    store.analytics_snapshot()
+    p50, p99 = measure(store.analytics_snapshot, args.repeat * 100)
+    print(f"snapshot (cache hit):             p50 {p50 * 1000:8.1f}us  p99 {p99 * 1000:8.1f}us")
+    ranks = iter([rng.randint(1, args.users) for _ in range(args.repeat * 10)])
+    p50, p99 = measure(lambda: store.user_rank(next(ranks)), args.repeat * 10)
+    print(f"user rank:                        p50 {p50:8.3f}ms  p99 {p99:8.3f}ms")
+    store.pool.close()
+
+
+if __name__ == "__main__":
+    main()
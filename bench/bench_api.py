@@ -0,0 +1,137 @@
+# file: bench/bench_api.py
+# api.py 부하 테스트. 임시 DB 로 서버를 띄우고 keep-alive 클라이언트 N 개가 요청을 섞어 보낸다
+# (할일 추가 / 진행중 목록 / 완료 / 보상 목록 / 구매). 처리량과 p50/p99 지연을 출력한다.
+#
+#   python bench/bench_api.py --clients 32 --seconds 10
+#   python bench/bench_api.py --url http://127.0.0.1:8765   # 이미 떠 있는 서버 대상
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+from collections import Counter
+from urllib.parse import urlsplit
+
+from common import percentile, temp_db_path
+
+from api import ApiServer
+from store import TodoStore
+
+
+class Client:
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self.reader = self.writer = None
+
+    async def request(self, method, path, payload=None):
+        if self.writer is None:
+            self.reader, self.writer = await asyncio.open_connection(self.host, self.port)
+        body = json.dumps(payload).encode() if payload is not None else b""
+        self.writer.write(f"{method} {path} HTTP/1.1\r\nHost: {self.host}\r\n"
+                          f"Content-Type: application/json\r\nContent-Length: {len(body)}\r\n\r\n".encode() + body)
+        await self.writer.drain()
+        status = int((await self.reader.readline()).split()[1])
+        length = 0
+        while True:
+            line = await self.reader.readline()
+            if line in (b"\r\n", b""):
+                break
+            key, _, value = line.decode().partition(":")
+            if key.lower() == "content-length":
+                length = int(value)
+        data = await self.reader.readexactly(length)
+        return status, json.loads(data) if data else None
+
+    def close(self):
+        if self.writer is not None:
+            self.writer.close()
+
+
+async def session(client, user_id, reward_ids, deadline, latencies, statuses):
+    rng = random.Random(user_id)
+    open_ids = []
+    while time.perf_counter() < deadline:
+        roll = rng.random()
+        if roll < 0.35 or not open_ids:
+            op, args = "add", ("POST", f"/users/{user_id}/todos", {"title": "load test", "points": 5})
+        elif roll < 0.65:
+            op, args = "list", ("GET", f"/users/{user_id}/todos?status=open&limit=20", None)
+        elif roll < 0.85:
+            op, args = "complete", ("POST", f"/users/{user_id}/todos/complete", {"ids": [open_ids.pop()]})
+        elif roll < 0.95:
+            op, args = "rewards", ("GET", "/rewards", None)
+        else:
+            op, args = "purchase", ("POST", f"/users/{user_id}/purchases", {"reward_id": rng.choice(reward_ids)})
+        start = time.perf_counter()
+        status, payload = await client.request(*args)
+        latencies[op].append(time.perf_counter() - start)
+        statuses[status] += 1
+        if op == "add" and status == 201:
+            open_ids.append(payload["id"])
+
+
+async def drive(host, port, clients, seconds):
+    setup = Client(host, port)
+    user_ids = []
+    for i in range(clients):
+        status, payload = await setup.request("POST", "/users", {"name": f"load-{time.time_ns()}-{i}"})
+        user_ids.append(payload["id"])
+    _, rewards = await setup.request("GET", "/rewards")
+    setup.close()
+
+    latencies = {op: [] for op in ("add", "list", "complete", "rewards", "purchase")}
+    statuses = Counter()
+    conns = [Client(host, port) for _ in range(clients)]
+    start = time.perf_counter()
+    await asyncio.gather(*(session(c, uid, [r["id"] for r in rewards], start + seconds, latencies, statuses)
+                           for c, uid in zip(conns, user_ids)))
+    elapsed = time.perf_counter() - start
+    for c in conns:
+        c.close()
+
+    every = [x for samples in latencies.values() for x in samples]
+    print(f"{len(every)} requests in {elapsed:.1f}s with {clients} clients: {len(every) / elapsed:.0f} req/s  "
+          f"p50={percentile(every, 50) * 1000:.2f}ms p99={percentile(every, 99) * 1000:.2f}ms")
+    for op, samples in latencies.items():
+        if samples:
+            print(f"  {op:<9} n={len(samples):<7} p50={percentile(samples, 50) * 1000:7.2f}ms "
+                  f"p99={percentile(samples, 99) * 1000:7.2f}ms")
+    print("  status codes:", dict(statuses))
+
+
+def start_local_server():
+    store = TodoStore.open(temp_db_path())
+    ready = threading.Event()
+    holder = {}
+
+    def run():
+        async def main():
+            holder["server"] = await ApiServer(store, "127.0.0.1", 0).start()
+            ready.set()
+            await holder["server"].serve_forever()
+        asyncio.run(main())
+
+    threading.Thread(target=run, daemon=True).start()
+    ready.wait()
+    return "127.0.0.1", holder["server"].port
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clients", type=int, default=32)
+    parser.add_argument("--seconds", type=float, default=10.0)
+    parser.add_argument("--url", help="이미 실행 중인 서버 주소 (없으면 임시 DB 로 서버를 띄운다)")
+    args = parser.parse_args()
+
+    if args.url:
+        url = urlsplit(args.url)
+        host, port = url.hostname, url.port or 80
+    else:
+        host, port = start_local_server()
+    asyncio.run(drive(host, port, args.clients, args.seconds))
+
+
+if __name__ == "__main__":
+    main()
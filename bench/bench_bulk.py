@@ -0,0 +1,84 @@
+# file: bench/bench_bulk.py
+# 할일 N 개를 완료/삭제/가져오기 할 때 항목별 처리(기존 버튼 경로: 문장마다 커밋) vs 일괄 처리(services) 비교.
+#
+#   python bench/bench_bulk.py --items 1000
+import argparse
+import sqlite3
+import time
+from datetime import datetime
+
+from common import temp_db_path
+
+import migrations
+import services
+
+
+def fresh(items):
+    conn = sqlite3.connect(temp_db_path())
+    conn.execute("PRAGMA journal_mode=WAL")
+    migrations.migrate(conn)
+    conn.execute("INSERT INTO users (name, points) VALUES ('bench', 0)")
+    now = datetime.now().isoformat()
+    conn.executemany("INSERT INTO todos (user_id,title,points_reward,created_at) VALUES (1,?,10,?)",
+                     ((f"todo {n}", now) for n in range(items)))
+    conn.commit()
+    ids = [r[0] for r in conn.execute("SELECT id FROM todos ORDER BY id")]
+    return conn, ids
+
+
+def per_item_complete(conn, ids):
+    # 기존 '완료' 버튼: UPDATE + update_user_points() 안의 커밋 + 바깥 커밋
+    for tid in ids:
+        tpoints = conn.execute("SELECT points_reward FROM todos WHERE id=?", (tid,)).fetchone()[0]
+        conn.execute("UPDATE todos SET completed=1, completed_at=? WHERE id=?", (datetime.now().isoformat(), tid))
+        conn.execute("UPDATE users SET points = points + ? WHERE id=?", (tpoints, 1))
+        conn.commit()
+        conn.commit()
+
+
+def per_item_delete(conn, ids):
+    for tid in ids:
+        conn.execute("DELETE FROM todos WHERE id=?", (tid,))
+        conn.commit()
+
+
+def per_item_import(conn, rows):
+    for title, points in rows:
+        conn.execute("INSERT INTO todos (user_id,title,points_reward,created_at) VALUES (?,?,?,?)",
+                     (1, title, points, datetime.now().isoformat()))
+        conn.commit()
+
+
+def clock(fn, *args):
+    start = time.perf_counter()
+    fn(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--items", type=int, default=1000)
+    args = parser.parse_args()
+    rows = [(f"imported {n}", 5) for n in range(args.items)]
+
+    results = []
+    conn, ids = fresh(args.items)
+    per = clock(per_item_complete, conn, ids)
+    conn, ids = fresh(args.items)
+    results.append(("complete", per, clock(services.complete_todos, conn, 1, ids)))
+    conn, ids = fresh(args.items)
+    per = clock(per_item_delete, conn, ids)
+    conn, ids = fresh(args.items)
+    results.append(("delete", per, clock(services.delete_todos, conn, 1, ids)))
+    conn, _ = fresh(0)
+    per = clock(per_item_import, conn, rows)
+    conn, _ = fresh(0)
+    results.append(("import", per, clock(services.import_todos, conn, 1, rows)))
+
+    print(f"{args.items} items")
+    for name, per, batch in results:
+        print(f"{name:<9} per-item {per * 1000:9.1f} ms   batched {batch * 1000:8.1f} ms   x{per / batch:.0f}")
+
+
+if __name__ == "__main__":
+    main()
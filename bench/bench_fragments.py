@@ -0,0 +1,118 @@
+# file: bench/bench_fragments.py
+# 상호작용 한 번당 DB 비용: 앱 전체 재실행 (기존 safe_rerun) vs 해당 프래그먼트만 재실행 (maker.rerun).
+# maker.py 의 각 프래그먼트가 그릴 때 부르는 store 호출을 그대로 재현해서, 상호작용마다
+# 동작 + 다시 그리기 에 드는 쿼리 수와 시간을 잰다 (Streamlit 자체의 직렬화/전송 비용은 빠져 있다).
+#
+#   python bench/bench_fragments.py --users 200 --todos-per-user 500
+import argparse
+import ast
+import os
+import random
+import time
+
+from common import percentile, temp_db_path
+
+import datagen
+import metrics
+from settings import PAGE_SIZE
+from store import TodoStore
+
+# 프래그먼트별로 그릴 때 부르는 store 호출 (maker.py 의 @fragment 함수 이름, 같은 순서).
+# 검색어가 비어 있는 기본 상태 기준: 할일 검색 탭과 보상 검색은 검색어가 있을 때만 쿼리한다.
+SECTIONS = {
+    "account_section": lambda store, uid: None,
+    "reward_admin_section": lambda store, uid: store.list_rewards(),
+    "todo_section": lambda store, uid: (store.get_user_stats(uid),
+                                        store.materialize_due(uid),
+                                        store.list_in_progress(uid, PAGE_SIZE),
+                                        store.list_completed(uid, PAGE_SIZE)),
+    "shop_section": lambda store, uid: store.list_rewards(),
+    "history_section": lambda store, uid: store.list_purchases(uid, PAGE_SIZE),
+    "analytics_section": lambda store, uid: (store.analytics_snapshot(), store.user_rank(uid)),
+    "sidebar_todo_section": lambda store, uid: store.list_templates(uid),
+}
+
+
+def maker_fragments():
+    # maker.py 를 import 하지 않고 (streamlit 없이) @fragment 가 붙은 함수 이름을 읽는다
+    path = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "maker.py")
+    with open(path, encoding="utf-8") as f:
+        tree = ast.parse(f.read())
+    return [node.name for node in tree.body if isinstance(node, ast.FunctionDef)
+            and any(isinstance(d, ast.Name) and d.id == "fragment" for d in node.decorator_list)]
+
+
+def complete_one(store, uid, rng):
+    page = store.list_in_progress(uid, PAGE_SIZE)
+    if page.rows:
+        store.complete_todos(uid, [page.rows[rng.randrange(len(page.rows))][0]])
+
+
+def delete_one(store, uid, rng):
+    page = store.list_completed(uid, PAGE_SIZE)
+    if page.rows:
+        store.delete_todos(uid, [page.rows[rng.randrange(len(page.rows))][0]])
+
+
+def next_history_page(store, uid, rng):
+    # 페이지 이동 자체는 쿼리가 없다 (커서만 바뀐다)
+    pass
+
+
+def search_todos(store, uid, rng):
+    # 검색 탭에 검색어를 입력한 경우 (할일 프래그먼트만 다시 그린다)
+    store.search_todos(uid, "bench", PAGE_SIZE)
+
+
+# (이름, 동작, 프래그먼트 재실행일 때 다시 그리는 구역 — None 이면 앱 전체)
+INTERACTIONS = [
+    ("complete_todo", complete_one, ["todo_section"]),
+    ("delete_done_todo", delete_one, ["todo_section"]),
+    ("search_todos", search_todos, ["todo_section"]),
+    ("history_next_page", next_history_page, ["history_section"]),
+    ("purchase", lambda store, uid, rng: store.purchase_reward(uid, rng.randint(1, 20)), None),
+    ("add_todo", lambda store, uid, rng: store.add_todo(uid, "bench", 10), None),
+]
+
+
+def measure(store, users, action, sections, repeat, seed):
+    rng = random.Random(seed)
+    metrics.registry.reset()
+    samples = []
+    for _ in range(repeat):
+        uid = rng.randint(1, users)
+        start = time.perf_counter()
+        with store.connection():
+            action(store, uid, rng)
+            for name in sections:
+                SECTIONS[name](store, uid)
+        samples.append(time.perf_counter() - start)
+    queries = sum(data["count"] for (kind, _), data in metrics.registry.snapshot().items() if kind == "query")
+    return queries / repeat, percentile(samples, 50), percentile(samples, 99)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--todos-per-user", type=int, default=200)
+    parser.add_argument("--repeat", type=int, default=500)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    missing = set(maker_fragments()) ^ set(SECTIONS)
+    if missing:
+        parser.error(f"SECTIONS 가 maker.py 프래그먼트와 다릅니다: {sorted(missing)}")
+
+    path = datagen.generate(temp_db_path(), users=args.users, todos_per_user=args.todos_per_user, seed=args.seed)
+    store = TodoStore.open(path)
+    full = list(SECTIONS)
+    print(f"{'interaction':<20}{'app q':>8}{'app p50':>10}{'app p99':>10}{'frag q':>9}{'frag p50':>10}{'frag p99':>10}")
+    for name, action, scoped in INTERACTIONS:
+        before = measure(store, args.users, action, full, args.repeat, args.seed)
+        after = measure(store, args.users, action, scoped or full, args.repeat, args.seed)
+        print(f"{name:<20}{before[0]:>8.1f}{before[1] * 1000:>8.3f}ms{before[2] * 1000:>8.3f}ms"
+              f"{after[0]:>9.1f}{after[1] * 1000:>8.3f}ms{after[2] * 1000:>8.3f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,64 @@
+# file: bench/bench_group_commit.py
+# 동시 쓰기 처리량: 동작마다 커밋 vs 그룹 커밋 (db.GroupCommitWriter), 내구성 모드(synchronous)별.
+# 스레드 N 개가 할일 추가/완료/구매를 섞어 보내고 처리량, p50/p99, 커밋(배치) 수를 출력한다.
+#
+#   python bench/bench_group_commit.py --threads 16 --seconds 5
+import argparse
+import random
+import shutil
+
+from common import percentile, run_concurrent, temp_db_path
+
+import datagen
+from store import TodoStore
+
+
+def write_mix(store, users, rng):
+    user_id = rng.randint(1, users)
+    roll = rng.random()
+    if roll < 0.5:
+        store.add_todo(user_id, "bench", rng.randint(1, 50))
+    elif roll < 0.9:
+        page = store.list_in_progress(user_id, 5)
+        if page.rows:
+            store.complete_todos(user_id, [page.rows[0][0]])
+    else:
+        store.purchase_reward(user_id, rng.randint(1, 20))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--modes", default="FULL,NORMAL", help="비교할 synchronous 값")
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    template = temp_db_path("template.db")
+    datagen.generate(template, users=args.users, todos_per_user=20, seed=args.seed)
+
+    print(f"{'synchronous':<12}{'group':<7}{'ops/s':>9}{'p50':>10}{'p99':>10}{'commits':>9}{'writes/commit':>15}")
+    for mode in args.modes.split(","):
+        for group in (False, True):
+            path = temp_db_path()
+            shutil.copyfile(template, path)
+            store = TodoStore.open(path, group_commit=group, pragmas={"synchronous": mode})
+            rngs = [random.Random(args.seed * 100 + i) for i in range(args.threads)]
+            ok, errors, latencies = run_concurrent(
+                lambda i: write_mix(store, args.users, rngs[i]), args.threads, args.seconds)
+            if store.writer is not None:
+                commits, writes = store.writer.batches, store.writer.writes
+                store.writer.close()
+            else:
+                commits, writes = None, None
+            store.pool.close()
+            per_commit = f"{writes / commits:.1f}" if commits else "1.0"
+            print(f"{mode:<12}{'on' if group else 'off':<7}{ok / args.seconds:>9.0f}"
+                  f"{percentile(latencies, 50) * 1000:>8.2f}ms{percentile(latencies, 99) * 1000:>8.2f}ms"
+                  f"{commits if commits is not None else '-':>9}{per_commit:>15}"
+                  + (f"  errors={errors}" if errors else ""))
+
+
+if __name__ == "__main__":
+    main()
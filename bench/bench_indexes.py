@@ -0,0 +1,81 @@
+# file: bench/bench_indexes.py
+# 큰 합성 DB 에서 화면 조회 쿼리의 실행 계획과 지연 시간을 인덱스 추가 전(스키마 v2)/후(최신)로 비교한다.
+#
+#   python bench/bench_indexes.py --users 2000 --todos-per-user 200
+import argparse
+import random
+import sqlite3
+from datetime import datetime, timedelta
+
+from common import temp_db_path, timed
+
+import migrations
+
+QUERIES = {
+    "in_progress": ("SELECT id,title,points_reward,created_at FROM todos "
+                    "WHERE user_id=? AND completed=0 ORDER BY id DESC"),
+    "completed": ("SELECT id,title,points_reward,completed_at FROM todos "
+                  "WHERE user_id=? AND completed=1 ORDER BY completed_at DESC"),
+    "purchases": ("SELECT p.id, r.name, p.purchased_at FROM purchases p "
+                  "JOIN rewards r ON p.reward_id = r.id WHERE p.user_id=? "
+                  "ORDER BY p.purchased_at DESC"),
+}
+
+
+def seed(conn, users, todos_per_user, purchases_per_user, seed_value=42):
+    rng = random.Random(seed_value)
+    base = datetime(2024, 1, 1)
+    conn.executemany("INSERT INTO users (name, points, created_at) VALUES (?,?,?)",
+                     [(f"user{i}", 0, base.isoformat()) for i in range(users)])
+    conn.executemany("INSERT INTO rewards (name,cost,description,stock) VALUES (?,?,?,?)",
+                     [(f"reward{i}", 10 + i, "", -1) for i in range(20)])
+
+    def todo_rows():
+        # 사용자별로 모아서가 아니라 섞어서 넣어야 실제처럼 페이지가 흩어진다
+        for n in range(users * todos_per_user):
+            uid = rng.randint(1, users)
+            created = base + timedelta(minutes=n)
+            done = rng.random() < 0.7
+            yield (uid, f"todo {n}", rng.randint(1, 50), int(done), created.isoformat(),
+                   (created + timedelta(hours=rng.randint(1, 72))).isoformat() if done else None)
+
+    conn.executemany("INSERT INTO todos (user_id,title,points_reward,completed,created_at,completed_at) "
+                     "VALUES (?,?,?,?,?,?)", todo_rows())
+    conn.executemany("INSERT INTO purchases (user_id,reward_id,purchased_at) VALUES (?,?,?)",
+                     ((rng.randint(1, users), rng.randint(1, 20), (base + timedelta(minutes=n)).isoformat())
+                      for n in range(users * purchases_per_user)))
+    conn.commit()
+
+
+def explain(conn, sql, params):
+    return "; ".join(r[3] for r in conn.execute("EXPLAIN QUERY PLAN " + sql, params).fetchall())
+
+
+def measure(conn, label, users, repeat):
+    print(f"--- {label} (schema v{migrations.current_version(conn)}) ---")
+    for name, sql in QUERIES.items():
+        params = (users // 2,)
+        elapsed, rows = timed(lambda: conn.execute(sql, params).fetchall(), repeat=repeat)
+        print(f"{name:<12} {elapsed * 1000:9.3f} ms  rows={len(rows):<6} plan: {explain(conn, sql, params)}")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--todos-per-user", type=int, default=200)
+    parser.add_argument("--purchases-per-user", type=int, default=20)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    conn = sqlite3.connect(temp_db_path())
+    migrations.migrate(conn, target=2)
+    seed(conn, args.users, args.todos_per_user, args.purchases_per_user)
+    measure(conn, "before", args.users, args.repeat)
+    elapsed, _ = timed(migrations.migrate, conn)
+    print(f"index migration took {elapsed:.2f} s")
+    measure(conn, "after", args.users, args.repeat)
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,75 @@
+# file: bench/bench_pagination.py
+# 완료 목록 한 번 그리는 비용: 전체 fetchall + 행마다 위젯 (기존) vs keyset 페이지 한 장 (services.list_completed)
+# Streamlit 없이 측정하기 위해 그려질 요소 수와 텍스트 바이트 수로 델타 크기를 근사한다.
+#
+#   python bench/bench_pagination.py --sizes 10000 100000
+import argparse
+import sqlite3
+from datetime import datetime, timedelta
+
+from common import temp_db_path, timed
+
+import migrations
+import services
+from settings import PAGE_SIZE
+
+FULL_SQL = ("SELECT id,title,points_reward,completed_at FROM todos "
+            "WHERE user_id=? AND completed=1 ORDER BY completed_at DESC")
+
+
+def seed(conn, rows):
+    base = datetime(2024, 1, 1)
+    conn.execute("INSERT INTO users (name, points) VALUES ('bench', 0)")
+    conn.executemany(
+        "INSERT INTO todos (user_id,title,points_reward,completed,created_at,completed_at) VALUES (1,?,10,1,?,?)",
+        ((f"완료한 미션 {n}", (base + timedelta(minutes=n)).isoformat(),
+          (base + timedelta(minutes=n, seconds=30)).isoformat()) for n in range(rows)))
+    conn.commit()
+
+
+def render(rows):
+    # 완료 탭이 행마다 만드는 요소: columns 컨테이너 + 열 2개 + markdown + 삭제 버튼
+    elements = 0
+    payload = 0
+    for tid, title, points, completed_at in rows:
+        text = f"- **{title}** ({points}점) — 완료: {completed_at}"
+        elements += 5
+        payload += len(text.encode()) + len(f"del_done_{tid}")
+    return elements, payload
+
+
+def full_render(conn):
+    return render(conn.execute(FULL_SQL, (1,)).fetchall())
+
+
+def paged_render(conn, cursor):
+    page = services.list_completed(conn, 1, PAGE_SIZE, cursor)
+    return render(page.rows)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10000, 100000])
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    print(f"page size {PAGE_SIZE}")
+    for size in args.sizes:
+        conn = sqlite3.connect(temp_db_path())
+        migrations.migrate(conn)
+        seed(conn, size)
+        # 깊은 페이지 커서: 목록의 한가운데
+        mid = conn.execute(FULL_SQL + " LIMIT 1 OFFSET ?", (1, size // 2)).fetchone()
+        deep_cursor = (mid[3], mid[0])
+
+        full_t, (full_el, full_bytes) = timed(full_render, conn, repeat=args.repeat)
+        first_t, (page_el, page_bytes) = timed(paged_render, conn, None, repeat=args.repeat)
+        deep_t, _ = timed(paged_render, conn, deep_cursor, repeat=args.repeat)
+        print(f"{size:>7} rows  full: {full_t * 1000:9.2f} ms {full_el:>7} elements {full_bytes / 1024:9.1f} KiB"
+              f"  |  page 1: {first_t * 1000:6.2f} ms  middle page: {deep_t * 1000:6.2f} ms"
+              f" {page_el} elements {page_bytes / 1024:.1f} KiB")
+        conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,81 @@
+# file: bench/bench_pool.py
+# 동시 세션 N 개가 재실행을 반복할 때의 초당 처리량 비교:
+#   reconnect - 기존 run_app() 처럼 매 재실행마다 sqlite3.connect (기본 저널 모드)
+#   pool      - db.ConnectionPool (WAL, busy timeout, PRAGMA 적용, 연결 재사용)
+#
+#   python bench/bench_pool.py --sessions 8 --seconds 5
+import argparse
+import random
+import sqlite3
+from datetime import datetime
+
+from common import percentile, run_concurrent, temp_db_path
+
+import migrations
+from db import ConnectionPool
+
+def setup(path, users):
+    conn = sqlite3.connect(path)
+    migrations.migrate(conn)
+    conn.executemany("INSERT INTO users (name, points) VALUES (?, 0)", [(f"user{i}",) for i in range(users)])
+    conn.commit()
+    conn.close()
+
+
+def simulated_rerun(conn, user_id, write_ratio):
+    # 재실행 한 번 동안 앱이 하는 일을 흉내: 포인트 조회 + 목록 조회 + 가끔 쓰기
+    c = conn.cursor()
+    c.execute("SELECT points FROM users WHERE id=?", (user_id,)).fetchone()
+    c.execute("SELECT id,title,points_reward,created_at FROM todos WHERE user_id=? AND completed=0 ORDER BY id DESC",
+              (user_id,)).fetchall()
+    if random.random() < write_ratio:
+        c.execute("INSERT INTO todos (user_id,title,points_reward,created_at) VALUES (?,?,?,?)",
+                  (user_id, "bench", 10, datetime.now().isoformat()))
+        c.execute("UPDATE users SET points = points + 1 WHERE id=?", (user_id,))
+        conn.commit()
+
+
+def bench_reconnect(path, sessions, seconds, users, write_ratio):
+    def worker(index):
+        conn = sqlite3.connect(path, check_same_thread=False)
+        try:
+            simulated_rerun(conn, index % users + 1, write_ratio)
+        finally:
+            conn.close()
+    return run_concurrent(worker, sessions, seconds)
+
+
+def bench_pool(path, sessions, seconds, users, write_ratio):
+    pool = ConnectionPool(path)
+
+    def worker(index):
+        with pool.connection() as conn:
+            simulated_rerun(conn, index % users + 1, write_ratio)
+    try:
+        return run_concurrent(worker, sessions, seconds)
+    finally:
+        pool.close()
+
+
+def report(label, seconds, result):
+    ok, errors, latencies = result
+    print(f"{label:<10} {ok / seconds:>10.1f} req/s  errors={errors:<6} "
+          f"p50={percentile(latencies, 50) * 1000:.2f}ms p99={percentile(latencies, 99) * 1000:.2f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sessions", type=int, default=8)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--write-ratio", type=float, default=0.2)
+    args = parser.parse_args()
+
+    for label, fn in (("reconnect", bench_reconnect), ("pool", bench_pool)):
+        path = temp_db_path()
+        setup(path, args.users)
+        report(label, args.seconds, fn(path, args.sessions, args.seconds, args.users, args.write_ratio))
+
+
+if __name__ == "__main__":
+    main()
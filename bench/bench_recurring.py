@@ -0,0 +1,103 @@
+# file: bench/bench_recurring.py
+# 반복 미션 회차 만들기 비용: 템플릿이 많아도 때가 된 것만 처리하는지 본다.
+#   - 재실행마다의 확인(store.materialize_due(user_id)): 때가 된 것이 없으면 인덱스 조회 한 번
+#   - 스케줄러 한 번(store.materialize_due()): 전체 템플릿 중 때가 된 비율에 비례
+#   - 같은 시각으로 다시 실행(재시작 흉내)해도 회차가 늘지 않는지 확인
+#
+#   python bench/bench_recurring.py --users 2000 --templates-per-user 10
+import argparse
+import random
+import sqlite3
+import time
+from datetime import datetime, timedelta
+
+from common import percentile, temp_db_path
+
+import datagen
+import recurring
+from store import TodoStore
+
+
+def seed_templates(path, users, per_user, due_ratio, now, rng):
+    # 템플릿을 직접 넣는다. due_ratio 만큼은 이미 때가 지난 상태로 만든다.
+    conn = sqlite3.connect(path)
+    rows = []
+    for uid in range(1, users + 1):
+        for i in range(per_user):
+            hour = rng.randrange(24)
+            schedule = recurring.daily(hour) if i % 2 else recurring.weekly([rng.randrange(7)], hour)
+            if rng.random() < due_ratio:
+                due = now - timedelta(minutes=rng.randint(1, 600))
+            else:
+                due = now + timedelta(minutes=rng.randint(1, 600))
+            rows.append((uid, f"반복 {i}", 10, schedule, due.strftime("%Y-%m-%dT%H:%M"), now.isoformat()))
+    conn.executemany("""INSERT INTO todo_templates (user_id,title,points_reward,schedule,next_due_at,active,created_at)
+                        VALUES (?,?,?,?,?,1,?)""", rows)
+    conn.commit()
+    conn.close()
+    return len(rows)
+
+
+def count_instances(store):
+    with store.connection() as conn:
+        return conn.execute("SELECT COUNT(*) FROM todos WHERE template_id IS NOT NULL").fetchone()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=2000)
+    parser.add_argument("--templates-per-user", type=int, default=10)
+    parser.add_argument("--due-ratio", type=float, default=0.05)
+    parser.add_argument("--repeat", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    rng = random.Random(args.seed)
+    now = datetime.now().replace(second=0, microsecond=0)
+    path = temp_db_path()
+    datagen.generate(path, users=args.users, todos_per_user=20, seed=args.seed)
+    total = seed_templates(path, args.users, args.templates_per_user, args.due_ratio, now, rng)
+    store = TodoStore.open(path, group_commit=False)
+
+    # 재실행마다의 확인: 때가 된 것이 없는 사용자 (대부분의 재실행)
+    with store.connection() as conn:
+        idle = [r[0] for r in conn.execute(
+            "SELECT id FROM users WHERE id NOT IN (SELECT user_id FROM todo_templates WHERE next_due_at <= ?)",
+            (now.strftime("%Y-%m-%dT%H:%M"),))]
+    samples = []
+    for _ in range(args.repeat):
+        uid = rng.choice(idle) if idle else 1
+        start = time.perf_counter()
+        store.materialize_due(uid)
+        samples.append(time.perf_counter() - start)
+    print(f"{total} templates, {args.users} users, ~{args.due_ratio:.0%} due")
+    print(f"per-rerun check, nothing due: p50 {percentile(samples, 50) * 1e6:.0f}us  p99 {percentile(samples, 99) * 1e6:.0f}us")
+
+    with store.connection() as conn:
+        snapshot = conn.execute("SELECT next_due_at, id FROM todo_templates").fetchall()
+
+    # 스케줄러 한 번: 때가 된 템플릿만 처리
+    start = time.perf_counter()
+    created = store.materialize_due()
+    elapsed = time.perf_counter() - start
+    print(f"scheduler pass: {created} instance(s) in {elapsed * 1000:.1f}ms "
+          f"({elapsed / max(created, 1) * 1e6:.0f}us per instance)")
+
+    # 아무것도 때가 아닐 때의 스케줄러 한 번
+    start = time.perf_counter()
+    again = store.materialize_due()
+    print(f"scheduler pass, nothing due: {again} instance(s) in {(time.perf_counter() - start) * 1000:.2f}ms")
+
+    # 재시작 흉내: next_due_at 을 커밋 전 상태로 되돌려 다시 돌려도 같은 회차는 다시 생기지 않는다
+    before = count_instances(store)
+    with store.connection() as conn:
+        conn.executemany("UPDATE todo_templates SET next_due_at=? WHERE id=?", snapshot)
+        conn.commit()
+        recurring.materialize_due(conn)
+    after = count_instances(store)
+    print(f"replay after reset: instances {before} -> {after} ({'ok' if before == after else 'DUPLICATES'})")
+    store.pool.close()
+
+
+if __name__ == "__main__":
+    main()
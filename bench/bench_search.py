@@ -0,0 +1,102 @@
+# file: bench/bench_search.py
+# 할일 검색 지연: FTS5 색인 (search.search_todos, 관련도순/최신순) vs LIKE 스캔. 기본은 할일 100만 행.
+# 같은 조건(사용자 한 명, 검색어, 필터)으로 첫 페이지와 커서로 넘긴 뒤 페이지를 잰다.
+#
+#   python bench/bench_search.py                       # 1000 명 x 1000 개 = 100만 행
+#   python bench/bench_search.py --users 200 --todos-per-user 500
+import argparse
+import os
+import random
+import sqlite3
+import time
+
+from common import percentile, temp_db_path
+
+import datagen
+import search
+from settings import PAGE_SIZE
+
+# 합성 제목은 낱말 8개로만 만들어져 모두 흔한 낱말(전체의 1/8)이다. 드문 낱말은 RARE_EVERY 행마다 덧붙인다.
+RARE_EVERY = 500
+
+QUERIES = [
+    ("긴급", {}),
+    ("운동", {}),
+    ("코딩 연습", {}),
+    ("책", {"status": "done"}),
+    ("일기", {"date_from": "2024-03-01", "date_to": "2024-04-30"}),
+    ("산책", {"min_points": 20, "max_points": 40}),
+]
+
+LIKE_SQL = ("SELECT id,title,points_reward,completed,created_at,completed_at FROM todos "
+            "WHERE user_id=? AND title LIKE ? ORDER BY id DESC LIMIT ?")
+
+
+def like_terms(text):
+    return "%" + "%".join(text.split()) + "%"
+
+
+def measure(fn, repeat):
+    samples = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        samples.append(time.perf_counter() - start)
+    return percentile(samples, 50) * 1000, percentile(samples, 99) * 1000
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=1000)
+    parser.add_argument("--todos-per-user", type=int, default=1000)
+    parser.add_argument("--repeat", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+
+    path = temp_db_path()
+    start = time.perf_counter()
+    datagen.generate(path, users=args.users, todos_per_user=args.todos_per_user, purchases_per_user=1, seed=args.seed)
+    print(f"generated {args.users * args.todos_per_user} todos in {time.perf_counter() - start:.1f}s "
+          f"({os.path.getsize(path) / 1e6:.0f} MB with FTS index)")
+
+    conn = sqlite3.connect(path)
+    conn.execute("UPDATE todos SET title = title || ' 긴급' WHERE id % ? = 0", (RARE_EVERY,))
+    conn.commit()
+    start = time.perf_counter()
+    search.rebuild(conn)
+    conn.commit()
+    print(f"full index rebuild: {time.perf_counter() - start:.1f}s")
+
+    rng = random.Random(args.seed)
+    print(f"\n{'query':<28}{'rank p50':>10}{'rank p99':>10}{'page2 p50':>11}{'recent p50':>12}{'like p50':>10}{'like p99':>10}")
+    for text, filters in QUERIES:
+        users = [rng.randint(1, args.users) for _ in range(args.repeat)]
+        it = iter(users * 4)
+
+        def fts():
+            search.search_todos(conn, next(it), text, PAGE_SIZE, **filters)
+
+        def fts_next_page():
+            uid = next(it)
+            page = search.search_todos(conn, uid, text, PAGE_SIZE, **filters)
+            if page.next_cursor:
+                search.search_todos(conn, uid, text, PAGE_SIZE, page.next_cursor, **filters)
+
+        def fts_recent():
+            search.search_todos(conn, next(it), text, PAGE_SIZE, order="recent", **filters)
+
+        def like():
+            # 비교용: 필터 없이 제목 LIKE 만 (인덱스로 사용자 범위를 좁힌 뒤 행마다 문자열 비교)
+            conn.execute(LIKE_SQL, (next(it), like_terms(text), PAGE_SIZE)).fetchall()
+
+        f50, f99 = measure(fts, args.repeat)
+        p50, _ = measure(fts_next_page, args.repeat)
+        r50, _ = measure(fts_recent, args.repeat)
+        l50, l99 = measure(like, args.repeat)
+        label = text + (" " + ",".join(filters) if filters else "")
+        print(f"{label:<28}{f50:>8.3f}ms{f99:>8.3f}ms{p50:>9.3f}ms{r50:>10.3f}ms{l50:>8.3f}ms{l99:>8.3f}ms")
+    conn.close()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+# file: bench/bench_startup.py
+# 시작/재실행 시 스키마 초기화 비용 비교:
+#   legacy  - 기존 run_app() 이 매 재실행마다 하던 init_db() + init_rewards()
+#   startup - migrations.ensure_schema() 첫 호출 (빈 DB, 프로세스 시작 시 1회)
+#   rerun   - ensure_schema() 이후 재실행 (아무 쿼리도 하지 않음)
+#
+#   python bench/bench_startup.py --reruns 200
+import argparse
+import sqlite3
+
+from common import temp_db_path, timed
+
+import migrations
+from db import ConnectionPool
+
+
+def legacy_init(conn):
+    # 변경 전 maker.py 의 init_db() + init_rewards() 를 그대로 옮긴 것
+    c = conn.cursor()
+
+    def has_column(table, column):
+        cols = c.execute(f"PRAGMA table_info('{table}')").fetchall()
+        return column in [r[1] for r in cols]
+
+    for stmt in migrations.BASE_SCHEMA:
+        c.execute(stmt)
+    conn.commit()
+    if not has_column("users", "created_at"):
+        c.execute("ALTER TABLE users ADD COLUMN created_at TEXT")
+        conn.commit()
+    if not has_column("rewards", "stock"):
+        c.execute("ALTER TABLE rewards ADD COLUMN stock INTEGER DEFAULT -1")
+        conn.commit()
+    existing = c.execute("SELECT COUNT(*) FROM rewards").fetchone()[0]
+    if existing == 0:
+        c.executemany("INSERT INTO rewards (name,cost,description,stock) VALUES (?,?,?,?)", migrations.DEFAULT_REWARDS)
+        conn.commit()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--reruns", type=int, default=200)
+    args = parser.parse_args()
+
+    path = temp_db_path()
+    conn = sqlite3.connect(path)
+    legacy_first, _ = timed(legacy_init, conn)
+    legacy_rerun, _ = timed(legacy_init, conn, repeat=args.reruns)
+    conn.close()
+
+    pool = ConnectionPool(temp_db_path())
+    startup, _ = timed(migrations.ensure_schema, pool)
+    rerun, _ = timed(migrations.ensure_schema, pool, repeat=args.reruns)
+    pool.close()
+
+    print(f"legacy  first run  {legacy_first * 1000:9.3f} ms")
+    print(f"legacy  per rerun  {legacy_rerun * 1000:9.3f} ms")
+    print(f"startup (once)     {startup * 1000:9.3f} ms")
+    print(f"per rerun          {rerun * 1000:9.3f} ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,67 @@
+# file: bench/common.py
+# 벤치마크 스크립트 공용 도우미. `python bench/<script>.py` 로 실행해도 루트 모듈을 import 할 수 있게 한다.
+import os
+import sys
+import tempfile
+import threading
+import time
+
+ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+if ROOT not in sys.path:
+    sys.path.insert(0, ROOT)
+
+
+def temp_db_path(name="bench.db"):
+    directory = tempfile.mkdtemp(prefix="todomaker-bench-")
+    return os.path.join(directory, name)
+
+
+def percentile(samples, pct):
+    if not samples:
+        return 0.0
+    ordered = sorted(samples)
+    k = (len(ordered) - 1) * pct / 100.0
+    lo = int(k)
+    hi = min(lo + 1, len(ordered) - 1)
+    return ordered[lo] + (ordered[hi] - ordered[lo]) * (k - lo)
+
+
+def timed(fn, *args, repeat=1, **kwargs):
+    # fn 을 repeat 번 실행하고 회당 평균 시간(초)과 마지막 결과를 돌려준다
+    result = None
+    start = time.perf_counter()
+    for _ in range(repeat):
+        result = fn(*args, **kwargs)
+    return (time.perf_counter() - start) / repeat, result
+
+
+def run_concurrent(worker, threads, duration):
+    # worker(thread_index) 를 duration 초 동안 반복 호출하고 (성공 횟수, 오류 횟수, 지연 목록) 을 돌려준다
+    stop = threading.Event()
+    lock = threading.Lock()
+    totals = {"ok": 0, "errors": 0, "latencies": []}
+
+    def loop(index):
+        ok = errors = 0
+        latencies = []
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                worker(index)
+                ok += 1
+            except Exception:
+                errors += 1
+            latencies.append(time.perf_counter() - start)
+        with lock:
+            totals["ok"] += ok
+            totals["errors"] += errors
+            totals["latencies"].extend(latencies)
+
+    workers = [threading.Thread(target=loop, args=(i,), daemon=True) for i in range(threads)]
+    for t in workers:
+        t.start()
+    time.sleep(duration)
+    stop.set()
+    for t in workers:
+        t.join()
+    return totals["ok"], totals["errors"], totals["latencies"]
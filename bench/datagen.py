@@ -0,0 +1,95 @@
+# file: bench/datagen.py
+# 재현 가능한 합성 DB 생성기. 같은 인자와 seed 면 항상 같은 DB 가 나온다.
+#   - 사용자 N 명, 사용자당 할일 M 개 (completed_ratio 만큼 완료)
+#   - 보상 R 개 (limited_ratio 만큼 한정 수량)
+#   - 사용자당 구매 이력 P 건
+# 포인트 원장과 user_stats 까지 채워서 앱이 실제로 보는 것과 같은 상태로 만든다.
+#
+#   python bench/datagen.py out.db --users 1000 --todos-per-user 100
+import argparse
+import random
+import sqlite3
+from datetime import datetime, timedelta
+
+import common  # noqa: F401  (루트 모듈 경로 설정)
+
+import migrations
+import services
+
+BASE_TIME = datetime(2024, 1, 1)
+
+
+def generate(path, users=200, todos_per_user=50, completed_ratio=0.6, rewards=20, limited_ratio=0.3,
+             purchases_per_user=5, seed=42):
+    rng = random.Random(seed)
+    conn = sqlite3.connect(path)
+    conn.execute("PRAGMA journal_mode=WAL")
+    conn.execute("PRAGMA synchronous=OFF")
+    # 기본 보상(seed_rewards)은 넣지 않고 합성 보상만 쓴다
+    migrations.migrate(conn)
+
+    conn.executemany("INSERT INTO users (name, points, created_at) VALUES (?,?,?)",
+                     ((f"user{i:06d}", 0, (BASE_TIME + timedelta(minutes=i)).isoformat()) for i in range(users)))
+    reward_rows = []
+    for i in range(rewards):
+        stock = rng.randint(5, 500) if rng.random() < limited_ratio else -1
+        reward_rows.append((f"보상 {i}", rng.randint(10, 200), f"합성 보상 {i}", stock))
+    conn.executemany("INSERT INTO rewards (name,cost,description,stock) VALUES (?,?,?,?)", reward_rows)
+
+    span_minutes = 60 * 24 * 180
+
+    def todo_rows():
+        # 실제처럼 사용자들의 할일이 시간순으로 섞여 들어가도록 생성
+        for n in range(users * todos_per_user):
+            uid = rng.randint(1, users)
+            created = BASE_TIME + timedelta(minutes=rng.randint(0, span_minutes))
+            done = rng.random() < completed_ratio
+            completed = (created + timedelta(minutes=rng.randint(10, 60 * 72))).isoformat() if done else None
+            yield (uid, f"미션 {n} {rng.choice(TITLE_WORDS)}", rng.randint(1, 50), int(done),
+                   created.isoformat(), completed)
+
+    conn.executemany("INSERT INTO todos (user_id,title,points_reward,completed,created_at,completed_at) "
+                     "VALUES (?,?,?,?,?,?)", todo_rows())
+    conn.executemany("INSERT INTO purchases (user_id,reward_id,purchased_at) VALUES (?,?,?)",
+                     ((rng.randint(1, users), rng.randint(1, rewards),
+                       (BASE_TIME + timedelta(minutes=rng.randint(0, span_minutes))).isoformat())
+                      for _ in range(users * purchases_per_user)))
+
+    # 원장: 완료 적립 + 구매 차감. 포인트는 원장 합계로 두되 음수는 0 으로 잘라서,
+    # 차이는 rebuild_stats 가 'adjust' 행으로 맞춘다
+    conn.execute("""INSERT INTO points_ledger (user_id,delta,reason,ref_id,created_at)
+                    SELECT user_id, points_reward, 'todo', id, completed_at FROM todos
+                    WHERE completed=1 ORDER BY completed_at""")
+    conn.execute("""INSERT INTO points_ledger (user_id,delta,reason,ref_id,created_at)
+                    SELECT p.user_id, -r.cost, 'purchase', p.id, p.purchased_at
+                    FROM purchases p JOIN rewards r ON r.id = p.reward_id ORDER BY p.purchased_at""")
+    conn.execute("""UPDATE users SET points = MAX(0, COALESCE(
+                        (SELECT SUM(delta) FROM points_ledger l WHERE l.user_id = users.id), 0))""")
+    conn.commit()
+    services.rebuild_stats(conn)
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE)")
+    conn.close()
+    return path
+
+
+TITLE_WORDS = ["운동하기", "책 읽기", "방 청소", "영어 단어", "산책", "코딩 연습", "물 마시기", "일기 쓰기"]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("path")
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--todos-per-user", type=int, default=50)
+    parser.add_argument("--completed-ratio", type=float, default=0.6)
+    parser.add_argument("--rewards", type=int, default=20)
+    parser.add_argument("--limited-ratio", type=float, default=0.3)
+    parser.add_argument("--purchases-per-user", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    args = parser.parse_args()
+    generate(args.path, args.users, args.todos_per_user, args.completed_ratio, args.rewards,
+             args.limited_ratio, args.purchases_per_user, args.seed)
+    print(f"wrote {args.path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,184 @@
+# file: bench/run.py
+# 합성 부하 벤치마크 모음. datagen 으로 같은 seed 의 DB 를 만든 뒤 시나리오(scenarios.py)별로
+# 단일 스레드 / 동시 실행 처리량과 지연 분포를 재고 JSON 으로 남긴다.
+# 시나리오마다 원본 DB 를 복사해서 시작하므로 앞 시나리오의 쓰기가 뒤 시나리오 결과에 섞이지 않는다.
+#
+#   python bench/run.py --out results.json
+#   python bench/run.py --users 2000 --todos-per-user 200 --threads 1,8 --out after.json --baseline before.json
+#
+# --baseline 을 주면 같은 시나리오끼리 비교표를 찍고, 처리량이 --threshold % 넘게 떨어지거나
+# p99 가 그만큼 늘어난 항목이 있으면 종료 코드 1 로 끝난다.
+import argparse
+import json
+import os
+import platform
+import random
+import shutil
+import sqlite3
+import sys
+import threading
+import time
+
+from common import percentile, temp_db_path
+
+import datagen
+from scenarios import SCENARIOS, Context
+from store import TodoStore
+
+
+def run_case(template, scenario, threads, ops, warmup, seed):
+    # 원본 DB 사본에서 scenario 를 threads 개 스레드로 총 ops 번 실행한다 (스레드마다 rng seed 고정)
+    path = temp_db_path("case.db")
+    shutil.copyfile(template, path)
+    store = TodoStore.open(path)
+    try:
+        ctx = Context(store)
+        fn = SCENARIOS[scenario]
+        warm_rng = random.Random(seed - 1)
+        for _ in range(warmup):
+            fn(ctx, warm_rng)
+
+        per_thread = [ops // threads + (1 if i < ops % threads else 0) for i in range(threads)]
+        latencies = [[] for _ in range(threads)]
+        errors = [0] * threads
+        barrier = threading.Barrier(threads + 1)
+
+        def loop(index):
+            rng = random.Random(seed * 1000 + index)
+            out = latencies[index]
+            barrier.wait()
+            for _ in range(per_thread[index]):
+                start = time.perf_counter()
+                try:
+                    fn(ctx, rng)
+                except Exception:
+                    errors[index] += 1
+                out.append(time.perf_counter() - start)
+
+        workers = [threading.Thread(target=loop, args=(i,), daemon=True) for i in range(threads)]
+        for t in workers:
+            t.start()
+        barrier.wait()
+        start = time.perf_counter()
+        for t in workers:
+            t.join()
+        elapsed = time.perf_counter() - start
+    finally:
+        store.pool.close()
+        shutil.rmtree(os.path.dirname(path), ignore_errors=True)
+
+    samples = [s for lat in latencies for s in lat]
+    return {
+        "ops": len(samples),
+        "errors": sum(errors),
+        "seconds": round(elapsed, 4),
+        "ops_per_sec": round(len(samples) / elapsed, 1) if elapsed else 0.0,
+        "p50_ms": round(percentile(samples, 50) * 1000, 3),
+        "p95_ms": round(percentile(samples, 95) * 1000, 3),
+        "p99_ms": round(percentile(samples, 99) * 1000, 3),
+        "max_ms": round(max(samples) * 1000, 3) if samples else 0.0,
+    }
+
+
+def compare(current, baseline, threshold):
+    # (시나리오, 스레드) 별 처리량/p99 변화율을 출력하고 회귀 항목 목록을 돌려준다
+    if current["meta"]["data"] != baseline["meta"]["data"]:
+        print("warning: baseline was generated with different data parameters")
+    regressions = []
+    print(f"\n{'case':<28}{'ops/s base':>12}{'ops/s now':>12}{'change':>9}{'p99 base':>11}{'p99 now':>10}{'change':>9}")
+    for scenario, cases in current["results"].items():
+        for key, now in cases.items():
+            base = baseline["results"].get(scenario, {}).get(key)
+            if base is None:
+                continue
+            tput = _change(now["ops_per_sec"], base["ops_per_sec"])
+            p99 = _change(now["p99_ms"], base["p99_ms"])
+            flag = ""
+            if tput < -threshold or p99 > threshold:
+                flag = "  REGRESSION"
+                regressions.append(f"{scenario}/{key}")
+            print(f"{scenario + '/' + key:<28}{base['ops_per_sec']:>12.1f}{now['ops_per_sec']:>12.1f}{tput:>8.1f}%"
+                  f"{base['p99_ms']:>11.3f}{now['p99_ms']:>10.3f}{p99:>8.1f}%{flag}")
+    return regressions
+
+
+def _change(now, base):
+    return (now - base) / base * 100 if base else 0.0
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--users", type=int, default=200)
+    parser.add_argument("--todos-per-user", type=int, default=50)
+    parser.add_argument("--completed-ratio", type=float, default=0.6)
+    parser.add_argument("--rewards", type=int, default=20)
+    parser.add_argument("--limited-ratio", type=float, default=0.3)
+    parser.add_argument("--purchases-per-user", type=int, default=5)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--scenarios", default=",".join(SCENARIOS), help="쉼표로 구분한 시나리오 이름")
+    parser.add_argument("--threads", default="1,8", help="쉼표로 구분한 동시 스레드 수")
+    parser.add_argument("--ops", type=int, default=2000, help="케이스당 총 실행 횟수")
+    parser.add_argument("--warmup", type=int, default=50)
+    parser.add_argument("--out", help="결과 JSON 파일")
+    parser.add_argument("--baseline", help="비교할 이전 결과 JSON 파일")
+    parser.add_argument("--threshold", type=float, default=10.0, help="회귀로 볼 변화율 (%%)")
+    args = parser.parse_args()
+
+    scenarios = [s.strip() for s in args.scenarios.split(",") if s.strip()]
+    unknown = [s for s in scenarios if s not in SCENARIOS]
+    if unknown:
+        parser.error(f"unknown scenarios: {', '.join(unknown)} (choose from {', '.join(SCENARIOS)})")
+    thread_counts = [int(t) for t in args.threads.split(",")]
+
+    data = {
+        "users": args.users,
+        "todos_per_user": args.todos_per_user,
+        "completed_ratio": args.completed_ratio,
+        "rewards": args.rewards,
+        "limited_ratio": args.limited_ratio,
+        "purchases_per_user": args.purchases_per_user,
+        "seed": args.seed,
+    }
+    template = temp_db_path("template.db")
+    start = time.perf_counter()
+    datagen.generate(template, **data)
+    print(f"generated {args.users} users x {args.todos_per_user} todos in {time.perf_counter() - start:.1f}s")
+
+    results = {}
+    for scenario in scenarios:
+        for threads in thread_counts:
+            r = run_case(template, scenario, threads, args.ops, args.warmup, args.seed)
+            results.setdefault(scenario, {})[f"t{threads}"] = r
+            print(f"{scenario:<18} threads={threads:<3} {r['ops_per_sec']:>9.1f} ops/s  "
+                  f"p50={r['p50_ms']:.3f}ms p95={r['p95_ms']:.3f}ms p99={r['p99_ms']:.3f}ms errors={r['errors']}")
+    shutil.rmtree(os.path.dirname(template), ignore_errors=True)
+
+    report = {
+        "meta": {
+            "data": data,
+            "ops": args.ops,
+            "warmup": args.warmup,
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "created_at": time.strftime("%Y-%m-%dT%H:%M:%S"),
+        },
+        "results": results,
+    }
+    if args.out:
+        with open(args.out, "w", encoding="utf-8") as f:
+            json.dump(report, f, ensure_ascii=False, indent=2)
+        print(f"wrote {args.out}")
+
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+        regressions = compare(report, baseline, args.threshold)
+        if regressions:
+            print(f"\n{len(regressions)} regression(s) over {args.threshold:.0f}%: {', '.join(regressions)}")
+            sys.exit(1)
+        print("\nno regressions")
+
+
+if __name__ == "__main__":
+    main()
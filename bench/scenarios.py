@@ -0,0 +1,109 @@
+# file: bench/scenarios.py
+# 부하 시나리오: 앱에서 사용자가 하는 동작 하나씩을 TodoStore 호출로 재현한다.
+# 시나리오는 fn(ctx, rng) 형태이고, 무작위 선택은 모두 넘겨받은 rng 로만 해서 seed 가 같으면 같은 순서로 돈다.
+import itertools
+import threading
+
+
+class Context:
+    # 생성된 DB 의 사용자/보상 id 목록과 store 를 들고 다닌다
+    def __init__(self, store):
+        self.store = store
+        with store.connection() as conn:
+            self.users = [tuple(r) for r in conn.execute("SELECT id, name FROM users ORDER BY id")]
+            self.rewards = [r[0] for r in conn.execute("SELECT id FROM rewards ORDER BY id")]
+        self._seq = itertools.count()
+        self._seq_lock = threading.Lock()
+
+    def next_seq(self):
+        with self._seq_lock:
+            return next(self._seq)
+
+    def user(self, rng):
+        return self.users[rng.randrange(len(self.users))]
+
+
+def signup(ctx, rng):
+    ctx.store.create_user(f"bench-new-{ctx.next_seq()}")
+
+
+def login(ctx, rng):
+    # 닉네임으로 찾고 상단 통계까지 읽는다 (로그인 직후 첫 화면)
+    user_id, name = ctx.user(rng)
+    ctx.store.get_user_by_name(name)
+    ctx.store.get_user_stats(user_id)
+
+
+def add_todo(ctx, rng):
+    user_id, _ = ctx.user(rng)
+    ctx.store.add_todo(user_id, f"bench todo {ctx.next_seq()}", rng.randint(1, 50))
+
+
+def complete_todo(ctx, rng):
+    # 진행 중 첫 페이지에서 하나를 골라 완료 (없으면 만들어서 완료)
+    user_id, _ = ctx.user(rng)
+    page = ctx.store.list_in_progress(user_id, 20)
+    if page.rows:
+        todo_id = page.rows[rng.randrange(len(page.rows))][0]
+    else:
+        todo_id = ctx.store.add_todo(user_id, "bench refill", 10)
+    ctx.store.complete_todos(user_id, [todo_id])
+
+
+def purchase(ctx, rng):
+    # 포인트 부족/품절도 실제로 일어나는 결과이므로 그대로 센다
+    user_id, _ = ctx.user(rng)
+    ctx.store.purchase_reward(user_id, ctx.rewards[rng.randrange(len(ctx.rewards))])
+
+
+def view_in_progress(ctx, rng):
+    ctx.store.list_in_progress(ctx.user(rng)[0], 20)
+
+
+def view_completed(ctx, rng):
+    ctx.store.list_completed(ctx.user(rng)[0], 20)
+
+
+def view_history(ctx, rng):
+    ctx.store.list_purchases(ctx.user(rng)[0], 20)
+
+
+def view_shop(ctx, rng):
+    ctx.store.get_user(ctx.user(rng)[0])
+    ctx.store.list_rewards()
+
+
+SCENARIOS = {
+    "signup": signup,
+    "login": login,
+    "add_todo": add_todo,
+    "complete_todo": complete_todo,
+    "purchase": purchase,
+    "view_in_progress": view_in_progress,
+    "view_completed": view_completed,
+    "view_history": view_history,
+    "view_shop": view_shop,
+}
+
+# 혼합 부하: 화면 보기가 대부분이고 쓰기가 섞인 비율
+MIX = {
+    "login": 5,
+    "view_in_progress": 30,
+    "view_completed": 15,
+    "view_history": 10,
+    "view_shop": 15,
+    "add_todo": 10,
+    "complete_todo": 10,
+    "purchase": 4,
+    "signup": 1,
+}
+
+
+def mixed(ctx, rng):
+    name = rng.choices(_MIX_NAMES, _MIX_WEIGHTS)[0]
+    SCENARIOS[name](ctx, rng)
+
+
+_MIX_NAMES = list(MIX)
+_MIX_WEIGHTS = [MIX[n] for n in _MIX_NAMES]
+SCENARIOS["mixed"] = mixed
@@ -0,0 +1,95 @@
+# file: bench/stress_purchase.py
+# 재고가 한정된 보상 하나를 여러 스레드가 동시에 구매하면서 불변식을 검사한다.
+#   - 성공한 구매 수 == 처음 재고, 남은 재고 == 0
+#   - 어떤 사용자도 포인트가 음수가 되지 않고, 차감된 포인트 합 == 성공 수 * 가격
+#   - purchases 행 수 == 성공 수
+# 불변식이 깨지면 종료 코드 1.
+#
+#   python bench/stress_purchase.py --threads 16 --stock 500 --users 40
+import argparse
+import sys
+import threading
+import time
+from collections import Counter
+
+from common import temp_db_path
+
+import migrations
+import services
+from db import ConnectionPool
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--users", type=int, default=40)
+    parser.add_argument("--stock", type=int, default=500)
+    parser.add_argument("--cost", type=int, default=7)
+    parser.add_argument("--points", type=int, default=100)
+    args = parser.parse_args()
+
+    pool = ConnectionPool(temp_db_path())
+    with pool.connection() as conn:
+        migrations.migrate(conn)
+        conn.executemany("INSERT INTO users (name, points) VALUES (?,?)",
+                         [(f"user{i}", args.points) for i in range(args.users)])
+        rid = conn.execute("INSERT INTO rewards (name,cost,description,stock) VALUES ('한정판',?,'',?)",
+                           (args.cost, args.stock)).lastrowid
+        conn.commit()
+
+    statuses = Counter()
+    lock = threading.Lock()
+
+    def buyer(index):
+        local = Counter()
+        user_id = index % args.users + 1
+        broke = 0
+        # 재고가 떨어지거나, 모든 사용자의 포인트가 바닥날 때까지 사용자를 바꿔 가며 구매
+        while broke < args.users:
+            with pool.connection() as conn:
+                result = services.purchase_reward(conn, user_id, rid)
+            local[result.status] += 1
+            if result.status is services.PurchaseStatus.OUT_OF_STOCK:
+                break
+            broke = broke + 1 if result.status is services.PurchaseStatus.INSUFFICIENT_POINTS else 0
+            user_id = user_id % args.users + 1
+        with lock:
+            statuses.update(local)
+
+    start = time.perf_counter()
+    threads = [threading.Thread(target=buyer, args=(i,)) for i in range(args.threads)]
+    for t in threads:
+        t.start()
+    for t in threads:
+        t.join()
+    elapsed = time.perf_counter() - start
+
+    with pool.connection() as conn:
+        stock = conn.execute("SELECT stock FROM rewards WHERE id=?", (rid,)).fetchone()[0]
+        purchases = conn.execute("SELECT COUNT(*) FROM purchases").fetchone()[0]
+        min_points, total_points = conn.execute("SELECT MIN(points), SUM(points) FROM users").fetchone()
+    pool.close()
+
+    ok = statuses[services.PurchaseStatus.OK]
+    attempts = sum(statuses.values())
+    print(f"{attempts} attempts in {elapsed:.2f}s ({attempts / elapsed:.0f}/s): "
+          + ", ".join(f"{s.value}={n}" for s, n in statuses.items()))
+    print(f"stock left={stock} purchases={purchases} min points={min_points}")
+
+    expected_sold = min(args.stock, args.users * (args.points // args.cost))
+    failures = []
+    if ok != expected_sold or purchases != ok:
+        failures.append(f"sold {ok} / recorded {purchases}, expected {expected_sold}")
+    if stock != args.stock - ok or stock < 0:
+        failures.append(f"stock {stock} != {args.stock} - {ok}")
+    if min_points < 0:
+        failures.append(f"negative points: {min_points}")
+    if total_points != args.users * args.points - ok * args.cost:
+        failures.append(f"points total {total_points} does not match {ok} purchases")
+    for failure in failures:
+        print("INVARIANT BROKEN:", failure)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
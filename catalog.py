@@ -0,0 +1,120 @@
+# file: catalog.py
+# 보상 목록 프로세스 단위 캐시.
+# 보상은 거의 바뀌지 않으므로 모든 세션이 같은 스냅샷을 공유하고, 보상 추가/수정/삭제와 재고 차감 때만 버전을 올려 비운다.
+# 캐시는 프로세스마다 따로이므로, 다른 프로세스(API 서버, manage.py 등)의 변경은 DB 의 catalog_version 으로 알아챈다.
+# rewards 가 바뀌면 트리거가 이 행의 버전을 올리고, 캐시는 REWARD_CACHE_CHECK_INTERVAL 초마다 한 번만
+# 기본키 조회로 버전을 확인한다 (그 사이의 재실행은 쿼리 없이 캐시를 받는다. 확인 횟수는 stats() 의 version_checks).
+# TODO_REWARD_CACHE_TTL 은 그와 별개로 스냅샷의 최대 유지 시간이다 (0 = 제한 없음).
+import threading
+import time
+
+import settings
+
+CATALOG_DDL = [
+    """CREATE TABLE IF NOT EXISTS catalog_version (
+           id INTEGER PRIMARY KEY CHECK (id = 1),
+           version INTEGER NOT NULL)""",
+    "INSERT OR IGNORE INTO catalog_version (id, version) VALUES (1, 0)",
+    """CREATE TRIGGER IF NOT EXISTS rewards_version_ai AFTER INSERT ON rewards BEGIN
+           UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+       END""",
+    # 무제한 보상 구매도 stock 을 같은 값으로 UPDATE 하므로, 값이 실제로 바뀐 경우만 센다
+    """CREATE TRIGGER IF NOT EXISTS rewards_version_au AFTER UPDATE ON rewards
+       WHEN OLD.name IS NOT NEW.name OR OLD.cost IS NOT NEW.cost
+         OR OLD.description IS NOT NEW.description OR OLD.stock IS NOT NEW.stock BEGIN
+           UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS rewards_version_ad AFTER DELETE ON rewards BEGIN
+           UPDATE catalog_version SET version = version + 1 WHERE id = 1;
+       END""",
+]
+
+
+def create_tables(conn):
+    for stmt in CATALOG_DDL:
+        conn.execute(stmt)
+
+
+def read_version(conn):
+    return conn.execute("SELECT version FROM catalog_version WHERE id = 1").fetchone()[0]
+
+
+class RewardCatalog:
+    def __init__(self, ttl=None, check_interval=None):
+        self.ttl = settings.REWARD_CACHE_TTL if ttl is None else ttl
+        self.check_interval = settings.REWARD_CACHE_CHECK_INTERVAL if check_interval is None else check_interval
+        self._lock = threading.Lock()
+        self._rows = None
+        self._loaded_at = 0.0
+        # 스냅샷의 catalog_version 과 마지막으로 확인한 시각 (다른 프로세스의 변경 확인용)
+        self._db_version = None
+        self._checked_at = 0.0
+        self.version = 0
+        self.hits = 0
+        self.misses = 0
+        self.invalidations = 0
+        self.version_checks = 0
+
+    def get(self, loader, read_version=None):
+        # 캐시가 비었거나 만료됐으면 loader() 로 다시 읽는다.
+        # read_version() 은 DB 의 catalog_version 을 돌려준다. check_interval 초가 지났을 때만 불러서
+        # 스냅샷과 다르면 다시 읽는다.
+        now = time.monotonic()
+        with self._lock:
+            rows = self._rows
+            fresh = rows is not None and (not self.ttl or now - self._loaded_at < self.ttl)
+            if fresh and (read_version is None or now - self._checked_at < self.check_interval):
+                self.hits += 1
+                return rows
+            version = self.version
+        db_version = None
+        if read_version is not None:
+            db_version = read_version()
+            with self._lock:
+                self.version_checks += 1
+                if fresh and self._rows is rows and db_version == self._db_version:
+                    self._checked_at = now
+                    self.hits += 1
+                    return rows
+        with self._lock:
+            self.misses += 1
+        rows = tuple(loader())
+        with self._lock:
+            # 읽는 사이에 무효화됐으면 오래된 결과를 저장하지 않는다
+            if self.version == version:
+                self._rows = rows
+                self._loaded_at = self._checked_at = now
+                self._db_version = db_version
+        return rows
+
+    def invalidate(self):
+        with self._lock:
+            self.version += 1
+            self._rows = None
+            self.invalidations += 1
+
+    def stats(self):
+        with self._lock:
+            return {
+                "version": self.version,
+                "db_version": self._db_version,
+                "hits": self.hits,
+                "misses": self.misses,
+                "invalidations": self.invalidations,
+                "version_checks": self.version_checks,
+                "cached": self._rows is not None,
+            }
+
+
+# ---------- DB 파일별 캐시 ----------
+_catalogs = {}
+_catalogs_lock = threading.Lock()
+
+
+def get_catalog(path):
+    with _catalogs_lock:
+        catalog = _catalogs.get(path)
+        if catalog is None:
+            catalog = RewardCatalog()
+            _catalogs[path] = catalog
+        return catalog
@@ -0,0 +1,277 @@
+# file: db.py
+# 프로세스 단위 SQLite 연결 풀.
+# Streamlit은 버튼을 누를 때마다 스크립트를 다시 실행하지만 import 된 모듈은 그대로 남으므로,
+# 여기서 만든 풀은 모든 재실행/세션이 함께 쓴다.
+import queue
+import sqlite3
+import threading
+import time
+from concurrent.futures import Future
+from contextlib import contextmanager
+
+import settings
+from metrics import connection_factory
+
+
+SYNCHRONOUS_MODES = ("OFF", "NORMAL", "FULL", "EXTRA")
+
+
+def default_pragmas():
+    if settings.DB_SYNCHRONOUS not in SYNCHRONOUS_MODES:
+        raise ValueError(f"TODO_DB_SYNCHRONOUS must be one of {', '.join(SYNCHRONOUS_MODES)}")
+    return {
+        "synchronous": settings.DB_SYNCHRONOUS,
+        "cache_size": settings.DB_CACHE_SIZE,
+        "mmap_size": settings.DB_MMAP_SIZE,
+        "temp_store": "MEMORY",
+    }
+
+
+class ConnectionPool:
+    # 연결은 한 번에 한 스레드만 빌려 쓴다. 같은 스레드가 다시 요청하면 빌린 연결을 그대로 돌려준다.
+    def __init__(self, path, pragmas=None, busy_timeout_ms=None, max_idle=None):
+        self.path = path
+        self.pragmas = default_pragmas()
+        if pragmas:
+            self.pragmas.update(pragmas)
+        self.busy_timeout_ms = settings.DB_BUSY_TIMEOUT_MS if busy_timeout_ms is None else busy_timeout_ms
+        self.max_idle = settings.DB_POOL_MAX_IDLE if max_idle is None else max_idle
+        self._idle = []
+        self._lock = threading.Lock()
+        self._local = threading.local()
+        self._closed = False
+        self.created = 0
+
+    def _connect(self):
+        conn = sqlite3.connect(self.path, timeout=self.busy_timeout_ms / 1000.0, check_same_thread=False,
+                               factory=connection_factory())
+        conn.execute(f"PRAGMA busy_timeout={int(self.busy_timeout_ms)}")
+        # WAL: 읽기와 쓰기가 서로를 막지 않는다 (파일에 기록되므로 한 번만 바뀌지만 매번 확인해도 저렴하다)
+        conn.execute("PRAGMA journal_mode=WAL")
+        for name, value in self.pragmas.items():
+            conn.execute(f"PRAGMA {name}={value}")
+        with self._lock:
+            self.created += 1
+        return conn
+
+    def acquire(self):
+        conn = getattr(self._local, "conn", None)
+        if conn is not None:
+            self._local.depth += 1
+            return conn
+        with self._lock:
+            if self._closed:
+                raise sqlite3.ProgrammingError("connection pool is closed")
+            conn = self._idle.pop() if self._idle else None
+        if conn is None:
+            conn = self._connect()
+        self._local.conn = conn
+        self._local.depth = 1
+        return conn
+
+    def release(self, conn):
+        if getattr(self._local, "conn", None) is not conn:
+            raise ValueError("connection was not acquired by this thread")
+        self._local.depth -= 1
+        if self._local.depth > 0:
+            return
+        self._local.conn = None
+        # 끝나지 않은 트랜잭션은 다음 사용자에게 넘기지 않는다
+        if conn.in_transaction:
+            conn.rollback()
+        with self._lock:
+            if not self._closed and len(self._idle) < self.max_idle:
+                self._idle.append(conn)
+                return
+        conn.close()
+
+    @contextmanager
+    def connection(self):
+        conn = self.acquire()
+        try:
+            yield conn
+        finally:
+            self.release(conn)
+
+    def close(self):
+        with self._lock:
+            self._closed = True
+            idle, self._idle = self._idle, []
+        for conn in idle:
+            conn.close()
+
+
+# ---------- 프로세스 단위 풀 ----------
+_pools = {}
+# 그룹 커밋 스레드도 같은 잠금으로 DB 파일별 하나씩 (get_writer)
+_writers = {}
+_pools_lock = threading.Lock()
+
+
+def get_pool(path=None, **options):
+    path = path or settings.DB_PATH
+    with _pools_lock:
+        pool = _pools.get(path)
+        if pool is None:
+            pool = ConnectionPool(path, **options)
+            _pools[path] = pool
+        return pool
+
+
+def close_pools():
+    with _pools_lock:
+        pools = list(_pools.values())
+        _pools.clear()
+        writers = list(_writers.values())
+        _writers.clear()
+    for writer in writers:
+        writer.close()
+    for pool in pools:
+        pool.close()
+
+
+# ---------- 트랜잭션 ----------
+@contextmanager
+def transaction(conn, immediate=True):
+    # BEGIN IMMEDIATE 로 쓰기 잠금을 먼저 잡아, 읽고-검사하고-쓰는 사이에 다른 쓰기가 끼어들지 못하게 한다.
+    # 블록이 예외 없이 끝나면 커밋, 아니면 롤백.
+    # 이미 트랜잭션 안이면 SAVEPOINT 로 감싸서, 실패 시 이 블록의 변경만 되돌린다.
+    if conn.in_transaction:
+        conn.execute("SAVEPOINT nested")
+        try:
+            yield conn
+        except BaseException:
+            conn.execute("ROLLBACK TO nested")
+            conn.execute("RELEASE nested")
+            raise
+        else:
+            conn.execute("RELEASE nested")
+        return
+    conn.execute("BEGIN IMMEDIATE" if immediate else "BEGIN")
+    try:
+        yield conn
+    except BaseException:
+        conn.rollback()
+        raise
+    else:
+        conn.commit()
+
+
+# ---------- 그룹 커밋 ----------
+class GroupCommitWriter:
+    # 여러 스레드(세션)의 쓰기를 전용 스레드 하나가 모아서 한 트랜잭션으로 커밋한다.
+    # 첫 쓰기가 들어오면 window_ms 동안(또는 max_batch 개까지) 더 모은 뒤 BEGIN IMMEDIATE ... COMMIT 한 번으로 처리하므로
+    # 동시 쓰기가 많을 때 커밋(fsync)과 쓰기 잠금 경합이 배치당 한 번으로 줄어든다.
+    # 쓰기마다 SAVEPOINT 로 감싸서 하나가 실패해도 그 쓰기만 되돌리고 나머지는 커밋한다.
+    # 호출한 쪽은 커밋이 끝난 뒤에 결과를 받으므로 일반 트랜잭션과 같은 내구성을 갖는다.
+    def __init__(self, pool, window_ms=None, max_batch=None):
+        self.pool = pool
+        self.window = (settings.DB_GROUP_COMMIT_WINDOW_MS if window_ms is None else window_ms) / 1000.0
+        self.max_batch = settings.DB_GROUP_COMMIT_MAX_BATCH if max_batch is None else max_batch
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(target=self._run, name="todo-group-commit", daemon=True)
+        self._closed = False
+        # 종료 확인과 큐 넣기를 한 번에 해서, 종료 신호(None) 뒤에 작업이 들어가 영원히 기다리는 일이 없게 한다
+        self._lock = threading.Lock()
+        self._last_batch = 1
+        self.batches = 0
+        self.writes = 0
+        self._thread.start()
+
+    def submit(self, fn, *args):
+        # fn(conn, *args) 를 다음 배치에서 실행한다. 커밋 후 결과가 채워지는 Future 를 돌려준다.
+        future = Future()
+        with self._lock:
+            if self._closed:
+                raise sqlite3.ProgrammingError("group commit writer is closed")
+            self._queue.put((fn, args, future))
+        return future
+
+    def call(self, fn, *args):
+        return self.submit(fn, *args).result()
+
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+            self._queue.put(None)
+        self._thread.join()
+        # 스레드가 끝난 뒤 남은 작업이 있으면 기다리는 호출자가 멈추지 않도록 모두 실패시킨다
+        while True:
+            try:
+                job = self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if job is not None and job[2].set_running_or_notify_cancel():
+                job[2].set_exception(sqlite3.ProgrammingError("group commit writer is closed"))
+
+    def _collect(self):
+        first = self._queue.get()
+        if first is None:
+            return None
+        batch = [first]
+        # 직전 배치가 한 건뿐이었으면 동시 쓰기가 없는 것으로 보고 기다리지 않는다 (혼자 쓸 때 지연을 더하지 않음)
+        deadline = time.monotonic() + (self.window if self._last_batch > 1 else 0)
+        while len(batch) < self.max_batch:
+            remaining = deadline - time.monotonic()
+            try:
+                job = self._queue.get(timeout=remaining) if remaining > 0 else self._queue.get_nowait()
+            except queue.Empty:
+                break
+            if job is None:
+                # 종료 신호는 이번 배치를 처리한 뒤에 받도록 다시 넣는다
+                self._queue.put(None)
+                break
+            batch.append(job)
+        self._last_batch = len(batch)
+        return batch
+
+    def _run(self):
+        while True:
+            batch = self._collect()
+            if batch is None:
+                return
+            self._commit(batch)
+
+    def _commit(self, batch):
+        outcomes = []
+        try:
+            with self.pool.connection() as conn:
+                with transaction(conn):
+                    for fn, args, future in batch:
+                        if not future.set_running_or_notify_cancel():
+                            continue
+                        conn.execute("SAVEPOINT job")
+                        try:
+                            result = fn(conn, *args)
+                        except BaseException as e:
+                            conn.execute("ROLLBACK TO job")
+                            conn.execute("RELEASE job")
+                            outcomes.append((future, None, e))
+                        else:
+                            conn.execute("RELEASE job")
+                            outcomes.append((future, result, None))
+        except BaseException as e:
+            # BEGIN/COMMIT 자체가 실패하면 (잠금 대기 초과 등) 배치 전체가 실패한다
+            for _fn, _args, future in batch:
+                if not future.done():
+                    future.set_exception(e)
+            return
+        self.batches += 1
+        self.writes += len(outcomes)
+        for future, result, error in outcomes:
+            if error is not None:
+                future.set_exception(error)
+            else:
+                future.set_result(result)
+
+
+def get_writer(pool):
+    # 풀(DB 파일)마다 하나의 그룹 커밋 스레드
+    with _pools_lock:
+        writer = _writers.get(pool.path)
+        if writer is None:
+            writer = GroupCommitWriter(pool)
+            _writers[pool.path] = writer
+        return writer
@@ -1,177 +1,124 @@
 # file: todo_points_app.py
 import streamlit as st
-import sqlite3
-from datetime import datetime
-import os
 import traceback
 import sys
-import time
+import os
+import tempfile
+from streamlit.errors import StreamlitAPIException
 
-# ---------- 설정 ----------
-DB_FILENAME = "todo_points.db"
-DB_PATH = os.path.join(os.getcwd(), DB_FILENAME)
+import metrics
+import recurring
+from services import PurchaseStatus, parse_todo_import
+from settings import DB_PATH, PAGE_SIZE
+from store import TodoStore
 
-# ---------- 안전한 재실행 유틸 ----------
-def safe_rerun():
-    try:
-        if hasattr(st, "experimental_rerun"):
-            try:
-                st.experimental_rerun()
-                return
-            except Exception:
-                pass
-        if hasattr(st, "experimental_set_query_params"):
-            st.experimental_set_query_params(_rerun=int(time.time() * 1000))
-            return
-    except Exception:
-        pass
-    st.session_state["_force_rerun"] = not st.session_state.get("_force_rerun", False)
+# ---------- 프래그먼트 / 재실행 유틸 ----------
+# 화면을 프래그먼트(계정, 보상 관리, 할일 목록, 보상 샵, 구매 이력, 할일 추가)로 나눈다.
+# 프래그먼트 안의 버튼을 누르면 그 프래그먼트만 다시 실행되므로, 할일 하나를 완료해도
+# 보상 목록/구매 이력 쿼리는 다시 돌지 않는다.
+# st.fragment (1.37+) 또는 st.experimental_fragment (1.33+) 가 없으면 일반 함수 호출로 동작한다.
+_fragment = getattr(st, "fragment", None) or getattr(st, "experimental_fragment", None)
 
-# ---------- 앱 본문 ----------
-def run_app():
-    # DB 연결
-    def get_conn(path=DB_PATH):
-        try:
-            conn = sqlite3.connect(path, check_same_thread=False)
-            return conn
-        except Exception as e:
-            st.error("DB 연결 오류가 발생했습니다: " + str(e))
-            st.stop()
-
-    conn = get_conn()
-    c = conn.cursor()
-
-    # 컬럼 존재 여부 확인 유틸
-    def has_column(table, column):
-        cols = c.execute(f"PRAGMA table_info('{table}')").fetchall()
-        col_names = [r[1] for r in cols]
-        return column in col_names
-
-    # DB 초기화 및 마이그레이션
-    def init_db():
-        # 기본 테이블 생성(없으면)
-        c.execute("""CREATE TABLE IF NOT EXISTS users (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        name TEXT UNIQUE,
-                        points INTEGER DEFAULT 0
-                     )""")
-
-        c.execute("""CREATE TABLE IF NOT EXISTS todos (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        user_id INTEGER,
-                        title TEXT,
-                        points_reward INTEGER,
-                        completed INTEGER DEFAULT 0,
-                        created_at TEXT,
-                        completed_at TEXT)""")
-
-        c.execute("""CREATE TABLE IF NOT EXISTS rewards (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        name TEXT,
-                        cost INTEGER,
-                        description TEXT
-                     )""")
-
-        c.execute("""CREATE TABLE IF NOT EXISTS purchases (
-                        id INTEGER PRIMARY KEY AUTOINCREMENT,
-                        user_id INTEGER,
-                        reward_id INTEGER,
-                        purchased_at TEXT)""")
-        conn.commit()
-
-        # users.created_at 컬럼이 없으면 추가
-        try:
-            if not has_column("users", "created_at"):
-                c.execute("ALTER TABLE users ADD COLUMN created_at TEXT")
-                conn.commit()
-        except Exception as e:
-            st.warning("users 테이블 마이그레이션 경고: " + str(e))
 
-        # rewards.stock 컬럼이 없으면 추가 (기존 DB에 컬럼이 없을 때 대비)
-        try:
-            if not has_column("rewards", "stock"):
-                c.execute("ALTER TABLE rewards ADD COLUMN stock INTEGER DEFAULT -1")
-                conn.commit()
-        except Exception as e:
-            st.warning("rewards 테이블에 stock 컬럼 추가 중 경고: " + str(e))
+def fragment(fn):
+    return _fragment(fn) if _fragment is not None else fn
 
-    init_db()
 
-    # 초기 보상 데이터(한 번만)
-    def init_rewards():
+def rerun(scope="app"):
+    # scope="fragment": 지금 실행 중인 프래그먼트만 다시 그린다.
+    # 다른 프래그먼트의 데이터도 바뀌는 동작(로그인, 구매, 보상 관리, 할일 추가)은 scope="app".
+    # 프래그먼트 밖이거나 scope 인자를 모르는 버전이면 앱 전체를 다시 실행한다.
+    if scope == "fragment" and _fragment is not None:
         try:
-            existing = c.execute("SELECT COUNT(*) FROM rewards").fetchone()[0]
-            if existing == 0:
-                items = [
-                    ("5분 휴식권", 15, "짧은 휴식으로 재충전하세요", -1),
-                    ("간식권", 30, "작은 간식을 받을 수 있는 쿠폰", 10),
-                    ("30분 자유시간", 60, "집중 해제 시간", 5),
-                ]
-                # INSERT 문은 컬럼 수가 변경되었을 수 있으니 컬럼명 명시
-                c.executemany("INSERT INTO rewards (name,cost,description,stock) VALUES (?,?,?,?)", items)
-                conn.commit()
-        except Exception as e:
-            st.warning("초기 보상 데이터 삽입 중 오류: " + str(e))
+            st.rerun(scope="fragment")
+        except (TypeError, StreamlitAPIException):
+            pass
+    if hasattr(st, "rerun"):
+        st.rerun()
+    st.experimental_rerun()
+
+# ---------- 페이지 이동 유틸 ----------
+# 목록마다 지나온 페이지의 커서를 스택으로 보관한다 (맨 위가 현재 페이지, None 은 첫 페이지)
+def page_cursor(key):
+    stack = st.session_state.setdefault(f"{key}_cursors", [None])
+    return stack[-1]
+
+def page_nav(key, next_cursor):
+    # 페이지 이동은 목록이 있는 프래그먼트만 다시 그린다
+    stack = st.session_state.setdefault(f"{key}_cursors", [None])
+    if len(stack) == 1 and next_cursor is None:
+        return
+    cols = st.columns([1,1,4])
+    if len(stack) > 1 and cols[0].button("이전", key=f"{key}_prev"):
+        stack.pop()
+        rerun("fragment")
+    if next_cursor is not None and cols[1].button("더 보기", key=f"{key}_next"):
+        stack.append(next_cursor)
+        rerun("fragment")
+    cols[2].caption(f"{len(stack)} 페이지")
+
+# ---------- 오류 표시 ----------
+def show_error(message):
+    # 잡은 예외를 화면에 보여 주기 전에 지금 그리는 구역(metrics.timed)의 오류로 센다
+    metrics.record_error("render.rerun")
+    st.error(message)
 
-    init_rewards()
+# ---------- 앱 본문 ----------
+def run_app():
+    # DB 연결: 프로세스 단위 풀에서 빌려 쓰고, 재실행이 끝나면(st.stop / 재실행 예외 포함) 반납
+    # store 메서드는 이 스레드가 빌린 연결을 그대로 재사용하므로 재실행 한 번에 연결 대여는 한 번이다
+    # (프래그먼트만 다시 실행될 때는 여기를 거치지 않고 store 메서드가 호출마다 빌려 쓴다)
+    try:
+        # 스키마 생성/마이그레이션/초기 보상 데이터, 계측 내보내기는 프로세스당 한 번만
+        metrics.start_exporters()
+        store = TodoStore.open(DB_PATH)
+        # 반복 미션 스케줄러 스레드도 프로세스당 하나 (TODO_RECURRING_INTERVAL=0 이면 목록을 볼 때만 만든다)
+        recurring.start_scheduler(store)
+        conn = store.pool.acquire()
+    except Exception as e:
+        show_error("DB 연결 오류가 발생했습니다: " + str(e))
+        st.stop()
+    try:
+        with metrics.timed("render.rerun"):
+            render_app(store)
+    finally:
+        store.pool.release(conn)
 
-    # 유틸 함수들
-    def get_user_by_name(name):
-        return c.execute("SELECT id,name,points FROM users WHERE name=?", (name,)).fetchone()
 
-    def create_user(name):
-        try:
-            now = datetime.now().isoformat()
-            if has_column("users", "created_at"):
-                c.execute("INSERT INTO users (name, points, created_at) VALUES (?,?,?)", (name, 0, now))
-            else:
-                c.execute("INSERT INTO users (name, points) VALUES (?,?)", (name, 0))
-            conn.commit()
-            return get_user_by_name(name)
-        except sqlite3.IntegrityError:
-            return None
-        except Exception as e:
-            st.error("회원 생성 중 오류가 발생했습니다: " + str(e))
-            return None
+# 데이터 접근은 store.TodoStore 가 맡고, 여기서는 화면과 오류 표시만 다룬다
+def create_user(store, name):
+    try:
+        return store.create_user(name)
+    except Exception as e:
+        show_error("회원 생성 중 오류가 발생했습니다: " + str(e))
+        return None
 
-    def update_user_points(user_id, delta):
-        c.execute("UPDATE users SET points = points + ? WHERE id=?", (delta, user_id))
-        conn.commit()
+def add_reward(store, name, cost, description, stock):
+    try:
+        store.add_reward(name, cost, description, stock)
+        return True
+    except Exception as e:
+        show_error("보상 추가 중 오류: " + str(e))
+        return False
 
-    def add_reward(name, cost, description, stock):
-        try:
-            c.execute("INSERT INTO rewards (name,cost,description,stock) VALUES (?,?,?,?)",
-                      (name, cost, description, stock))
-            conn.commit()
-            return True
-        except Exception as e:
-            st.error("보상 추가 중 오류: " + str(e))
-            return False
+def update_reward(store, rid, name, cost, description, stock):
+    try:
+        store.update_reward(rid, name, cost, description, stock)
+        return True
+    except Exception as e:
+        show_error("보상 수정 중 오류: " + str(e))
+        return False
 
-    def update_reward(rid, name, cost, description, stock):
-        try:
-            # 컬럼이 존재하지 않을 가능성 대비: 만약 stock 컬럼이 없으면 stock 업데이트는 무시
-            if has_column("rewards", "stock"):
-                c.execute("UPDATE rewards SET name=?, cost=?, description=?, stock=? WHERE id=?",
-                          (name, cost, description, stock, rid))
-            else:
-                c.execute("UPDATE rewards SET name=?, cost=?, description=? WHERE id=?",
-                          (name, cost, description, rid))
-            conn.commit()
-            return True
-        except Exception as e:
-            st.error("보상 수정 중 오류: " + str(e))
-            return False
+def delete_reward(store, rid):
+    try:
+        store.delete_reward(rid)
+        return True
+    except Exception as e:
+        show_error("보상 삭제 중 오류: " + str(e))
+        return False
 
-    def delete_reward(rid):
-        try:
-            c.execute("DELETE FROM rewards WHERE id=?", (rid,))
-            conn.commit()
-            return True
-        except Exception as e:
-            st.error("보상 삭제 중 오류: " + str(e))
-            return False
 
+def render_app(store):
     # UI 시작
     st.set_page_config(page_title="할일로 포인트 모으기", layout="wide")
     st.title("할일로 포인트 모으기")
@@ -179,265 +126,525 @@ def run_app():
     # 세션 초기화
     if "user" not in st.session_state:
         st.session_state.user = None
-    if "_force_rerun" not in st.session_state:
-        st.session_state["_force_rerun"] = False
-
-    # 사이드바: 계정 + 보상 관리
-    st.sidebar.markdown("## 계정")
-    mode = st.sidebar.radio("모드 선택", ("로그인", "회원가입"))
-
-    if mode == "회원가입":
-        st.sidebar.header("회원가입")
-        new_name = st.sidebar.text_input("닉네임을 입력하세요", key="signup_name")
-        if st.sidebar.button("회원가입"):
-            if not new_name or new_name.strip() == "":
-                st.sidebar.error("닉네임을 입력하세요.")
-            else:
-                if get_user_by_name(new_name.strip()):
-                    st.sidebar.error("이미 존재하는 닉네임입니다.")
+
+    # 사이드바: 계정 + 보상 관리 (프래그먼트는 st.sidebar 에 직접 쓸 수 없으므로 사이드바 안에서 호출)
+    with st.sidebar:
+        account_section(store)
+        reward_admin_section(store)
+
+    # 로그인 후 메인 화면
+    if st.session_state.user:
+        # 좌측/우측 레이아웃: 포인트 + 미션 탭 / 보상 샵 + 구매 이력
+        left, right = st.columns([3,2])
+        with left:
+            todo_section(store)
+        with right:
+            shop_section(store)
+            history_section(store)
+        analytics_section(store)
+
+        with st.sidebar:
+            sidebar_todo_section(store)
+            # 로그아웃
+            if st.button("로그아웃"):
+                st.session_state.user = None
+                discard_export()
+                rerun("app")
+
+    else:
+        st.info("왼쪽 사이드바에서 로그인 또는 회원가입을 해주세요.")
+
+
+# ---------- 사이드바: 계정 ----------
+@fragment
+def account_section(store):
+    with metrics.timed("render.account"):
+        st.markdown("## 계정")
+        mode = st.radio("모드 선택", ("로그인", "회원가입"))
+
+        if mode == "회원가입":
+            st.header("회원가입")
+            new_name = st.text_input("닉네임을 입력하세요", key="signup_name")
+            if st.button("회원가입"):
+                if not new_name or new_name.strip() == "":
+                    st.error("닉네임을 입력하세요.")
                 else:
-                    user_row = create_user(new_name.strip())
+                    if store.get_user_by_name(new_name.strip()):
+                        st.error("이미 존재하는 닉네임입니다.")
+                    else:
+                        user_row = create_user(store, new_name.strip())
+                        if user_row:
+                            st.success("회원가입 완료 — 자동 로그인됩니다.")
+                            st.session_state.user = {"id": user_row[0], "name": user_row[1], "points": user_row[2]}
+                            rerun("app")
+                        else:
+                            st.error("회원가입 실패")
+
+        else:
+            st.header("로그인")
+            name = st.text_input("닉네임", key="login_name")
+            if st.button("로그인"):
+                if not name or name.strip() == "":
+                    st.error("닉네임을 입력하세요.")
+                else:
+                    user_row = store.get_user_by_name(name.strip())
                     if user_row:
-                        st.sidebar.success("회원가입 완료 — 자동 로그인됩니다.")
                         st.session_state.user = {"id": user_row[0], "name": user_row[1], "points": user_row[2]}
-                        safe_rerun()
+                        st.success(f"{name.strip()}님, 로그인되었습니다.")
+                        rerun("app")
                     else:
-                        st.sidebar.error("회원가입 실패")
-
-    else:
-        st.sidebar.header("로그인")
-        name = st.sidebar.text_input("닉네임", key="login_name")
-        if st.sidebar.button("로그인"):
-            if not name or name.strip() == "":
-                st.sidebar.error("닉네임을 입력하세요.")
-            else:
-                user_row = get_user_by_name(name.strip())
-                if user_row:
-                    st.session_state.user = {"id": user_row[0], "name": user_row[1], "points": user_row[2]}
-                    st.sidebar.success(f"{name.strip()}님, 로그인되었습니다.")
-                    safe_rerun()
+                        st.error("등록된 사용자가 없습니다. 회원가입 해주세요.")
+
+
+# ---------- 사이드바: 보상 관리 ----------
+# 보상이 바뀌면 보상 샵도 바뀌어야 하므로 저장/삭제 후에는 앱 전체를 다시 그린다
+@fragment
+def reward_admin_section(store):
+    with metrics.timed("render.reward_admin"):
+        st.markdown("---")
+        st.markdown("## 보상 관리 (직접 설정)")
+        with st.expander("새 보상 추가"):
+            rn = st.text_input("보상 이름", key="r_name")
+            rc = st.number_input("필요 포인트", min_value=0, value=10, key="r_cost")
+            rd = st.text_input("설명", key="r_desc")
+            rs = st.number_input("수량 (무제한:-1)", value=-1, key="r_stock")
+            if st.button("보상 추가", key="add_reward_btn"):
+                if not rn or rn.strip() == "":
+                    st.error("보상 이름을 입력하세요.")
                 else:
-                    st.sidebar.error("등록된 사용자가 없습니다. 회원가입 해주세요.")
-
-    # 보상 관리(사이드바)
-    st.sidebar.markdown("---")
-    st.sidebar.markdown("## 보상 관리 (직접 설정)")
-    with st.sidebar.expander("새 보상 추가"):
-        rn = st.text_input("보상 이름", key="r_name")
-        rc = st.number_input("필요 포인트", min_value=0, value=10, key="r_cost")
-        rd = st.text_input("설명", key="r_desc")
-        rs = st.number_input("수량 (무제한:-1)", value=-1, key="r_stock")
-        if st.button("보상 추가", key="add_reward_btn"):
-            if not rn or rn.strip() == "":
-                st.sidebar.error("보상 이름을 입력하세요.")
-            else:
-                ok = add_reward(rn.strip(), int(rc), rd.strip(), int(rs))
-                if ok:
-                    st.sidebar.success("보상이 추가되었습니다.")
-                    safe_rerun()
-
-    # 보상 목록 편집 (사이드바)
-    try:
-        rewards_for_edit = c.execute("SELECT id,name,cost,description,stock FROM rewards ORDER BY id").fetchall()
-    except Exception:
-        # 만약 stock 컬럼이 없으면 stock 없이 가져오기
-        rewards_for_edit = c.execute("SELECT id,name,cost,description FROM rewards ORDER BY id").fetchall()
-        # 변환: 튜플 길이를 맞추기 위해 stock을 None으로 채움
-        rewards_for_edit = [r + (None,) if len(r) == 4 else r for r in rewards_for_edit]
-
-    if rewards_for_edit:
-        with st.sidebar.expander("보상 목록 수정/삭제"):
-            for r in rewards_for_edit:
-                rid, rname, rcost, rdesc, rstock = r
-                cols = st.columns([2,1,1])
-                cols[0].markdown(f"**{rname}**")
-                if cols[1].button("편집", key=f"edit_{rid}"):
-                    st.session_state[f"edit_{rid}"] = True
-                if cols[2].button("삭제", key=f"del_{rid}"):
-                    if delete_reward(rid):
-                        st.sidebar.success("삭제되었습니다.")
-                        safe_rerun()
-                if st.session_state.get(f"edit_{rid}", False):
-                    with st.form(key=f"form_{rid}"):
-                        iname = st.text_input("이름", value=rname, key=f"iname_{rid}")
-                        icost = st.number_input("포인트", min_value=0, value=rcost, key=f"icost_{rid}")
-                        idesc = st.text_input("설명", value=rdesc, key=f"idesc_{rid}")
-                        istock = st.number_input("수량 (-1=무제한)", value=(rstock if rstock is not None else -1), key=f"istock_{rid}")
-                        submitted = st.form_submit_button("저장")
-                        if submitted:
-                            if update_reward(rid, iname.strip(), int(icost), idesc.strip(), int(istock)):
-                                st.success("수정 완료")
-                                st.session_state[f"edit_{rid}"] = False
-                                safe_rerun()
+                    ok = add_reward(store, rn.strip(), int(rc), rd.strip(), int(rs))
+                    if ok:
+                        st.success("보상이 추가되었습니다.")
+                        rerun("app")
 
-    # 로그인 후 메인 화면
-    if st.session_state.user:
-        user = st.session_state.user
+        # 보상 목록 편집
+        try:
+            rewards_for_edit = store.list_rewards()
+        except Exception as e:
+            show_error("보상 목록 조회 오류: " + str(e))
+            rewards_for_edit = []
+
+        if rewards_for_edit:
+            with st.expander("보상 목록 수정/삭제"):
+                for r in rewards_for_edit:
+                    rid, rname, rcost, rdesc, rstock = r
+                    cols = st.columns([2,1,1])
+                    cols[0].markdown(f"**{rname}**")
+                    if cols[1].button("편집", key=f"edit_{rid}"):
+                        st.session_state[f"edit_{rid}"] = True
+                    if cols[2].button("삭제", key=f"del_{rid}"):
+                        if delete_reward(store, rid):
+                            st.success("삭제되었습니다.")
+                            rerun("app")
+                    if st.session_state.get(f"edit_{rid}", False):
+                        with st.form(key=f"form_{rid}"):
+                            iname = st.text_input("이름", value=rname, key=f"iname_{rid}")
+                            icost = st.number_input("포인트", min_value=0, value=rcost, key=f"icost_{rid}")
+                            idesc = st.text_input("설명", value=rdesc, key=f"idesc_{rid}")
+                            istock = st.number_input("수량 (-1=무제한)", value=(rstock if rstock is not None else -1), key=f"istock_{rid}")
+                            submitted = st.form_submit_button("저장")
+                            if submitted:
+                                if update_reward(store, rid, iname.strip(), int(icost), idesc.strip(), int(istock)):
+                                    st.success("수정 완료")
+                                    st.session_state[f"edit_{rid}"] = False
+                                    rerun("app")
+
+
+# ---------- 포인트 + 할일 목록 ----------
+# 할일 완료/삭제, 페이지 이동은 이 프래그먼트만 다시 그린다 (포인트 지표도 여기 있으므로 함께 갱신된다)
+@fragment
+def todo_section(store):
+    user = st.session_state.user
+    if not user:
+        return
+    with metrics.timed("render.stats"):
+        # 포인트와 누적 통계는 user_stats 요약 행에서 한 번에 읽는다 (집계 쿼리 없음)
+        stats = None
         try:
-            row = c.execute("SELECT points FROM users WHERE id=?", (user["id"],)).fetchone()
-            if row:
-                st.session_state.user["points"] = row[0]
+            stats = store.get_user_stats(user["id"])
+            if stats:
+                st.session_state.user["points"] = stats.points
         except Exception as e:
-            st.error("포인트 조회 오류: " + str(e))
+            show_error("포인트 조회 오류: " + str(e))
 
         # 상단: 사용자 정보 및 포인트(코인) 표시
         col1, col2 = st.columns([3,1])
         col1.subheader(f'안녕하세요, {user["name"]}님')
         col2.metric("코인(포인트)", st.session_state.user["points"])
-
-        # 좌측/우측 레이아웃: 미션 탭 + 보상 샵
-        left, right = st.columns([3,2])
-
-        # 왼쪽: 할일(진행중 / 완료 탭)
-        with left:
-            tab = st.tabs(["진행중", "완료"])
-            # 진행중
-            with tab[0]:
-                st.write("### 진행중 미션")
+        if stats:
+            scols = st.columns(4)
+            scols[0].metric("누적 획득", stats.total_earned)
+            scols[1].metric("누적 사용", stats.total_spent)
+            scols[2].metric("완료한 미션", stats.completed_count)
+            scols[3].metric("연속 달성(일)", stats.current_streak)
+
+    # 할일(진행중 / 완료 / 검색 탭)
+    tab = st.tabs(["진행중", "완료", "검색"])
+    # 진행중
+    with tab[0], metrics.timed("render.in_progress"):
+        st.write("### 진행중 미션")
+        page_key = f"inprogress_{user['id']}"
+        try:
+            # 때가 된 반복 미션 회차를 먼저 만든다 (없으면 인덱스 조회 한 번으로 끝난다)
+            if page_cursor(page_key) is None:
+                store.materialize_due(user["id"])
+            todos_inprogress, next_cursor = store.list_in_progress(
+                user["id"], PAGE_SIZE, page_cursor(page_key))
+        except Exception as e:
+            show_error("미션 불러오기 오류: " + str(e))
+            todos_inprogress, next_cursor = [], None
+
+        if todos_inprogress:
+            for t in todos_inprogress:
+                tid, ttitle, tpoints, tcreated = t
+                row = st.columns([6,1,1])
+                row[0].markdown(f"- **{ttitle}** ({tpoints}점)")
+                if row[1].button("완료", key=f"done_{tid}"):
+                    try:
+                        _, earned = store.complete_todos(user["id"], [tid])
+                        st.success(f"{earned}점을 획득했습니다!")
+                        rerun("fragment")
+                    except Exception as e:
+                        show_error("완료 처리 오류: " + str(e))
+                if row[2].button("삭제", key=f"deltodo_{tid}"):
+                    try:
+                        store.delete_todos(user["id"], [tid])
+                        st.info("미션이 삭제되었습니다.")
+                        rerun("fragment")
+                    except Exception as e:
+                        show_error("삭제 오류: " + str(e))
+
+            # 여러 개 선택해서 한 번에 완료/삭제 (트랜잭션 한 번, 포인트 적립 한 번)
+            labels = {t[0]: f"{t[1]} ({t[2]}점)" for t in todos_inprogress}
+            selected = st.multiselect("여러 개 선택", list(labels), format_func=labels.get,
+                                      key=f"bulk_{page_key}")
+            bcols = st.columns([1,1,4])
+            if bcols[0].button("선택 완료", key=f"bulk_done_{page_key}", disabled=not selected):
                 try:
-                    todos_inprogress = c.execute(
-                        "SELECT id,title,points_reward,created_at FROM todos WHERE user_id=? AND completed=0 ORDER BY id DESC",
-                        (user["id"],)
-                    ).fetchall()
+                    n, earned = store.complete_todos(user["id"], selected)
+                    st.success(f"{n}개 미션 완료 — {earned}점을 획득했습니다!")
+                    rerun("fragment")
                 except Exception as e:
-                    st.error("미션 불러오기 오류: " + str(e))
-                    todos_inprogress = []
-
-                if todos_inprogress:
-                    for t in todos_inprogress:
-                        tid, ttitle, tpoints, tcreated = t
-                        row = st.columns([6,1,1])
-                        row[0].markdown(f"- **{ttitle}** ({tpoints}점)")
-                        if row[1].button("완료", key=f"done_{tid}"):
-                            try:
-                                now = datetime.now().isoformat()
-                                c.execute("UPDATE todos SET completed=1, completed_at=? WHERE id=?", (now, tid))
-                                update_user_points(user["id"], tpoints)
-                                conn.commit()
-                                st.success(f"{tpoints}점을 획득했습니다!")
-                                safe_rerun()
-                            except Exception as e:
-                                st.error("완료 처리 오류: " + str(e))
-                        if row[2].button("삭제", key=f"deltodo_{tid}"):
-                            try:
-                                c.execute("DELETE FROM todos WHERE id=?", (tid,))
-                                conn.commit()
-                                st.info("미션이 삭제되었습니다.")
-                                safe_rerun()
-                            except Exception as e:
-                                st.error("삭제 오류: " + str(e))
-                else:
-                    st.info("진행중인 미션이 없습니다. 사이드바에서 추가해보세요.")
-
-            # 완료
-            with tab[1]:
-                st.write("### 완료된 미션")
+                    show_error("완료 처리 오류: " + str(e))
+            if bcols[1].button("선택 삭제", key=f"bulk_del_{page_key}", disabled=not selected):
                 try:
-                    todos_done = c.execute(
-                        "SELECT id,title,points_reward,completed_at FROM todos WHERE user_id=? AND completed=1 ORDER BY completed_at DESC",
-                        (user["id"],)
-                    ).fetchall()
+                    n = store.delete_todos(user["id"], selected)
+                    st.info(f"{n}개 미션이 삭제되었습니다.")
+                    rerun("fragment")
                 except Exception as e:
-                    st.error("완료된 미션 불러오기 오류: " + str(e))
-                    todos_done = []
-
-                if todos_done:
-                    for t in todos_done:
-                        tid, ttitle, tpoints, tcomp = t
-                        row = st.columns([6,1])
-                        row[0].markdown(f"- **{ttitle}** ({tpoints}점) — 완료: {tcomp}")
-                        if row[1].button("삭제", key=f"del_done_{tid}"):
-                            try:
-                                c.execute("DELETE FROM todos WHERE id=?", (tid,))
-                                conn.commit()
-                                st.info("완료된 미션이 삭제되었습니다.")
-                                safe_rerun()
-                            except Exception as e:
-                                st.error("삭제 오류: " + str(e))
-                else:
-                    st.info("아직 완료된 미션이 없습니다.")
-
-        # 오른쪽: 보상 샵 및 구매 이력
-        with right:
-            st.write("## 보상 샵 (구매하려면 클릭)")
-            try:
-                # rewards 테이블에 stock 컬럼이 없을 수 있으니 안전하게 읽기
-                try:
-                    rewards = c.execute("SELECT id,name,cost,description,stock FROM rewards ORDER BY id").fetchall()
-                except Exception:
-                    rewards = c.execute("SELECT id,name,cost,description FROM rewards ORDER BY id").fetchall()
-                    rewards = [r + (None,) if len(r) == 4 else r for r in rewards]
-            except Exception as e:
-                st.error("보상 불러오기 오류: " + str(e))
-                rewards = []
-
-            for r in rewards:
-                rid, name_r, cost, desc, stock = r
-                stock_text = "무제한" if stock == -1 else ("재고: 없음" if stock == 0 else f"{stock}개")
-                rcols = st.columns([4,1])
-                rcols[0].write(f"**{name_r}** - {cost}점  \n{desc}  \n{stock_text}")
-                if rcols[1].button("구매", key=f"buy_{rid}"):
+                    show_error("삭제 오류: " + str(e))
+        else:
+            st.info("진행중인 미션이 없습니다. 사이드바에서 추가해보세요.")
+        page_nav(page_key, next_cursor)
+
+    # 완료
+    with tab[1], metrics.timed("render.completed"):
+        st.write("### 완료된 미션")
+        page_key = f"completed_{user['id']}"
+        try:
+            todos_done, next_cursor = store.list_completed(
+                user["id"], PAGE_SIZE, page_cursor(page_key))
+        except Exception as e:
+            show_error("완료된 미션 불러오기 오류: " + str(e))
+            todos_done, next_cursor = [], None
+
+        if todos_done:
+            for t in todos_done:
+                tid, ttitle, tpoints, tcomp = t
+                row = st.columns([6,1])
+                row[0].markdown(f"- **{ttitle}** ({tpoints}점) — 완료: {tcomp}")
+                if row[1].button("삭제", key=f"del_done_{tid}"):
                     try:
-                        points_now = c.execute("SELECT points FROM users WHERE id=?", (user["id"],)).fetchone()[0]
-                        if points_now >= cost:
-                            if stock is None or stock == -1 or stock > 0:
-                                c.execute("UPDATE users SET points = points - ? WHERE id=?", (cost, user["id"]))
-                                c.execute("INSERT INTO purchases (user_id,reward_id,purchased_at) VALUES (?,?,?)",
-                                          (user["id"], rid, datetime.now().isoformat()))
-                                if stock is not None and stock > 0:
-                                    c.execute("UPDATE rewards SET stock = stock - 1 WHERE id=?", (rid,))
-                                conn.commit()
-                                st.success(f"{name_r}을(를) 구매했습니다.")
-                                safe_rerun()
-                            else:
-                                st.error("해당 보상은 재고가 없습니다.")
-                        else:
-                            st.error("포인트가 부족합니다.")
+                        store.delete_todos(user["id"], [tid])
+                        st.info("완료된 미션이 삭제되었습니다.")
+                        rerun("fragment")
                     except Exception as e:
-                        st.error("구매 처리 오류: " + str(e))
+                        show_error("삭제 오류: " + str(e))
 
-            st.markdown("---")
-            st.write("## 구매 이력")
+            labels = {t[0]: f"{t[1]} ({t[3]})" for t in todos_done}
+            selected = st.multiselect("여러 개 선택", list(labels), format_func=labels.get,
+                                      key=f"bulk_{page_key}")
+            if st.button("선택 삭제", key=f"bulk_del_{page_key}", disabled=not selected):
+                try:
+                    n = store.delete_todos(user["id"], selected)
+                    st.info(f"완료된 미션 {n}개가 삭제되었습니다.")
+                    rerun("fragment")
+                except Exception as e:
+                    show_error("삭제 오류: " + str(e))
+        else:
+            st.info("아직 완료된 미션이 없습니다.")
+        page_nav(page_key, next_cursor)
+        st.caption("오래된 완료 기록은 보관되며 사이드바의 '기록 내보내기'로 받을 수 있습니다.")
+
+    # 검색 (FTS5 색인에서 순위순으로 읽는다)
+    with tab[2], metrics.timed("render.search"):
+        st.write("### 미션 검색")
+        page_key = f"search_{user['id']}"
+        q = st.text_input("검색어", key=f"{page_key}_q", placeholder="예: 운동 영어")
+        fcols = st.columns(3)
+        status_labels = {None: "전체", "open": "진행중", "done": "완료"}
+        status = fcols[0].selectbox("상태", list(status_labels), format_func=status_labels.get,
+                                    key=f"{page_key}_status")
+        field_labels = {"created_at": "추가일", "completed_at": "완료일"}
+        date_field = fcols[1].selectbox("날짜 기준", list(field_labels), format_func=field_labels.get,
+                                        key=f"{page_key}_field")
+        dates = fcols[2].date_input("기간", value=(), key=f"{page_key}_dates")
+        pcols = st.columns(3)
+        min_points = pcols[0].number_input("최소 포인트", min_value=0, value=0, key=f"{page_key}_min")
+        max_points = pcols[1].number_input("최대 포인트 (0=제한 없음)", min_value=0, value=0, key=f"{page_key}_max")
+        order_labels = {"rank": "관련도순", "recent": "최신순"}
+        order = pcols[2].selectbox("정렬", list(order_labels), format_func=order_labels.get, key=f"{page_key}_order")
+        date_from = dates[0].isoformat() if len(dates) > 0 else None
+        date_to = dates[1].isoformat() if len(dates) > 1 else date_from
+        filters = dict(status=status, date_field=date_field, date_from=date_from, date_to=date_to,
+                       min_points=min_points or None, max_points=max_points or None, order=order)
+        # 검색 조건이 바뀌면 첫 페이지부터
+        if st.session_state.get(f"{page_key}_filters") != (q, filters):
+            st.session_state[f"{page_key}_filters"] = (q, filters)
+            st.session_state[f"{page_key}_cursors"] = [None]
+
+        if q.strip():
             try:
-                hist = c.execute("""SELECT p.id, r.name, p.purchased_at FROM purchases p
-                                    JOIN rewards r ON p.reward_id = r.id WHERE p.user_id=?
-                                    ORDER BY p.purchased_at DESC""", (user["id"],)).fetchall()
+                found, next_cursor = store.search_todos(user["id"], q, PAGE_SIZE, page_cursor(page_key), **filters)
             except Exception as e:
-                st.error("구매 이력 조회 오류: " + str(e))
-                hist = []
-
-            if hist:
-                for h in hist:
-                    st.write(f"- {h[1]} — {h[2]}")
+                show_error("검색 오류: " + str(e))
+                found, next_cursor = [], None
+            if found:
+                st.markdown("\n".join(
+                    f"- {'완료' if r[3] else '진행중'} · **{r[1]}** ({r[2]}점) — 추가: {r[4]}"
+                    + (f" / 완료: {r[5]}" if r[5] else "") for r in found))
+            else:
+                st.info("검색 결과가 없습니다.")
+            page_nav(page_key, next_cursor)
+
+
+# ---------- 보상 샵 ----------
+# 구매는 포인트 지표, 재고, 구매 이력을 함께 바꾸므로 앱 전체를 다시 그린다
+@fragment
+def shop_section(store):
+    user = st.session_state.user
+    if not user:
+        return
+    with metrics.timed("render.shop"):
+        st.write("## 보상 샵 (구매하려면 클릭)")
+        reward_q = st.text_input("보상 검색", key="reward_search")
+        try:
+            if reward_q.strip():
+                rewards = [r[:5] for r in store.search_rewards(reward_q)]
             else:
-                st.info("구매 이력이 없습니다.")
-
-        # 사이드바: 할일 추가 (로그인 시에만 보이게)
-        st.sidebar.markdown("---")
-        st.sidebar.header("할일 추가")
-        title = st.sidebar.text_input("할일 제목", key="todo_title")
-        reward = st.sidebar.number_input("완료 시 포인트", min_value=1, value=10, key="todo_reward")
-        if st.sidebar.button("추가", key="add_todo"):
+                rewards = store.list_rewards()
+        except Exception as e:
+            show_error("보상 불러오기 오류: " + str(e))
+            rewards = []
+
+        for r in rewards:
+            rid, name_r, cost, desc, stock = r
+            stock_text = "무제한" if stock == -1 else ("재고: 없음" if stock == 0 else f"{stock}개")
+            rcols = st.columns([4,1])
+            rcols[0].write(f"**{name_r}** - {cost}점  \n{desc}  \n{stock_text}")
+            if rcols[1].button("구매", key=f"buy_{rid}"):
+                try:
+                    result = store.purchase_reward(user["id"], rid)
+                    if result.ok:
+                        st.session_state.user["points"] = result.points
+                        st.success(f"{name_r}을(를) 구매했습니다.")
+                        rerun("app")
+                    elif result.status is PurchaseStatus.OUT_OF_STOCK:
+                        st.error("해당 보상은 재고가 없습니다.")
+                    elif result.status is PurchaseStatus.INSUFFICIENT_POINTS:
+                        st.error("포인트가 부족합니다.")
+                    else:
+                        st.error("보상 또는 사용자를 찾을 수 없습니다.")
+                except Exception as e:
+                    show_error("구매 처리 오류: " + str(e))
+
+
+# ---------- 구매 이력 ----------
+@fragment
+def history_section(store):
+    user = st.session_state.user
+    if not user:
+        return
+    with metrics.timed("render.history"):
+        st.markdown("---")
+        st.write("## 구매 이력")
+        page_key = f"purchases_{user['id']}"
+        try:
+            hist, next_cursor = store.list_purchases(user["id"], PAGE_SIZE, page_cursor(page_key))
+        except Exception as e:
+            show_error("구매 이력 조회 오류: " + str(e))
+            hist, next_cursor = [], None
+
+        if hist:
+            # 행마다 요소를 만들지 않고 한 페이지를 마크다운 하나로 보낸다
+            st.markdown("\n".join(f"- {h[1]} — {h[2]}" for h in hist))
+        else:
+            st.info("구매 이력이 없습니다.")
+        page_nav(page_key, next_cursor)
+        st.caption("오래된 구매 이력은 보관되며 사이드바의 '기록 내보내기'로 받을 수 있습니다.")
+
+
+# ---------- 랭킹 / 통계 ----------
+# 모든 세션이 공유하는 스냅샷(store.analytics_snapshot)만 그린다. 사용자 수와 무관하게 상위 N 행 + 집계 표 몇 행.
+@fragment
+def analytics_section(store):
+    user = st.session_state.user
+    if not user:
+        return
+    with metrics.timed("render.analytics"):
+        st.markdown("---")
+        st.write("## 랭킹 / 통계")
+        try:
+            snap = store.analytics_snapshot()
+            my_rank = store.user_rank(user["id"])
+        except Exception as e:
+            show_error("통계 조회 오류: " + str(e))
+            return
+        tab = st.tabs(["랭킹", "일별 완료", "인기 보상"])
+        with tab[0]:
+            if my_rank is not None:
+                st.metric("내 순위 (누적 획득)", f"{my_rank}위")
+            if snap.leaderboard:
+                lines = ["| 순위 | 닉네임 | 누적 획득 | 완료 |", "|---:|---|---:|---:|"]
+                lines += [f"| {r[0]} | {'**' + r[2] + '**' if r[1] == user['id'] else r[2]} | {r[3]} | {r[4]} |"
+                          for r in snap.leaderboard]
+                st.markdown("\n".join(lines))
+            else:
+                st.info("아직 랭킹이 없습니다.")
+        with tab[1]:
+            if snap.daily:
+                st.bar_chart({"날짜": [d[0] for d in snap.daily], "완료 수": [d[1] for d in snap.daily]},
+                             x="날짜", y="완료 수")
+            else:
+                st.info("완료 기록이 없습니다.")
+        with tab[2]:
+            if snap.popular_rewards:
+                st.markdown("\n".join(f"{i}. {r[1] or '(삭제된 보상)'} — {r[2]}회 구매, {r[3]}점"
+                                       for i, r in enumerate(snap.popular_rewards, 1)))
+            else:
+                st.info("구매 기록이 없습니다.")
+        st.caption(f"{store.analytics.ttl}초마다 갱신됩니다.")
+
+
+# ---------- 사이드바: 할일 추가 / 가져오기 / 내보내기 ----------
+# 추가/가져오기는 할일 목록 프래그먼트에 보여야 하므로 앱 전체를 다시 그린다
+@fragment
+def sidebar_todo_section(store):
+    user = st.session_state.user
+    if not user:
+        return
+    with metrics.timed("render.sidebar_todo"):
+        st.markdown("---")
+        st.header("할일 추가")
+        title = st.text_input("할일 제목", key="todo_title")
+        reward = st.number_input("완료 시 포인트", min_value=1, value=10, key="todo_reward")
+        if st.button("추가", key="add_todo"):
             if not title or title.strip() == "":
-                st.sidebar.error("할일 제목을 입력하세요.")
+                st.error("할일 제목을 입력하세요.")
             else:
                 try:
-                    now = datetime.now().isoformat()
-                    c.execute("INSERT INTO todos (user_id,title,points_reward,created_at) VALUES (?,?,?,?)",
-                              (user["id"], title.strip(), reward, now))
-                    conn.commit()
-                    st.sidebar.success("할일이 추가되었습니다.")
-                    safe_rerun()
+                    store.add_todo(user["id"], title.strip(), reward)
+                    st.success("할일이 추가되었습니다.")
+                    rerun("app")
                 except Exception as e:
-                    st.sidebar.error("할일 추가 중 오류: " + str(e))
+                    show_error("할일 추가 중 오류: " + str(e))
+
+        # 반복 미션: 템플릿은 한 번만 저장하고 회차마다 진행중 목록에 할일이 생긴다
+        with st.expander("반복 미션"):
+            rtitle = st.text_input("미션 제목", key="tpl_title")
+            rreward = st.number_input("완료 시 포인트", min_value=1, value=10, key="tpl_reward")
+            kinds = {"daily": "매일", "weekly": "매주", "cron": "직접 입력 (cron)"}
+            kind = st.selectbox("반복", list(kinds), format_func=kinds.get, key="tpl_kind")
+            weekday_names = ["일", "월", "화", "수", "목", "금", "토"]
+            if kind == "cron":
+                schedule = st.text_input("cron 식 (분 시 일 월 요일)", value="0 9 * * 1-5", key="tpl_cron")
+            else:
+                at = st.time_input("시각", key="tpl_time")
+                if kind == "daily":
+                    schedule = recurring.daily(at.hour, at.minute)
+                else:
+                    days = st.multiselect("요일", range(7), default=[1], format_func=lambda d: weekday_names[d],
+                                          key="tpl_days")
+                    schedule = recurring.weekly(days, at.hour, at.minute) if days else None
+            if st.button("반복 미션 추가", key="tpl_add"):
+                if not rtitle or rtitle.strip() == "":
+                    st.error("미션 제목을 입력하세요.")
+                elif not schedule:
+                    st.error("요일을 하나 이상 고르세요.")
+                else:
+                    try:
+                        store.add_template(user["id"], rtitle.strip(), rreward, schedule)
+                        st.success("반복 미션이 추가되었습니다.")
+                        rerun("app")
+                    except ValueError as e:
+                        st.error("일정 형식 오류: " + str(e))
+                    except Exception as e:
+                        show_error("반복 미션 추가 중 오류: " + str(e))
+            try:
+                templates = store.list_templates(user["id"])
+            except Exception as e:
+                show_error("반복 미션 불러오기 오류: " + str(e))
+                templates = []
+            for tpl_id, tpl_title, tpl_points, tpl_schedule, tpl_next in templates:
+                row = st.columns([4,1])
+                row[0].caption(f"{tpl_title} ({tpl_points}점) · `{tpl_schedule}` · 다음 {tpl_next.replace('T', ' ')}")
+                if row[1].button("중지", key=f"tpl_stop_{tpl_id}"):
+                    try:
+                        store.deactivate_template(user["id"], tpl_id)
+                        rerun("fragment")
+                    except Exception as e:
+                        show_error("반복 미션 중지 오류: " + str(e))
 
-        # 로그아웃
-        if st.sidebar.button("로그아웃"):
-            st.session_state.user = None
-            safe_rerun()
+        # 할일 일괄 가져오기 (CSV: title,points 헤더 / JSON: [{"title":..., "points":...}])
+        with st.expander("할일 가져오기 (CSV/JSON)"):
+            upload = st.file_uploader("파일 선택", type=["csv", "json"], key="todo_import")
+            if upload is not None and st.button("가져오기", key="todo_import_btn"):
+                try:
+                    fmt = "json" if upload.name.lower().endswith(".json") else "csv"
+                    rows = parse_todo_import(upload.getvalue(), fmt)
+                    n = store.import_todos(user["id"], rows)
+                    st.success(f"할일 {n}개를 가져왔습니다.")
+                    rerun("app")
+                except ValueError as e:
+                    st.error("가져오기 형식 오류: " + str(e))
+                except Exception as e:
+                    show_error("가져오기 중 오류: " + str(e))
+
+        # 전체 기록 내보내기 (보관된 오래된 기록 포함). 버튼을 눌렀을 때만 만든다
+        with st.expander("기록 내보내기"):
+            kinds = {"todos": "할일", "purchases": "구매 이력"}
+            kind = st.selectbox("종류", list(kinds), format_func=kinds.get, key="export_kind")
+            fmt = st.selectbox("형식", ["csv", "jsonl"], key="export_fmt")
+            if st.button("내보내기 준비", key="export_btn"):
+                try:
+                    discard_export()
+                    st.session_state.export_file = (f"{user['name']}_{kind}.{fmt}", write_export(store, user["id"], kind, fmt))
+                except Exception as e:
+                    show_error("내보내기 오류: " + str(e))
+            if st.session_state.get("export_file"):
+                fname, path = st.session_state.export_file
+                with open(path, "rb") as f:
+                    st.download_button("다운로드", f, file_name=fname, key="export_download")
+
+# 내보내기는 조각 단위로 임시 파일에 쓰고 session_state 에는 경로만 둔다 (기록 전체를 메모리에 들고 있지 않는다)
+def write_export(store, user_id, kind, fmt):
+    fd, path = tempfile.mkstemp(prefix="todomaker_export_", suffix=f".{fmt}")
+    try:
+        with os.fdopen(fd, "w", encoding="utf-8", newline="") as out:
+            for chunk in store.export_history(user_id, kind, fmt):
+                out.write(chunk)
+    except Exception:
+        os.remove(path)
+        raise
+    return path
 
-    else:
-        st.info("왼쪽 사이드바에서 로그인 또는 회원가입을 해주세요.")
+def discard_export():
+    export = st.session_state.pop("export_file", None)
+    if export:
+        try:
+            os.remove(export[1])
+        except OSError:
+            pass
 
 # ---------- 안전 실행 래퍼 ----------
 if __name__ == "__main__":
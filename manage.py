@@ -0,0 +1,120 @@
+# file: manage.py
+# 운영용 명령 모음.
+#
+#   python manage.py reconcile     # 포인트 원장/사용자 통계 재구성
+#   python manage.py serve         # HTTP/JSON API 서버 (api.py)
+#   python manage.py reindex       # 전문 검색 색인(FTS5) 재구성
+#   python manage.py archive       # 오래된 완료 할일 / 구매 이력을 보관 테이블로 이동
+#   python manage.py export NAME   # 사용자의 전체 기록(보관분 포함)을 CSV / JSON Lines 로 출력
+#   python manage.py materialize   # 때가 된 반복 미션 회차를 지금 만든다 (cron 등에서 한 번씩 실행)
+#   python manage.py analytics     # 랭킹 / 통계 집계 갱신 (--full 이면 원장 전체로 재계산)
+import argparse
+import asyncio
+import sys
+
+import recurring
+from archive import EXPORT_FORMATS, EXPORT_KINDS
+from settings import API_HOST, API_PORT, ARCHIVE_AFTER_DAYS, ARCHIVE_BATCH, DB_PATH
+from store import TodoStore
+
+
+def cmd_reconcile(store, args):
+    adjusted = store.rebuild_stats()
+    with store.connection() as conn:
+        users = conn.execute("SELECT COUNT(*) FROM user_stats").fetchone()[0]
+    print(f"user_stats rebuilt for {users} users, {adjusted} ledger adjustment(s) recorded")
+
+
+def cmd_reindex(store, args):
+    store.rebuild_search_index()
+    print("search index rebuilt")
+
+
+def cmd_serve(store, args):
+    from api import ApiServer
+
+    recurring.start_scheduler(store)
+
+    async def run():
+        server = await ApiServer(store, args.host, args.port).start()
+        print(f"serving on http://{server.host}:{server.port}")
+        try:
+            await server.serve_forever()
+        finally:
+            await server.close()
+
+    try:
+        asyncio.run(run())
+    except KeyboardInterrupt:
+        pass
+
+
+def cmd_archive(store, args):
+    moved = store.archive_old(args.days, args.batch)
+    counts = store.archive_counts()
+    print(f"archived {moved['todos']} todo(s) and {moved['purchases']} purchase(s) older than {args.days} days "
+          f"(archive now holds {counts['todos']} todos, {counts['purchases']} purchases)")
+
+
+def cmd_export(store, args):
+    user = store.get_user_by_name(args.name)
+    if user is None:
+        print(f"user not found: {args.name}", file=sys.stderr)
+        return 1
+    out = open(args.out, "w", encoding="utf-8", newline="") if args.out else sys.stdout
+    try:
+        for chunk in store.export_history(user[0], args.kind, args.format):
+            out.write(chunk)
+    finally:
+        if args.out:
+            out.close()
+    return 0
+
+
+def cmd_materialize(store, args):
+    created = store.materialize_due()
+    print(f"materialized {created} recurring todo(s)")
+
+
+def cmd_analytics(store, args):
+    applied = store.refresh_analytics(full=args.full)
+    print(f"analytics {'rebuilt from' if args.full else 'refreshed with'} {applied} ledger row(s)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="manage.py")
+    parser.add_argument("--db", default=DB_PATH, help="SQLite 파일 경로")
+    sub = parser.add_subparsers(dest="command", required=True)
+    sub.add_parser("reconcile", help="원장과 users.points 를 맞추고 user_stats 를 다시 만든다")
+    sub.add_parser("reindex", help="todos / rewards 전문 검색 색인을 원본 테이블에서 다시 만든다")
+    serve = sub.add_parser("serve", help="HTTP/JSON API 서버 실행")
+    serve.add_argument("--host", default=API_HOST)
+    serve.add_argument("--port", type=int, default=API_PORT)
+    arch = sub.add_parser("archive", help="오래된 완료 할일 / 구매 이력을 보관 테이블로 옮긴다")
+    arch.add_argument("--days", type=int, default=ARCHIVE_AFTER_DAYS, help="이 일수보다 오래된 기록")
+    arch.add_argument("--batch", type=int, default=ARCHIVE_BATCH, help="트랜잭션당 행 수")
+    export = sub.add_parser("export", help="사용자의 전체 기록을 내보낸다 (보관분 포함)")
+    export.add_argument("name", help="사용자 닉네임")
+    export.add_argument("--kind", choices=EXPORT_KINDS, default="todos")
+    export.add_argument("--format", choices=EXPORT_FORMATS, default="csv")
+    export.add_argument("--out", help="출력 파일 (기본: 표준 출력)")
+    sub.add_parser("materialize", help="때가 된 반복 미션 회차를 할일로 만든다")
+    analytics = sub.add_parser("analytics", help="리더보드 / 일별 완료 / 인기 보상 집계를 갱신한다")
+    analytics.add_argument("--full", action="store_true", help="원장 전체로 다시 계산")
+    args = parser.parse_args(argv)
+
+    store = TodoStore.open(args.db)
+    commands = {
+        "reconcile": cmd_reconcile,
+        "reindex": cmd_reindex,
+        "serve": cmd_serve,
+        "archive": cmd_archive,
+        "export": cmd_export,
+        "materialize": cmd_materialize,
+        "analytics": cmd_analytics,
+    }
+    return commands[args.command](store, args) or 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
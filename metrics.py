@@ -0,0 +1,329 @@
+# file: metrics.py
+# 핫 패스 계측: SQL 실행과 화면 구역(렌더 섹션)별 지연 히스토그램, 행 수, 오류 수.
+# 느린 쿼리 로그를 남기고, Prometheus 텍스트/JSON 으로 파일이나 로컬 HTTP 엔드포인트에 내보낸다.
+#
+# SQL 은 db.ConnectionPool 이 InstrumentedConnection 으로 연결을 만들면 자동으로 기록되고,
+# 화면 구역은 `with metrics.timed("render.shop"):` 처럼 감싼다. 구역 안에서 예외를 잡아 화면에 보여 줄 때는
+# metrics.record_error() 로 그 구역의 오류로 센다.
+import hashlib
+import json
+import logging
+import os
+import re
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import lru_cache
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import settings
+
+slow_log = logging.getLogger("todomaker.slow")
+
+# 지연 히스토그램 버킷 상한 (초)
+BUCKETS = (0.0001, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+# 서로 다른 쿼리 이름이 이보다 많아지면 나머지는 "other" 로 묶는다
+MAX_SERIES = 500
+
+
+class Series:
+    def __init__(self):
+        self.buckets = [0] * (len(BUCKETS) + 1)
+        self.count = 0
+        self.total = 0.0
+        self.rows = 0
+        self.errors = 0
+
+    def observe(self, seconds, rows, error):
+        self.buckets[bisect_left(BUCKETS, seconds)] += 1
+        self.count += 1
+        self.total += seconds
+        self.rows += rows
+        if error:
+            self.errors += 1
+
+    def as_dict(self):
+        return {"count": self.count, "sum": self.total, "rows": self.rows, "errors": self.errors,
+                "buckets": dict(zip([str(b) for b in BUCKETS] + ["+Inf"], self.buckets))}
+
+
+class Registry:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._series = {}
+
+    def observe(self, kind, name, seconds, rows=0, error=False):
+        with self._lock:
+            key = (kind, name)
+            series = self._series.get(key)
+            if series is None:
+                if len(self._series) >= MAX_SERIES:
+                    key = (kind, "other")
+                    series = self._series.get(key)
+                if series is None:
+                    series = self._series[key] = Series()
+            series.observe(seconds, rows, error)
+
+    def reset(self):
+        with self._lock:
+            self._series.clear()
+
+    def snapshot(self):
+        with self._lock:
+            return {key: series.as_dict() for key, series in self._series.items()}
+
+    def to_json(self):
+        out = {}
+        for (kind, name), data in self.snapshot().items():
+            out.setdefault(kind, {})[name] = data
+        return json.dumps(out, ensure_ascii=False, indent=2)
+
+    def to_prometheus(self):
+        lines = []
+        by_kind = {}
+        for (kind, name), data in sorted(self.snapshot().items()):
+            by_kind.setdefault(kind, []).append((name, data))
+        for kind, entries in by_kind.items():
+            metric = f"todomaker_{kind}_seconds"
+            lines.append(f"# TYPE {metric} histogram")
+            for name, data in entries:
+                label = _label(name)
+                cumulative = 0
+                for bound, n in data["buckets"].items():
+                    cumulative += n
+                    lines.append(f'{metric}_bucket{{name="{label}",le="{bound}"}} {cumulative}')
+                lines.append(f'{metric}_sum{{name="{label}"}} {data["sum"]:.6f}')
+                lines.append(f'{metric}_count{{name="{label}"}} {data["count"]}')
+            for suffix in ("rows", "errors"):
+                lines.append(f"# TYPE todomaker_{kind}_{suffix}_total counter")
+                for name, data in entries:
+                    lines.append(f'todomaker_{kind}_{suffix}_total{{name="{_label(name)}"}} {data[suffix]}')
+        return "\n".join(lines) + "\n"
+
+
+def _label(name):
+    return name.replace("\\", "\\\\").replace('"', '\\"').replace("\n", " ")
+
+
+registry = Registry()
+# 스레드마다 지금 실행 중인 timed() 블록들 (안쪽이 마지막). 항목은 [잡힌 오류 여부].
+_spans = threading.local()
+
+
+@contextmanager
+def timed(name, kind="section"):
+    # 블록 실행 시간을 기록한다. 예외(Exception)가 나가거나 블록 안에서 record_error() 를 부르면 오류로 센다.
+    # Streamlit 의 재실행/중지 신호는 BaseException 이라 오류로 세지 않는다.
+    start = time.perf_counter()
+    stack = _spans.__dict__.setdefault("stack", [])
+    span = [False]
+    stack.append(span)
+    error = False
+    try:
+        yield
+    except Exception:
+        error = True
+        raise
+    finally:
+        stack.remove(span)
+        registry.observe(kind, name, time.perf_counter() - start, error=error or span[0])
+
+
+def record_error(name="render.other", kind="section"):
+    # 잡아서 처리한 예외를 가장 안쪽의 timed() 블록 오류로 센다. 블록 밖이면 name 으로 따로 기록한다.
+    stack = getattr(_spans, "stack", None)
+    if stack:
+        stack[-1][0] = True
+    else:
+        registry.observe(kind, name, 0.0, error=True)
+
+
+# ---------- SQL 계측 ----------
+_WS = re.compile(r"\s+")
+# IN (?,?,…) 목록은 자리표시자 수와 상관없이 한 이름으로 묶는다 (일괄 완료/삭제의 배치 크기마다 계열이 생기지 않게)
+_IN_LIST = re.compile(r"\bIN\s*\(\s*\?(?:\s*,\s*\?)*\s*\)", re.IGNORECASE)
+NAME_PREFIX = 120
+
+
+@lru_cache(maxsize=2048)
+def query_name(sql):
+    # 공백을 정리한 SQL 을 쿼리 이름으로 쓴다 (파라미터는 ? 이므로 값이 섞이지 않는다).
+    # 길면 앞부분 + 전체 문장의 짧은 해시로 줄여서, 앞부분만 같은 문장(검색 필터 조합 등)이 합쳐지지 않게 한다.
+    name = _IN_LIST.sub("IN (…)", _WS.sub(" ", sql).strip())
+    if len(name) <= NAME_PREFIX:
+        return name
+    digest = hashlib.sha1(name.encode("utf-8")).hexdigest()[:8]
+    return f"{name[:NAME_PREFIX]}… #{digest}"
+
+
+def _record_query(name, seconds, rows, error):
+    registry.observe("query", name, seconds, rows, error)
+    threshold = settings.SLOW_QUERY_MS
+    if threshold and seconds * 1000 >= threshold:
+        slow_log.warning("slow query %.1fms rows=%d: %s", seconds * 1000, rows, name)
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    # SELECT 는 결과를 다 읽을 때까지(fetchone/fetchall/반복 종료) 한 번의 실행으로 센다.
+    # 시간은 execute 와 fetch/반복 호출 안에서 쓴 시간만 더한다. 행 사이에 호출한 쪽이 하는 일
+    # (내보내기 스트리밍 등)은 쿼리 시간에 넣지 않는다.
+    _pending = None  # (이름, 지금까지 쓴 시간, 읽은 행 수)
+
+    def _finish(self):
+        pending = self._pending
+        if pending is not None:
+            self._pending = None
+            name, spent, rows = pending
+            _record_query(name, spent, rows, False)
+
+    def _fetched(self, start, count):
+        if self._pending is not None:
+            name, spent, rows = self._pending
+            self._pending = (name, spent + time.perf_counter() - start, rows + count)
+
+    def _run(self, method, sql, args):
+        self._finish()
+        name = query_name(sql)
+        start = time.perf_counter()
+        try:
+            method(sql, *args)
+        except Exception:
+            _record_query(name, time.perf_counter() - start, 0, True)
+            raise
+        if self.description is None:
+            _record_query(name, time.perf_counter() - start, max(self.rowcount, 0), False)
+        else:
+            self._pending = (name, time.perf_counter() - start, 0)
+        return self
+
+    def execute(self, sql, *args):
+        return self._run(super().execute, sql, args)
+
+    def executemany(self, sql, *args):
+        return self._run(super().executemany, sql, args)
+
+    def fetchone(self):
+        start = time.perf_counter()
+        row = super().fetchone()
+        self._fetched(start, row is not None)
+        self._finish()
+        return row
+
+    def fetchmany(self, *args, **kwargs):
+        start = time.perf_counter()
+        rows = super().fetchmany(*args, **kwargs)
+        self._fetched(start, len(rows))
+        if not rows:
+            self._finish()
+        return rows
+
+    def fetchall(self):
+        start = time.perf_counter()
+        rows = super().fetchall()
+        self._fetched(start, len(rows))
+        self._finish()
+        return rows
+
+    def __next__(self):
+        start = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self._fetched(start, 0)
+            self._finish()
+            raise
+        self._fetched(start, 1)
+        return row
+
+    def close(self):
+        self._finish()
+        super().close()
+
+    def __del__(self):
+        # 결과를 읽지 않고 버려진 커서 (예: conn.execute("PRAGMA ...")) 도 기록한다
+        try:
+            self._finish()
+        except Exception:
+            pass
+
+
+class InstrumentedConnection(sqlite3.Connection):
+    # conn.execute() 의 C 구현은 self.cursor() 를 거치지 않으므로 직접 InstrumentedCursor 로 돌린다
+    def cursor(self, factory=InstrumentedCursor):
+        return super().cursor(factory)
+
+    def execute(self, sql, *args):
+        return self.cursor().execute(sql, *args)
+
+    def executemany(self, sql, *args):
+        return self.cursor().executemany(sql, *args)
+
+    def commit(self):
+        start = time.perf_counter()
+        try:
+            super().commit()
+        except Exception:
+            _record_query("COMMIT", time.perf_counter() - start, 0, True)
+            raise
+        _record_query("COMMIT", time.perf_counter() - start, 0, False)
+
+
+def connection_factory():
+    return InstrumentedConnection if settings.METRICS_ENABLED else sqlite3.Connection
+
+
+# ---------- 내보내기 ----------
+def write_file(path):
+    # 확장자가 .json 이면 JSON, 아니면 Prometheus 텍스트. 임시 파일에 쓴 뒤 교체한다.
+    data = registry.to_json() if path.endswith(".json") else registry.to_prometheus()
+    tmp = path + ".tmp"
+    with open(tmp, "w", encoding="utf-8") as f:
+        f.write(data)
+    os.replace(tmp, path)
+
+
+class _MetricsHandler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path.startswith("/metrics.json"):
+            body, ctype = registry.to_json(), "application/json"
+        elif self.path.startswith("/metrics"):
+            body, ctype = registry.to_prometheus(), "text/plain; version=0.0.4"
+        else:
+            self.send_error(404)
+            return
+        data = body.encode()
+        self.send_response(200)
+        self.send_header("Content-Type", ctype + "; charset=utf-8")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def log_message(self, *args):
+        pass
+
+
+_exporters_started = False
+_exporters_lock = threading.Lock()
+
+
+def start_exporters():
+    # 설정된 내보내기(파일 주기 저장, 로컬 HTTP /metrics)를 프로세스당 한 번 띄운다
+    global _exporters_started
+    with _exporters_lock:
+        if _exporters_started:
+            return
+        _exporters_started = True
+    if settings.METRICS_FILE:
+        def dump_loop():
+            while True:
+                time.sleep(settings.METRICS_INTERVAL)
+                try:
+                    write_file(settings.METRICS_FILE)
+                except OSError as e:
+                    logging.getLogger("todomaker").warning("metrics file export failed: %s", e)
+        threading.Thread(target=dump_loop, name="metrics-file", daemon=True).start()
+    if settings.METRICS_PORT:
+        server = ThreadingHTTPServer((settings.METRICS_HOST, settings.METRICS_PORT), _MetricsHandler)
+        threading.Thread(target=server.serve_forever, name="metrics-http", daemon=True).start()
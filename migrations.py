@@ -0,0 +1,206 @@
+# file: migrations.py
+# PRAGMA user_version 기반 스키마 마이그레이션.
+# 프로세스가 시작된 뒤 처음 한 번만 실행되고, 이후 재실행에서는 건너뛴다.
+# 각 단계의 DDL 과 백필은 해당 모듈의 함수(create_tables, backfill 등)를 그대로 불러서, 앱 코드와 정의를 하나로 유지한다.
+import threading
+
+import analytics
+import archive
+import catalog
+import recurring
+import search
+import services
+from db import transaction
+from schema import get_schema
+
+# ---------- 기본 스키마 (버전 0) ----------
+BASE_SCHEMA = [
+    """CREATE TABLE IF NOT EXISTS users (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT UNIQUE,
+            points INTEGER DEFAULT 0
+         )""",
+    """CREATE TABLE IF NOT EXISTS todos (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            title TEXT,
+            points_reward INTEGER,
+            completed INTEGER DEFAULT 0,
+            created_at TEXT,
+            completed_at TEXT)""",
+    """CREATE TABLE IF NOT EXISTS rewards (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            name TEXT,
+            cost INTEGER,
+            description TEXT
+         )""",
+    """CREATE TABLE IF NOT EXISTS purchases (
+            id INTEGER PRIMARY KEY AUTOINCREMENT,
+            user_id INTEGER,
+            reward_id INTEGER,
+            purchased_at TEXT)""",
+]
+
+
+def _has_column(conn, table, column):
+    cols = conn.execute(f"PRAGMA table_info('{table}')").fetchall()
+    return column in [r[1] for r in cols]
+
+
+# ---------- 마이그레이션 단계 ----------
+# user_version 이 생기기 전의 DB 에는 이미 컬럼이 있을 수 있으므로 각 단계는 중복 실행에 안전해야 한다.
+def _add_users_created_at(conn):
+    if not _has_column(conn, "users", "created_at"):
+        conn.execute("ALTER TABLE users ADD COLUMN created_at TEXT")
+
+
+def _add_rewards_stock(conn):
+    if not _has_column(conn, "rewards", "stock"):
+        conn.execute("ALTER TABLE rewards ADD COLUMN stock INTEGER DEFAULT -1")
+
+
+def _add_lookup_indexes(conn):
+    # 진행중 목록: WHERE user_id=? AND completed=0 ORDER BY id DESC
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_todos_user_completed_id ON todos (user_id, completed, id)")
+    # 완료 목록: WHERE user_id=? AND completed=1 ORDER BY completed_at DESC
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_todos_user_completed_at ON todos (user_id, completed, completed_at)")
+    # 구매 이력: WHERE user_id=? ORDER BY purchased_at DESC (rewards 는 기본키로 조인)
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_purchases_user_time ON purchases (user_id, purchased_at)")
+    # users.name 은 UNIQUE 제약의 자동 인덱스를 쓴다
+
+
+def _add_points_ledger(conn):
+    conn.execute("""CREATE TABLE IF NOT EXISTS points_ledger (
+                        id INTEGER PRIMARY KEY AUTOINCREMENT,
+                        user_id INTEGER NOT NULL,
+                        delta INTEGER NOT NULL,
+                        reason TEXT NOT NULL,
+                        ref_id INTEGER,
+                        created_at TEXT NOT NULL)""")
+    conn.execute("CREATE INDEX IF NOT EXISTS idx_ledger_user ON points_ledger (user_id, id)")
+    conn.execute("""CREATE TABLE IF NOT EXISTS user_stats (
+                        user_id INTEGER PRIMARY KEY,
+                        total_earned INTEGER NOT NULL DEFAULT 0,
+                        total_spent INTEGER NOT NULL DEFAULT 0,
+                        completed_count INTEGER NOT NULL DEFAULT 0,
+                        current_streak INTEGER NOT NULL DEFAULT 0,
+                        last_completed_on TEXT)""")
+    # 기존 완료/구매 기록을 원장으로 옮긴다 (구매 금액은 현재 보상 가격 기준)
+    conn.execute("""INSERT INTO points_ledger (user_id,delta,reason,ref_id,created_at)
+                    SELECT user_id, COALESCE(points_reward, 0), 'todo', id, COALESCE(completed_at, created_at, '')
+                    FROM todos WHERE completed=1 ORDER BY completed_at""")
+    conn.execute("""INSERT INTO points_ledger (user_id,delta,reason,ref_id,created_at)
+                    SELECT p.user_id, -COALESCE(r.cost, 0), 'purchase', p.id, COALESCE(p.purchased_at, '')
+                    FROM purchases p LEFT JOIN rewards r ON r.id = p.reward_id ORDER BY p.purchased_at""")
+    # 보상 가격이 바뀌었거나 수동 조정이 있었으면 차이를 'adjust' 행으로 남기고 user_stats 를 채운다
+    services.backfill_stats(conn)
+
+
+def _add_archive_tables(conn):
+    # 본 DB 안의 보관 테이블 (ARCHIVE_DB_PATH 를 쓰면 그 파일에도 ATTACH 할 때 같은 테이블을 만든다)
+    archive.create_tables(conn)
+
+
+def _add_search_index(conn):
+    # FTS5 색인(todos_fts, rewards_fts)과 동기화 트리거를 만들고 기존 행으로 채운다
+    search.create_index(conn)
+
+
+def _add_recurring_templates(conn):
+    recurring.create_tables(conn)
+    for column, decl in (("template_id", "INTEGER"), ("occurrence_key", "TEXT")):
+        if not _has_column(conn, "todos", column):
+            conn.execute(f"ALTER TABLE todos ADD COLUMN {column} {decl}")
+    # 같은 템플릿의 같은 회차는 한 번만 (INSERT OR IGNORE 로 재시작/동시 실행에도 중복 없이)
+    conn.execute("""CREATE UNIQUE INDEX IF NOT EXISTS idx_todos_template_occurrence
+                    ON todos (template_id, occurrence_key) WHERE template_id IS NOT NULL""")
+
+
+def _add_analytics_tables(conn):
+    # 리더보드 / 일별 완료 / 인기 보상 집계 표를 만들고 지금까지의 원장으로 채운다 (analytics.rebuild 와 같은 본문).
+    # 마이그레이션은 트랜잭션 안이라 별도 보관 파일을 ATTACH 할 수 없으므로, 그 파일로 옮겨진 구매는
+    # manage.py analytics --full 로 다시 계산해야 보상별 집계에 들어간다.
+    analytics.create_tables(conn)
+    analytics.backfill(conn)
+
+
+def _add_catalog_version(conn):
+    # 보상이 바뀔 때마다 올라가는 버전 행과 트리거 (다른 프로세스의 보상 목록 캐시 무효화)
+    catalog.create_tables(conn)
+
+
+# (버전, 설명, 함수) — 버전은 1부터 빠짐없이 증가해야 한다
+MIGRATIONS = [
+    (1, "users.created_at 컬럼 추가", _add_users_created_at),
+    (2, "rewards.stock 컬럼 추가", _add_rewards_stock),
+    (3, "todos / purchases 조회용 인덱스 추가", _add_lookup_indexes),
+    (4, "포인트 원장과 사용자 통계 테이블 추가", _add_points_ledger),
+    (5, "완료 할일 / 구매 이력 보관 테이블 추가", _add_archive_tables),
+    (6, "할일 / 보상 전문 검색 색인 (FTS5) 추가", _add_search_index),
+    (7, "반복 미션 템플릿과 회차 키 추가", _add_recurring_templates),
+    (8, "랭킹 / 통계 집계 표 추가", _add_analytics_tables),
+    (9, "보상 변경 버전 (프로세스 간 보상 캐시 무효화) 추가", _add_catalog_version),
+]
+
+LATEST_VERSION = MIGRATIONS[-1][0]
+
+# 초기 보상 데이터 (보상 테이블이 비어 있을 때만)
+DEFAULT_REWARDS = [
+    ("5분 휴식권", 15, "짧은 휴식으로 재충전하세요", -1),
+    ("간식권", 30, "작은 간식을 받을 수 있는 쿠폰", 10),
+    ("30분 자유시간", 60, "집중 해제 시간", 5),
+]
+
+
+def current_version(conn):
+    return conn.execute("PRAGMA user_version").fetchone()[0]
+
+
+def migrate(conn, target=None):
+    # 적용한 버전 목록을 돌려준다. 이미 최신이면 PRAGMA 한 번으로 끝난다.
+    # target 을 주면 그 버전까지만 적용한다 (벤치마크에서 이전 스키마를 재현할 때).
+    target = LATEST_VERSION if target is None else target
+    if current_version(conn) >= target:
+        return []
+    applied = []
+    # 여러 프로세스가 동시에 시작해도 한 곳에서만 적용되도록 쓰기 잠금(BEGIN IMMEDIATE)을 먼저 잡는다
+    with transaction(conn):
+        version = current_version(conn)
+        if version == 0:
+            for stmt in BASE_SCHEMA:
+                conn.execute(stmt)
+        for step_version, _desc, step in MIGRATIONS:
+            if step_version <= version or step_version > target:
+                continue
+            step(conn)
+            conn.execute(f"PRAGMA user_version={step_version}")
+            applied.append(step_version)
+    return applied
+
+
+def seed_rewards(conn):
+    # 확인과 삽입을 한 트랜잭션으로 해서 두 프로세스가 동시에 시작해도 한 번만 넣는다
+    with transaction(conn):
+        existing = conn.execute("SELECT COUNT(*) FROM rewards").fetchone()[0]
+        if existing == 0:
+            conn.executemany("INSERT INTO rewards (name,cost,description,stock) VALUES (?,?,?,?)", DEFAULT_REWARDS)
+
+
+# ---------- 프로세스 단위 1회 실행 ----------
+_ready = set()
+_ready_lock = threading.Lock()
+
+
+def ensure_schema(pool):
+    # 이 프로세스에서 처음 호출될 때만 마이그레이션과 보상 시드를 실행한다. 실행했으면 True.
+    if pool.path in _ready:
+        return False
+    with _ready_lock:
+        if pool.path in _ready:
+            return False
+        with pool.connection() as conn:
+            if migrate(conn):
+                get_schema(pool.path).invalidate()
+            seed_rewards(conn)
+        _ready.add(pool.path)
+    return True
@@ -0,0 +1,245 @@
+# file: recurring.py
+# 반복 미션 템플릿: 템플릿(todo_templates)은 한 번만 저장하고, 때가 된 회차만 todos 행으로 만든다.
+#
+# 일정은 5필드 cron 식(분 시 일 월 요일)으로 저장한다. "매일 07:00" = "0 7 * * *", "월/수 21:30" = "30 21 * * 1,3".
+# 템플릿마다 next_due_at(다음 회차 시각)을 들고 있어서, 만들 것이 있는지는 (user_id, next_due_at) 인덱스 범위 조회로 끝난다.
+# 즉 화면을 그릴 때의 비용은 전체 템플릿 수가 아니라 지금 때가 된 템플릿 수에 비례한다.
+#
+# 회차마다 todos.occurrence_key(회차 시각)를 넣고 (template_id, occurrence_key) 에 유일 인덱스를 두어
+# INSERT OR IGNORE 로 넣으므로, 화면 조회와 백그라운드 스케줄러가 겹치거나 재시작해도 같은 회차가 두 번 생기지 않는다.
+# 오래 접속하지 않아 여러 회차가 밀렸으면 가장 최근 회차 하나만 만든다 (매일 미션이 30개 쌓이지 않게).
+import logging
+import threading
+import time
+from datetime import datetime, timedelta
+
+import settings
+from db import transaction
+
+log = logging.getLogger("todomaker.recurring")
+
+
+# ---------- cron 식 ----------
+_FIELDS = (
+    ("minute", 0, 59),
+    ("hour", 0, 23),
+    ("day", 1, 31),
+    ("month", 1, 12),
+    ("weekday", 0, 6),  # 0 = 일요일 (7 도 일요일로 받는다)
+)
+
+
+def _parse_field(text, lo, hi, name):
+    values = set()
+    for part in text.split(","):
+        part, _, step = part.partition("/")
+        try:
+            step = int(step) if step else 1
+            if part == "*":
+                start, end = lo, hi
+            elif "-" in part:
+                a, b = part.split("-", 1)
+                start, end = int(a), int(b)
+            else:
+                start = int(part)
+                end = hi if step > 1 else start
+        except ValueError:
+            raise ValueError(f"cron {name} 필드를 해석할 수 없습니다: {text}") from None
+        if name == "weekday":
+            # 7 = 일요일
+            end = min(end, 7)
+        if step < 1 or start < lo or end > (7 if name == "weekday" else hi) or start > end:
+            raise ValueError(f"cron {name} 필드 범위를 벗어났습니다: {text}")
+        values.update(v % 7 if name == "weekday" else v for v in range(start, end + 1, step))
+    return frozenset(values)
+
+
+class CronSchedule:
+    def __init__(self, expr):
+        parts = expr.split()
+        if len(parts) != 5:
+            raise ValueError("cron 식은 '분 시 일 월 요일' 5개 필드여야 합니다.")
+        self.expr = " ".join(parts)
+        fields = [_parse_field(p, lo, hi, name) for p, (name, lo, hi) in zip(parts, _FIELDS)]
+        self.minutes, self.hours, self.days, self.months, self.weekdays = fields
+        # cron 관례: 일과 요일이 둘 다 제한돼 있으면 둘 중 하나만 맞아도 된다
+        self._day_any = parts[2] == "*"
+        self._weekday_any = parts[4] == "*"
+
+    def _day_matches(self, d):
+        day_ok = d.day in self.days
+        weekday_ok = (d.isoweekday() % 7) in self.weekdays
+        if self._day_any or self._weekday_any:
+            return day_ok and weekday_ok
+        return day_ok or weekday_ok
+
+    def next_after(self, moment):
+        # moment 보다 뒤인 첫 회차 시각 (분 단위). 날짜 단위로 건너뛰므로 몇 년 뒤까지 봐도 빠르다.
+        start = moment.replace(second=0, microsecond=0) + timedelta(minutes=1)
+        day = start.replace(hour=0, minute=0)
+        for _ in range(366 * 5):
+            if day.month in self.months and self._day_matches(day):
+                for hour in sorted(self.hours):
+                    for minute in sorted(self.minutes):
+                        candidate = day.replace(hour=hour, minute=minute)
+                        if candidate >= start:
+                            return candidate
+            day += timedelta(days=1)
+        raise ValueError(f"다음 회차가 없는 cron 식입니다: {self.expr}")
+
+    def latest_at_or_before(self, moment, since):
+        # since(회차 시각) 이후 moment 이하인 마지막 회차 (없으면 None). 밀린 회차를 하나로 합칠 때 쓴다.
+        # 매분 일정이 한 달 밀려도 4만 번 돌지 않도록 최근 하루/한 달/일 년 구간부터 찾아본다.
+        for days in (1, 32, 367, None):
+            start = since if days is None else max(since, moment - timedelta(days=days))
+            due = start if start == since else self.next_after(start - timedelta(minutes=1))
+            latest = None
+            while due <= moment:
+                latest = due
+                due = self.next_after(due)
+            if latest is not None or start == since:
+                return latest
+        return None
+
+
+def daily(hour, minute=0):
+    return f"{minute} {hour} * * *"
+
+
+def weekly(weekdays, hour, minute=0):
+    # weekdays: 0=일 ... 6=토
+    return f"{minute} {hour} * * {','.join(str(d) for d in sorted(weekdays))}"
+
+
+# ---------- 템플릿 ----------
+TEMPLATE_DDL = [
+    """CREATE TABLE IF NOT EXISTS todo_templates (
+           id INTEGER PRIMARY KEY AUTOINCREMENT,
+           user_id INTEGER NOT NULL,
+           title TEXT NOT NULL,
+           points_reward INTEGER NOT NULL,
+           schedule TEXT NOT NULL,
+           next_due_at TEXT NOT NULL,
+           active INTEGER NOT NULL DEFAULT 1,
+           created_at TEXT)""",
+    # 스케줄러: WHERE active=1 AND next_due_at <= ? (때가 된 것만 읽는다)
+    """CREATE INDEX IF NOT EXISTS idx_templates_due ON todo_templates (next_due_at) WHERE active=1""",
+    # 화면 조회: WHERE user_id=? AND active=1 AND next_due_at <= ?
+    """CREATE INDEX IF NOT EXISTS idx_templates_user_due ON todo_templates (user_id, next_due_at) WHERE active=1""",
+]
+
+
+def create_tables(conn):
+    for stmt in TEMPLATE_DDL:
+        conn.execute(stmt)
+
+
+def _iso(moment):
+    return moment.strftime("%Y-%m-%dT%H:%M")
+
+
+def add_template(conn, user_id, title, points_reward, schedule, now=None):
+    # 첫 회차는 지금 이후의 첫 일정. 잘못된 cron 식이면 ValueError.
+    now = now or datetime.now()
+    cron = CronSchedule(schedule)
+    first = cron.next_after(now - timedelta(minutes=1))
+    with transaction(conn):
+        cur = conn.execute(
+            """INSERT INTO todo_templates (user_id,title,points_reward,schedule,next_due_at,active,created_at)
+               VALUES (?,?,?,?,?,1,?)""",
+            (user_id, title, points_reward, cron.expr, _iso(first), now.isoformat()))
+    return cur.lastrowid
+
+
+def list_templates(conn, user_id):
+    return conn.execute(
+        "SELECT id,title,points_reward,schedule,next_due_at FROM todo_templates "
+        "WHERE user_id=? AND active=1 ORDER BY id", (user_id,)).fetchall()
+
+
+def deactivate_template(conn, user_id, template_id):
+    # 이미 만들어진 회차(todos 행)는 그대로 둔다
+    with transaction(conn):
+        cur = conn.execute("UPDATE todo_templates SET active=0 WHERE id=? AND user_id=?", (template_id, user_id))
+    return cur.rowcount > 0
+
+
+# ---------- 회차 만들기 ----------
+def has_due(conn, user_id, now=None):
+    # 쓰기 잠금 없이 인덱스 한 번으로 확인 (대부분의 화면 조회는 여기서 끝난다)
+    now = now or datetime.now()
+    return conn.execute(
+        "SELECT 1 FROM todo_templates WHERE user_id=? AND active=1 AND next_due_at <= ? LIMIT 1",
+        (user_id, _iso(now))).fetchone() is not None
+
+
+def materialize_due(conn, user_id=None, now=None, batch=None):
+    # 때가 된 템플릿의 회차를 만들고 만든 todos 행 수를 돌려준다. user_id 가 없으면 전체 사용자 (스케줄러).
+    # batch 개씩 트랜잭션을 나눠 쓰기 잠금을 짧게 잡는다.
+    now = now or datetime.now()
+    batch = settings.RECURRING_BATCH if batch is None else batch
+    now_key = _iso(now)
+    created = 0
+    while True:
+        with transaction(conn):
+            sql = ("SELECT id,user_id,title,points_reward,schedule,next_due_at FROM todo_templates "
+                   "WHERE active=1 AND next_due_at <= ?")
+            params = [now_key]
+            if user_id is not None:
+                sql += " AND user_id=?"
+                params.append(user_id)
+            sql += " ORDER BY next_due_at LIMIT ?"
+            params.append(batch)
+            due = conn.execute(sql, params).fetchall()
+            inserts = []
+            advances = []
+            for tid, uid, title, points, schedule, next_due_at in due:
+                try:
+                    cron = CronSchedule(schedule)
+                    occurrence = cron.latest_at_or_before(now, datetime.fromisoformat(next_due_at))
+                    following = cron.next_after(now)
+                except ValueError as e:
+                    # 잘못 저장된 일정은 멈춰 두고 다음 템플릿으로
+                    log.warning("template %s disabled: %s", tid, e)
+                    conn.execute("UPDATE todo_templates SET active=0 WHERE id=?", (tid,))
+                    continue
+                inserts.append((uid, title, points, occurrence.isoformat(), tid, _iso(occurrence)))
+                advances.append((_iso(following), tid))
+            if inserts:
+                cur = conn.executemany(
+                    """INSERT OR IGNORE INTO todos
+                           (user_id,title,points_reward,created_at,template_id,occurrence_key)
+                       VALUES (?,?,?,?,?,?)""", inserts)
+                created += max(cur.rowcount, 0)
+                conn.executemany("UPDATE todo_templates SET next_due_at=? WHERE id=?", advances)
+        if len(due) < batch:
+            return created
+
+
+# ---------- 백그라운드 스케줄러 ----------
+_scheduler_started = set()
+_scheduler_lock = threading.Lock()
+
+
+def start_scheduler(store, interval=None):
+    # 이 DB 에 대해 프로세스당 하나의 스케줄러 스레드를 띄운다. interval 이 0 이면 띄우지 않는다 (화면 조회 때만 생성).
+    interval = settings.RECURRING_INTERVAL if interval is None else interval
+    if not interval:
+        return False
+    with _scheduler_lock:
+        if store.pool.path in _scheduler_started:
+            return False
+        _scheduler_started.add(store.pool.path)
+
+    def loop():
+        while True:
+            try:
+                created = store.materialize_due()
+                if created:
+                    log.info("materialized %d recurring todo(s)", created)
+            except Exception as e:
+                log.warning("recurring scheduler failed: %s", e)
+            time.sleep(interval)
+
+    threading.Thread(target=loop, name="todo-recurring", daemon=True).start()
+    return True
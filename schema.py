@@ -0,0 +1,40 @@
+# file: schema.py
+# 테이블 컬럼 정보 캐시. PRAGMA table_info 는 테이블마다 처음 한 번만 실행하고,
+# 마이그레이션이 실제로 적용됐을 때만 비운다.
+import threading
+
+
+class SchemaCache:
+    def __init__(self):
+        self._columns = {}
+        self._lock = threading.Lock()
+
+    def columns(self, conn, table):
+        cols = self._columns.get(table)
+        if cols is None:
+            rows = conn.execute(f"PRAGMA table_info('{table}')").fetchall()
+            cols = frozenset(r[1] for r in rows)
+            with self._lock:
+                self._columns[table] = cols
+        return cols
+
+    def has_column(self, conn, table, column):
+        return column in self.columns(conn, table)
+
+    def invalidate(self):
+        with self._lock:
+            self._columns.clear()
+
+
+# ---------- DB 파일별 캐시 ----------
+_caches = {}
+_caches_lock = threading.Lock()
+
+
+def get_schema(path):
+    with _caches_lock:
+        cache = _caches.get(path)
+        if cache is None:
+            cache = SchemaCache()
+            _caches[path] = cache
+        return cache
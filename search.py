@@ -0,0 +1,143 @@
+# file: search.py
+# FTS5 전문 검색: 할일 제목(todos.title)과 보상 이름/설명(rewards.name, description).
+#
+# 색인은 external content 테이블이라 본문을 한 번 더 저장하지 않고, todos / rewards 의 트리거가 같은 트랜잭션에서 맞춘다.
+# 할일 색인에는 owner 열('u' || user_id)을 함께 넣어 "owner:u42 AND ..." 로 사용자 범위를 색인 안에서 좁힌다
+# (전체 사용자 일치 결과를 읽은 뒤 user_id 로 거르지 않는다).
+# 정렬은 두 가지:
+#   - "rank": bm25 관련도 순, 커서 (점수, id). bm25 는 검색어마다 전체 문서 빈도를 읽으므로
+#     흔한 낱말일수록(100만 행에서 수 ms~수십 ms) 비싸다.
+#   - "recent": 최근 추가 순, 커서 (id,). 색인의 rowid 역순으로 읽다가 LIMIT 에서 멈추므로 낱말 빈도와 무관하게 싸다.
+import re
+
+from services import Page, _page
+
+TODO_SEARCH_DDL = [
+    # FTS5 의 external content 원본은 뷰여도 된다 (rebuild 때 owner 열을 만들어 준다)
+    """CREATE VIEW IF NOT EXISTS todos_search_src AS
+           SELECT id, title, 'u' || user_id AS owner FROM todos""",
+    """CREATE VIRTUAL TABLE IF NOT EXISTS todos_fts USING fts5(
+           title, owner, content='todos_search_src', content_rowid='id', prefix='2 3')""",
+    """CREATE TRIGGER IF NOT EXISTS todos_fts_ai AFTER INSERT ON todos BEGIN
+           INSERT INTO todos_fts (rowid, title, owner) VALUES (new.id, new.title, 'u' || new.user_id);
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS todos_fts_ad AFTER DELETE ON todos BEGIN
+           INSERT INTO todos_fts (todos_fts, rowid, title, owner) VALUES ('delete', old.id, old.title, 'u' || old.user_id);
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS todos_fts_au AFTER UPDATE OF title, user_id ON todos BEGIN
+           INSERT INTO todos_fts (todos_fts, rowid, title, owner) VALUES ('delete', old.id, old.title, 'u' || old.user_id);
+           INSERT INTO todos_fts (rowid, title, owner) VALUES (new.id, new.title, 'u' || new.user_id);
+       END""",
+]
+
+REWARD_SEARCH_DDL = [
+    """CREATE VIRTUAL TABLE IF NOT EXISTS rewards_fts USING fts5(
+           name, description, content='rewards', content_rowid='id', prefix='2')""",
+    """CREATE TRIGGER IF NOT EXISTS rewards_fts_ai AFTER INSERT ON rewards BEGIN
+           INSERT INTO rewards_fts (rowid, name, description) VALUES (new.id, new.name, new.description);
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS rewards_fts_ad AFTER DELETE ON rewards BEGIN
+           INSERT INTO rewards_fts (rewards_fts, rowid, name, description)
+           VALUES ('delete', old.id, old.name, old.description);
+       END""",
+    """CREATE TRIGGER IF NOT EXISTS rewards_fts_au AFTER UPDATE OF name, description ON rewards BEGIN
+           INSERT INTO rewards_fts (rewards_fts, rowid, name, description)
+           VALUES ('delete', old.id, old.name, old.description);
+           INSERT INTO rewards_fts (rowid, name, description) VALUES (new.id, new.name, new.description);
+       END""",
+]
+
+
+def create_index(conn):
+    # 색인/트리거를 만들고 기존 행으로 색인을 채운다. 중복 실행해도 안전하다.
+    for stmt in TODO_SEARCH_DDL + REWARD_SEARCH_DDL:
+        conn.execute(stmt)
+    rebuild(conn)
+
+
+def rebuild(conn):
+    # 원본 테이블에서 색인을 다시 만든다 (트리거를 거치지 않고 바뀐 데이터가 있을 때)
+    conn.execute("INSERT INTO todos_fts (todos_fts) VALUES ('rebuild')")
+    conn.execute("INSERT INTO rewards_fts (rewards_fts) VALUES ('rebuild')")
+
+
+# ---------- 검색어 ----------
+_TERM = re.compile(r"\w+", re.UNICODE)
+
+
+def match_query(text, column=None):
+    # 사용자가 입력한 문자열을 안전한 FTS5 MATCH 식으로 바꾼다. 낱말마다 접두어 검색, 모두 포함(AND).
+    # FTS5 문법 문자("*", ":", 괄호, NEAR 등)는 낱말만 뽑아 따옴표로 감싸므로 그대로 전달되지 않는다.
+    # 검색할 낱말이 없으면 None.
+    terms = _TERM.findall(text or "")
+    if not terms:
+        return None
+    expr = " AND ".join(f'"{t}"*' for t in terms)
+    return f"{column} : ({expr})" if column else expr
+
+
+# ---------- 할일 검색 ----------
+def search_todos(conn, user_id, text, limit, cursor=None, status=None, date_field="created_at",
+                 date_from=None, date_to=None, min_points=None, max_points=None, order="rank"):
+    # (id, title, points_reward, completed, created_at, completed_at, score) 행의 Page. score 는 작을수록 관련도가 높다 (recent 정렬이면 NULL).
+    # status: None(전체) / "open" / "done". date_field: created_at 또는 completed_at, date_from/date_to 는
+    # ISO 날짜 문자열이고 date_to 는 그날 끝까지 포함한다. order: "rank"(관련도) / "recent"(최근 추가 순).
+    # 순위는 색인 통계에 따라 조금씩 바뀌므로, 페이지를 넘기는 사이 쓰기가 있으면 경계의 행이 한 번 더 보이거나 빠질 수 있다.
+    if date_field not in ("created_at", "completed_at"):
+        raise ValueError(f"지원하지 않는 날짜 기준입니다: {date_field}")
+    if order not in ("rank", "recent"):
+        raise ValueError(f"지원하지 않는 정렬입니다: {order}")
+    if cursor is not None and len(cursor) != (2 if order == "rank" else 1):
+        raise ValueError("커서 모양이 정렬과 맞지 않습니다 (rank: (score, id), recent: (id,))")
+    terms = match_query(text, "title")
+    if terms is None:
+        return Page([], None)
+    # owner 열은 범위 제한용이므로 순위 계산에서 뺀다 (가중치 0)
+    score = "bm25(todos_fts, 1.0, 0.0)" if order == "rank" else "NULL"
+    sql = ("SELECT t.id, t.title, t.points_reward, t.completed, t.created_at, t.completed_at, "
+           f"{score} AS score "
+           "FROM todos_fts JOIN todos t ON t.id = todos_fts.rowid WHERE todos_fts MATCH ?")
+    params = [f"owner : u{int(user_id)} AND {terms}"]
+    if status == "open":
+        sql += " AND t.completed = 0"
+    elif status == "done":
+        sql += " AND t.completed = 1"
+    # 저장값은 ISO 시각 문자열이므로 앞 10자리(날짜)만 비교하면 date_to 당일 전체가 포함된다
+    if date_from:
+        sql += f" AND substr(t.{date_field}, 1, 10) >= ?"
+        params.append(date_from)
+    if date_to:
+        sql += f" AND substr(t.{date_field}, 1, 10) <= ?"
+        params.append(date_to)
+    if min_points is not None:
+        sql += " AND t.points_reward >= ?"
+        params.append(min_points)
+    if max_points is not None:
+        sql += " AND t.points_reward <= ?"
+        params.append(max_points)
+    if order == "rank":
+        if cursor is not None:
+            sql += " AND (bm25(todos_fts, 1.0, 0.0), t.id) > (?, ?)"
+            params.extend(cursor)
+        sql += " ORDER BY score, t.id LIMIT ?"
+        cursor_of = lambda r: (r[6], r[0])
+    else:
+        if cursor is not None:
+            sql += " AND todos_fts.rowid < ?"
+            params.append(cursor[0])
+        sql += " ORDER BY todos_fts.rowid DESC LIMIT ?"
+        cursor_of = lambda r: (r[0],)
+    params.append(limit + 1)
+    return _page(conn.execute(sql, params).fetchall(), limit, cursor_of)
+
+
+# ---------- 보상 검색 ----------
+def search_rewards(conn, text, limit=50):
+    # (id, name, cost, description, stock, score) 목록. 보상은 적으므로 페이지 없이 상위 limit 개.
+    terms = match_query(text)
+    if terms is None:
+        return []
+    return conn.execute(
+        "SELECT r.id, r.name, r.cost, r.description, r.stock, bm25(rewards_fts) AS score "
+        "FROM rewards_fts JOIN rewards r ON r.id = rewards_fts.rowid "
+        "WHERE rewards_fts MATCH ? ORDER BY score, r.id LIMIT ?", (terms, limit)).fetchall()
@@ -0,0 +1,318 @@
+# file: services.py
+# Streamlit 과 무관한 데이터 접근 함수. 모두 sqlite3 연결을 첫 인자로 받는다.
+import csv
+import io
+import json
+from datetime import date, datetime, timedelta
+from enum import Enum
+from typing import NamedTuple, Optional
+
+from db import transaction
+
+
+class Page(NamedTuple):
+    rows: list
+    # 다음 페이지를 읽을 때 넘길 커서. 마지막 페이지면 None.
+    next_cursor: Optional[tuple]
+
+
+def _page(rows, limit, cursor_of):
+    if len(rows) > limit:
+        rows = rows[:limit]
+        return Page(rows, cursor_of(rows[-1]))
+    return Page(rows, None)
+
+
+# ---------- keyset 페이지네이션 ----------
+# OFFSET 대신 마지막으로 본 행의 정렬 키를 커서로 써서, 몇 번째 페이지든 인덱스 탐색 한 번으로 읽는다.
+def list_in_progress(conn, user_id, limit, cursor=None):
+    # 커서: (id,)
+    sql = "SELECT id,title,points_reward,created_at FROM todos WHERE user_id=? AND completed=0"
+    params = [user_id]
+    if cursor is not None:
+        sql += " AND id < ?"
+        params.append(cursor[0])
+    sql += " ORDER BY id DESC LIMIT ?"
+    params.append(limit + 1)
+    return _page(conn.execute(sql, params).fetchall(), limit, lambda r: (r[0],))
+
+
+def list_completed(conn, user_id, limit, cursor=None):
+    # 커서: (completed_at, id)
+    sql = "SELECT id,title,points_reward,completed_at FROM todos WHERE user_id=? AND completed=1"
+    params = [user_id]
+    if cursor is not None:
+        sql += " AND (completed_at, id) < (?, ?)"
+        params.extend(cursor)
+    sql += " ORDER BY completed_at DESC, id DESC LIMIT ?"
+    params.append(limit + 1)
+    return _page(conn.execute(sql, params).fetchall(), limit, lambda r: (r[3], r[0]))
+
+
+def list_purchases(conn, user_id, limit, cursor=None):
+    # 커서: (purchased_at, id)
+    sql = ("SELECT p.id, r.name, p.purchased_at FROM purchases p "
+           "JOIN rewards r ON p.reward_id = r.id WHERE p.user_id=?")
+    params = [user_id]
+    if cursor is not None:
+        sql += " AND (p.purchased_at, p.id) < (?, ?)"
+        params.extend(cursor)
+    sql += " ORDER BY p.purchased_at DESC, p.id DESC LIMIT ?"
+    params.append(limit + 1)
+    return _page(conn.execute(sql, params).fetchall(), limit, lambda r: (r[2], r[0]))
+
+
+# ---------- 포인트 원장 / 사용자 통계 ----------
+# points_ledger 는 포인트가 바뀐 이유를 한 줄씩 쌓는 추가 전용 테이블이고 (ref_id: 'todo' 는 todos.id, 'purchase' 는 purchases.id),
+# user_stats 는 적립/사용/완료 수/연속 일수를 같은 트랜잭션 안에서 누적하는 요약 행이다.
+class UserStats(NamedTuple):
+    points: int
+    total_earned: int
+    total_spent: int
+    completed_count: int
+    current_streak: int
+    last_completed_on: Optional[str]
+
+
+def _ensure_stats_row(conn, user_id):
+    conn.execute("INSERT OR IGNORE INTO user_stats (user_id) VALUES (?)", (user_id,))
+
+
+def _record_completions(conn, user_id, count, earned, day):
+    # 같은 날 다시 완료하면 연속 일수 유지, 어제 이어서 완료하면 +1, 그 외에는 1부터 다시
+    _ensure_stats_row(conn, user_id)
+    conn.execute(
+        """UPDATE user_stats SET
+               total_earned = total_earned + ?,
+               completed_count = completed_count + ?,
+               current_streak = CASE WHEN last_completed_on = ? THEN current_streak
+                                     WHEN last_completed_on = ? THEN current_streak + 1
+                                     ELSE 1 END,
+               last_completed_on = ?
+           WHERE user_id=?""",
+        (earned, count, day.isoformat(), (day - timedelta(days=1)).isoformat(), day.isoformat(), user_id))
+
+
+def get_user_stats(conn, user_id, today=None):
+    # 기본키 조회 한 번. 사용자가 없으면 None.
+    row = conn.execute(
+        """SELECT u.points, COALESCE(s.total_earned, 0), COALESCE(s.total_spent, 0),
+                  COALESCE(s.completed_count, 0), COALESCE(s.current_streak, 0), s.last_completed_on
+           FROM users u LEFT JOIN user_stats s ON s.user_id = u.id WHERE u.id=?""", (user_id,)).fetchone()
+    if row is None:
+        return None
+    stats = UserStats(*row)
+    # 마지막 완료가 어제보다 오래됐으면 연속 기록은 끊긴 것
+    today = today or date.today()
+    if stats.last_completed_on not in (today.isoformat(), (today - timedelta(days=1)).isoformat()):
+        stats = stats._replace(current_streak=0)
+    return stats
+
+
+def rebuild_stats(conn):
+    # 원장과 users.points 를 맞추고 user_stats 를 원장에서 통째로 다시 만든다 (manage.py reconcile).
+    # 보정 행 수를 돌려준다.
+    with transaction(conn):
+        return backfill_stats(conn)
+
+
+def backfill_stats(conn):
+    # rebuild_stats 의 본문. 호출하는 쪽의 트랜잭션 안에서 실행한다 (마이그레이션 4 도 이것을 쓴다).
+    # 원장 합계와 현재 포인트가 다르면 차이를 'adjust' 행으로 남긴다
+    cur = conn.execute(
+        """INSERT INTO points_ledger (user_id,delta,reason,ref_id,created_at)
+           SELECT u.id, u.points - COALESCE(l.total, 0), 'adjust', NULL, ?
+           FROM users u LEFT JOIN (SELECT user_id, SUM(delta) AS total FROM points_ledger GROUP BY user_id) l
+             ON l.user_id = u.id
+           WHERE u.points - COALESCE(l.total, 0) != 0""", (datetime.now().isoformat(),))
+    adjusted = cur.rowcount
+    conn.execute("DELETE FROM user_stats")
+    conn.execute(
+        """INSERT INTO user_stats (user_id,total_earned,total_spent,completed_count)
+           SELECT user_id,
+                  SUM(CASE WHEN reason='todo' THEN delta ELSE 0 END),
+                  -SUM(CASE WHEN reason='purchase' THEN delta ELSE 0 END),
+                  SUM(reason='todo')
+           FROM points_ledger GROUP BY user_id""")
+    # 연속 일수: 사용자별 완료 날짜를 최신순으로 훑으며 마지막 날부터 끊기지 않은 일수를 센다
+    rows = conn.execute(
+        """SELECT DISTINCT user_id, substr(created_at, 1, 10) AS day FROM points_ledger
+           WHERE reason='todo' AND length(created_at) >= 10 ORDER BY user_id, day DESC""")
+    runs = {}  # user_id -> [마지막 완료일, 지금까지 이어진 가장 이른 날, 연속 일수, 끊김 여부]
+    for uid, day in rows:
+        day = date.fromisoformat(day)
+        run = runs.get(uid)
+        if run is None:
+            runs[uid] = [day, day, 1, False]
+        elif not run[3]:
+            if run[1] - day == timedelta(days=1):
+                run[1] = day
+                run[2] += 1
+            else:
+                run[3] = True
+    updates = [(run[2], run[0].isoformat(), uid) for uid, run in runs.items()]
+    conn.executemany("UPDATE user_stats SET current_streak=?, last_completed_on=? WHERE user_id=?", updates)
+    return adjusted
+
+
+# ---------- 보상 구매 ----------
+class PurchaseStatus(Enum):
+    OK = "ok"
+    NOT_FOUND = "not_found"
+    INSUFFICIENT_POINTS = "insufficient_points"
+    OUT_OF_STOCK = "out_of_stock"
+
+
+class PurchaseResult(NamedTuple):
+    status: PurchaseStatus
+    purchase_id: Optional[int] = None
+    # 구매 후 남은 포인트
+    points: Optional[int] = None
+    # 구매 후 재고 (-1 또는 None 은 무제한)
+    stock: Optional[int] = None
+
+    @property
+    def ok(self):
+        return self.status is PurchaseStatus.OK
+
+
+class _Rejected(Exception):
+    def __init__(self, result):
+        super().__init__(result.status.value)
+        self.result = result
+
+
+def purchase_reward(conn, user_id, reward_id):
+    # 포인트 차감, 재고 차감, 구매 기록을 한 트랜잭션에서 처리한다.
+    # 조건부 UPDATE 의 영향 행 수로 검사하므로 동시에 마지막 재고를 사도 한 명만 성공한다.
+    try:
+        with transaction(conn):
+            cur = conn.execute(
+                "UPDATE rewards SET stock = CASE WHEN stock > 0 THEN stock - 1 ELSE stock END "
+                "WHERE id=? AND (stock > 0 OR stock = -1 OR stock IS NULL)", (reward_id,))
+            if cur.rowcount == 0:
+                exists = conn.execute("SELECT 1 FROM rewards WHERE id=?", (reward_id,)).fetchone()
+                status = PurchaseStatus.OUT_OF_STOCK if exists else PurchaseStatus.NOT_FOUND
+                raise _Rejected(PurchaseResult(status, stock=0 if exists else None))
+            cost, stock = conn.execute("SELECT cost, stock FROM rewards WHERE id=?", (reward_id,)).fetchone()
+
+            cur = conn.execute("UPDATE users SET points = points - ? WHERE id=? AND points >= ?",
+                               (cost, user_id, cost))
+            if cur.rowcount == 0:
+                row = conn.execute("SELECT points FROM users WHERE id=?", (user_id,)).fetchone()
+                if row is None:
+                    raise _Rejected(PurchaseResult(PurchaseStatus.NOT_FOUND))
+                raise _Rejected(PurchaseResult(PurchaseStatus.INSUFFICIENT_POINTS, points=row[0]))
+
+            stamp = datetime.now().isoformat()
+            cur = conn.execute("INSERT INTO purchases (user_id,reward_id,purchased_at) VALUES (?,?,?)",
+                               (user_id, reward_id, stamp))
+            purchase_id = cur.lastrowid
+            conn.execute("INSERT INTO points_ledger (user_id,delta,reason,ref_id,created_at) "
+                         "VALUES (?,?,'purchase',?,?)", (user_id, -cost, purchase_id, stamp))
+            _ensure_stats_row(conn, user_id)
+            conn.execute("UPDATE user_stats SET total_spent = total_spent + ? WHERE user_id=?", (cost, user_id))
+            points = conn.execute("SELECT points FROM users WHERE id=?", (user_id,)).fetchone()[0]
+    except _Rejected as rejected:
+        return rejected.result
+    return PurchaseResult(PurchaseStatus.OK, purchase_id, points, stock)
+
+
+# ---------- 할일 일괄 처리 ----------
+# SQLite 바인딩 변수 개수 제한(구버전 999)을 넘지 않도록 IN (...) 목록을 나눈다
+_CHUNK = 500
+
+
+def _chunks(items, size=_CHUNK):
+    items = list(items)
+    for i in range(0, len(items), size):
+        yield items[i:i + size]
+
+
+def complete_todos(conn, user_id, todo_ids):
+    # 진행중인 할일 여러 개를 한 트랜잭션에서 완료하고, 보상 포인트 합계를 한 번에 적립한다.
+    # (완료 처리된 개수, 적립 포인트) 를 돌려준다. 이미 완료됐거나 남의 할일인 id 는 무시된다.
+    now = datetime.now()
+    stamp = now.isoformat()
+    count = earned = 0
+    with transaction(conn):
+        for chunk in _chunks(todo_ids):
+            marks = ",".join("?" * len(chunk))
+            where = f"user_id=? AND completed=0 AND id IN ({marks})"
+            n, pts = conn.execute(f"SELECT COUNT(*), COALESCE(SUM(points_reward), 0) FROM todos WHERE {where}",
+                                  [user_id, *chunk]).fetchone()
+            if n == 0:
+                continue
+            # 완료 처리 전에 원장에 할일별 적립 내역을 남긴다
+            conn.execute("INSERT INTO points_ledger (user_id,delta,reason,ref_id,created_at) "
+                         f"SELECT user_id, points_reward, 'todo', id, ? FROM todos WHERE {where}",
+                         [stamp, user_id, *chunk])
+            conn.execute(f"UPDATE todos SET completed=1, completed_at=? WHERE {where}", [stamp, user_id, *chunk])
+            count += n
+            earned += pts
+        if count:
+            conn.execute("UPDATE users SET points = points + ? WHERE id=?", (earned, user_id))
+            _record_completions(conn, user_id, count, earned, now.date())
+    return count, earned
+
+
+def delete_todos(conn, user_id, todo_ids):
+    # 삭제된 개수를 돌려준다
+    deleted = 0
+    with transaction(conn):
+        for chunk in _chunks(todo_ids):
+            marks = ",".join("?" * len(chunk))
+            cur = conn.execute(f"DELETE FROM todos WHERE user_id=? AND id IN ({marks})", [user_id, *chunk])
+            deleted += cur.rowcount
+    return deleted
+
+
+def parse_todo_import(data, fmt):
+    # CSV(헤더: title, points) 또는 JSON(객체 목록 또는 제목 문자열 목록)을 (제목, 포인트) 목록으로 바꾼다.
+    # 형식이 잘못되면 ValueError.
+    if isinstance(data, bytes):
+        data = data.decode("utf-8-sig")
+    if fmt == "csv":
+        reader = csv.DictReader(io.StringIO(data))
+        if not reader.fieldnames or "title" not in reader.fieldnames:
+            raise ValueError("CSV 에 title 열이 필요합니다.")
+        # 칸이 모자란 행의 빈 값(None)은 빈 칸과 같게 본다
+        items = [{k: ("" if v is None else v) for k, v in row.items()} for row in reader]
+    elif fmt == "json":
+        items = json.loads(data)
+        if not isinstance(items, list):
+            raise ValueError("JSON 은 목록이어야 합니다.")
+    else:
+        raise ValueError(f"지원하지 않는 형식: {fmt}")
+
+    rows = []
+    for n, item in enumerate(items, 1):
+        if isinstance(item, str):
+            item = {"title": item}
+        if not isinstance(item, dict):
+            raise ValueError(f"{n}번째 항목의 형식이 잘못되었습니다.")
+        title = str(item.get("title") or "").strip()
+        if not title:
+            raise ValueError(f"{n}번째 항목에 제목이 없습니다.")
+        key = "points" if "points" in item else "points_reward"
+        points = item.get(key)
+        # 포인트 열/키가 없거나 빈 칸일 때만 기본값. 0, null 등 그 밖의 값은 CSV 와 같은 검사를 거친다.
+        if key not in item or (isinstance(points, str) and not points.strip()):
+            points = 10
+        elif isinstance(points, str) and points.strip().lstrip("+-").isdigit():
+            points = int(points)
+        elif not isinstance(points, int) or isinstance(points, bool):
+            raise ValueError(f"{n}번째 항목의 포인트가 정수가 아닙니다.")
+        if points < 1:
+            raise ValueError(f"{n}번째 항목의 포인트는 1 이상이어야 합니다.")
+        rows.append((title, points))
+    return rows
+
+
+def import_todos(conn, user_id, rows):
+    # (제목, 포인트) 목록을 executemany 한 번, 커밋 한 번으로 추가한다
+    now = datetime.now().isoformat()
+    with transaction(conn):
+        conn.executemany("INSERT INTO todos (user_id,title,points_reward,created_at) VALUES (?,?,?,?)",
+                         ((user_id, title, points, now) for title, points in rows))
+    return len(rows)
@@ -0,0 +1,87 @@
+# file: settings.py
+# 앱 전체에서 쓰는 설정값. 모두 환경변수로 덮어쓸 수 있다.
+import os
+
+
+def _env_int(name, default):
+    value = os.environ.get(name)
+    if value is None or value.strip() == "":
+        return default
+    return int(value)
+
+
+# ---------- DB ----------
+DB_FILENAME = os.environ.get("TODO_DB_FILENAME", "todo_points.db")
+DB_PATH = os.environ.get("TODO_DB_PATH", os.path.join(os.getcwd(), DB_FILENAME))
+
+# 다른 연결이 쓰기 잠금을 잡고 있을 때 기다리는 시간 (ms)
+DB_BUSY_TIMEOUT_MS = _env_int("TODO_DB_BUSY_TIMEOUT_MS", 5000)
+
+# 연결마다 적용되는 PRAGMA 값
+# DB_SYNCHRONOUS 는 내구성 모드다 (WAL 기준):
+#   FULL   커밋마다 fsync. 전원이 나가도 커밋된 트랜잭션은 남는다
+#   NORMAL 체크포인트 때만 fsync. 전원이 나가면 마지막 몇 개 트랜잭션이 사라질 수 있지만 DB 가 깨지지는 않는다
+#   OFF    fsync 안 함. 벤치마크/임시 DB 용
+DB_SYNCHRONOUS = os.environ.get("TODO_DB_SYNCHRONOUS", "NORMAL").upper()
+DB_CACHE_SIZE = _env_int("TODO_DB_CACHE_SIZE", -16000)  # 음수는 KiB 단위 (-16000 = 약 16MB)
+DB_MMAP_SIZE = _env_int("TODO_DB_MMAP_SIZE", 64 * 1024 * 1024)
+
+# 풀에 반납된 뒤 재사용을 위해 보관하는 유휴 연결 수
+DB_POOL_MAX_IDLE = _env_int("TODO_DB_POOL_MAX_IDLE", 8)
+
+# 1 이면 쓰기를 그룹 커밋 스레드(db.GroupCommitWriter)로 보내 여러 세션의 쓰기를 한 트랜잭션으로 묶는다
+DB_GROUP_COMMIT = _env_int("TODO_DB_GROUP_COMMIT", 0) != 0
+# 첫 쓰기가 들어온 뒤 같은 배치로 묶을 쓰기를 기다리는 시간 (ms)
+DB_GROUP_COMMIT_WINDOW_MS = _env_int("TODO_DB_GROUP_COMMIT_WINDOW_MS", 2)
+# 한 배치(트랜잭션)의 최대 쓰기 수
+DB_GROUP_COMMIT_MAX_BATCH = _env_int("TODO_DB_GROUP_COMMIT_MAX_BATCH", 64)
+
+# ---------- 캐시 ----------
+# 보상 목록 캐시 유지 시간(초). 0 이면 무효화되거나 DB 의 보상 변경 버전(catalog_version)이 바뀔 때까지 유지
+REWARD_CACHE_TTL = _env_int("TODO_REWARD_CACHE_TTL", 0)
+# 다른 프로세스의 보상 변경(catalog_version)을 확인하는 간격(초). 이 시간 안의 재실행은 보상 쿼리를 하지 않는다
+REWARD_CACHE_CHECK_INTERVAL = _env_int("TODO_REWARD_CACHE_CHECK_INTERVAL", 2)
+
+# ---------- 계측 (metrics.py) ----------
+# 0 이면 SQL 계측을 끈다
+METRICS_ENABLED = _env_int("TODO_METRICS", 1) != 0
+# 이 시간(ms) 이상 걸린 쿼리를 todomaker.slow 로거에 남긴다. 0 이면 끔
+SLOW_QUERY_MS = _env_int("TODO_SLOW_QUERY_MS", 0)
+# 지정하면 METRICS_INTERVAL 초마다 이 파일에 내보낸다 (.json 이면 JSON, 아니면 Prometheus 텍스트)
+METRICS_FILE = os.environ.get("TODO_METRICS_FILE", "")
+METRICS_INTERVAL = _env_int("TODO_METRICS_INTERVAL", 15)
+# 지정하면 Streamlit 프로세스 안에서 http://METRICS_HOST:METRICS_PORT/metrics 로 내보낸다
+METRICS_HOST = os.environ.get("TODO_METRICS_HOST", "127.0.0.1")
+METRICS_PORT = _env_int("TODO_METRICS_PORT", 0)
+
+# ---------- 보관 (archive.py) ----------
+# 완료/구매한 지 이 일수가 지난 기록을 보관 테이블로 옮긴다
+ARCHIVE_AFTER_DAYS = _env_int("TODO_ARCHIVE_AFTER_DAYS", 90)
+# 한 트랜잭션에서 옮기는 행 수
+ARCHIVE_BATCH = _env_int("TODO_ARCHIVE_BATCH", 1000)
+# 지정하면 보관 테이블을 이 파일에 두고 ATTACH 한다. 비우면 본 DB 안의 *_archive 테이블
+ARCHIVE_DB_PATH = os.environ.get("TODO_ARCHIVE_DB_PATH", "")
+
+# ---------- 반복 미션 (recurring.py) ----------
+# 백그라운드 스케줄러가 때가 된 회차를 만드는 주기(초). 0 이면 스레드 없이 목록을 볼 때만 만든다
+RECURRING_INTERVAL = _env_int("TODO_RECURRING_INTERVAL", 60)
+# 한 트랜잭션에서 처리하는 템플릿 수
+RECURRING_BATCH = _env_int("TODO_RECURRING_BATCH", 500)
+
+# ---------- 랭킹 / 통계 (analytics.py) ----------
+# 미리 계산해 두는 리더보드 인원
+LEADERBOARD_SIZE = _env_int("TODO_LEADERBOARD_SIZE", 100)
+# 통계 화면의 일별 완료 그래프 기간(일)
+ANALYTICS_DAYS = _env_int("TODO_ANALYTICS_DAYS", 30)
+# 랭킹 / 통계 스냅샷을 세션 사이에 공유하는 시간(초). 지나면 새 원장만 반영해 다시 만든다
+ANALYTICS_TTL = _env_int("TODO_ANALYTICS_TTL", 30)
+
+# ---------- 화면 ----------
+# 진행중 / 완료 / 구매 이력 목록에서 한 번에 그리는 행 수
+PAGE_SIZE = _env_int("TODO_PAGE_SIZE", 20)
+
+# ---------- HTTP API (api.py) ----------
+API_HOST = os.environ.get("TODO_API_HOST", "127.0.0.1")
+API_PORT = _env_int("TODO_API_PORT", 8765)
+# SQLite 호출을 실행하는 스레드 수
+API_WORKERS = _env_int("TODO_API_WORKERS", 8)
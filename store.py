@@ -0,0 +1,261 @@
+# file: store.py
+# 앱의 데이터 접근을 모은 클래스. Streamlit 없이 import 해서 스크립트, API 서버, 벤치마크에서 쓸 수 있다.
+# 메서드마다 풀에서 연결을 빌리므로 (같은 스레드가 이미 빌린 연결이 있으면 그대로 재사용) 스레드 간에 공유해도 된다.
+# 쓰기는 모두 _write() 를 거쳐 사용자 동작 하나당 트랜잭션(커밋) 한 번으로 끝나고,
+# 그룹 커밋(TODO_DB_GROUP_COMMIT)을 켜면 db.GroupCommitWriter 의 배치 트랜잭션 안에서 실행된다.
+import sqlite3
+from datetime import datetime
+
+import analytics
+import archive
+import catalog
+import recurring
+import search
+import services
+import settings
+from db import get_pool, get_writer, transaction
+from migrations import ensure_schema
+from schema import get_schema
+
+
+class TodoStore:
+    def __init__(self, pool, writer=None):
+        self.pool = pool
+        self.writer = writer
+        self.schema = get_schema(pool.path)
+        self.catalog = catalog.get_catalog(pool.path)
+        self.analytics = analytics.get_cache(pool.path)
+
+    @classmethod
+    def open(cls, path=None, group_commit=None, **pool_options):
+        # 프로세스 단위 풀을 얻고 스키마를 준비한 뒤 store 를 돌려준다
+        pool = get_pool(path, **pool_options)
+        ensure_schema(pool)
+        if group_commit is None:
+            group_commit = settings.DB_GROUP_COMMIT
+        return cls(pool, get_writer(pool) if group_commit else None)
+
+    def connection(self):
+        return self.pool.connection()
+
+    def _write(self, fn, *args):
+        # fn(conn, *args) 는 db.transaction 으로 감싼 쓰기다. 그룹 커밋이면 배치 안의 SAVEPOINT 가 되고
+        # 커밋이 끝난 뒤 결과(또는 예외)를 돌려받는다.
+        if self.writer is not None:
+            return self.writer.call(fn, *args)
+        with self.pool.connection() as conn:
+            return fn(conn, *args)
+
+    def has_column(self, table, column):
+        with self.pool.connection() as conn:
+            return self.schema.has_column(conn, table, column)
+
+    # ---------- 사용자 ----------
+    def get_user_by_name(self, name):
+        with self.pool.connection() as conn:
+            return conn.execute("SELECT id,name,points FROM users WHERE name=?", (name,)).fetchone()
+
+    def get_user(self, user_id):
+        with self.pool.connection() as conn:
+            return conn.execute("SELECT id,name,points FROM users WHERE id=?", (user_id,)).fetchone()
+
+    def create_user(self, name):
+        # 이미 있는 닉네임이면 None
+        try:
+            return self._write(self._insert_user, name)
+        except sqlite3.IntegrityError:
+            return None
+
+    def _insert_user(self, conn, name):
+        with transaction(conn):
+            if self.schema.has_column(conn, "users", "created_at"):
+                conn.execute("INSERT INTO users (name, points, created_at) VALUES (?,?,?)",
+                             (name, 0, datetime.now().isoformat()))
+            else:
+                conn.execute("INSERT INTO users (name, points) VALUES (?,?)", (name, 0))
+            return conn.execute("SELECT id,name,points FROM users WHERE name=?", (name,)).fetchone()
+
+    def get_user_stats(self, user_id):
+        with self.pool.connection() as conn:
+            return services.get_user_stats(conn, user_id)
+
+    def rebuild_stats(self):
+        with self.pool.connection() as conn:
+            return services.rebuild_stats(conn)
+
+    # ---------- 할일 ----------
+    def add_todo(self, user_id, title, points_reward):
+        return self._write(self._insert_todo, user_id, title, points_reward)
+
+    def _insert_todo(self, conn, user_id, title, points_reward):
+        with transaction(conn):
+            cur = conn.execute("INSERT INTO todos (user_id,title,points_reward,created_at) VALUES (?,?,?,?)",
+                               (user_id, title, points_reward, datetime.now().isoformat()))
+        return cur.lastrowid
+
+    def list_in_progress(self, user_id, limit, cursor=None):
+        with self.pool.connection() as conn:
+            return services.list_in_progress(conn, user_id, limit, cursor)
+
+    def list_completed(self, user_id, limit, cursor=None):
+        with self.pool.connection() as conn:
+            return services.list_completed(conn, user_id, limit, cursor)
+
+    def search_todos(self, user_id, text, limit, cursor=None, **filters):
+        # filters: status, date_field, date_from, date_to, min_points, max_points (search.search_todos)
+        with self.pool.connection() as conn:
+            return search.search_todos(conn, user_id, text, limit, cursor, **filters)
+
+    def complete_todos(self, user_id, todo_ids):
+        return self._write(services.complete_todos, user_id, todo_ids)
+
+    def delete_todos(self, user_id, todo_ids):
+        return self._write(services.delete_todos, user_id, todo_ids)
+
+    def import_todos(self, user_id, rows):
+        return self._write(services.import_todos, user_id, rows)
+
+    # ---------- 반복 미션 ----------
+    def add_template(self, user_id, title, points_reward, schedule):
+        # schedule 은 cron 식 (recurring.daily / recurring.weekly 로 만들 수 있다). 잘못되면 ValueError.
+        return self._write(recurring.add_template, user_id, title, points_reward, schedule)
+
+    def list_templates(self, user_id):
+        with self.pool.connection() as conn:
+            return recurring.list_templates(conn, user_id)
+
+    def deactivate_template(self, user_id, template_id):
+        return self._write(recurring.deactivate_template, user_id, template_id)
+
+    def materialize_due(self, user_id=None):
+        # 때가 된 회차를 만들고 만든 행 수를 돌려준다. 사용자를 주면 먼저 읽기만으로 확인해서
+        # 만들 것이 없을 때(대부분의 재실행)는 쓰기 트랜잭션을 열지 않는다.
+        if user_id is not None:
+            with self.pool.connection() as conn:
+                if not recurring.has_due(conn, user_id):
+                    return 0
+        return self._write(recurring.materialize_due, user_id)
+
+    # ---------- 보상 ----------
+    def list_rewards(self):
+        # 프로세스 단위 캐시 (catalog.RewardCatalog). 변경이 없으면 쿼리하지 않는다
+        # (다른 프로세스의 변경은 REWARD_CACHE_CHECK_INTERVAL 초마다 버전 행 한 번으로 확인).
+        return self.catalog.get(self._load_rewards, self._reward_version)
+
+    def _reward_version(self):
+        with self.pool.connection() as conn:
+            if not self.schema.has_column(conn, "catalog_version", "version"):
+                return None
+            return catalog.read_version(conn)
+
+    def _load_rewards(self):
+        with self.pool.connection() as conn:
+            # stock 컬럼이 없는 DB 에서도 같은 모양의 튜플을 돌려주도록 NULL 로 채운다
+            stock_col = "stock" if self.schema.has_column(conn, "rewards", "stock") else "NULL"
+            return conn.execute(f"SELECT id,name,cost,description,{stock_col} FROM rewards ORDER BY id").fetchall()
+
+    def rebuild_search_index(self):
+        with self.pool.connection() as conn:
+            with transaction(conn):
+                search.rebuild(conn)
+
+    def search_rewards(self, text, limit=50):
+        with self.pool.connection() as conn:
+            return search.search_rewards(conn, text, limit)
+
+    def catalog_stats(self):
+        return self.catalog.stats()
+
+    def add_reward(self, name, cost, description, stock):
+        rid = self._write(self._insert_reward, name, cost, description, stock)
+        self.catalog.invalidate()
+        return rid
+
+    def _insert_reward(self, conn, name, cost, description, stock):
+        with transaction(conn):
+            cur = conn.execute("INSERT INTO rewards (name,cost,description,stock) VALUES (?,?,?,?)",
+                               (name, cost, description, stock))
+        return cur.lastrowid
+
+    def update_reward(self, rid, name, cost, description, stock):
+        updated = self._write(self._update_reward, rid, name, cost, description, stock)
+        self.catalog.invalidate()
+        return updated
+
+    def _update_reward(self, conn, rid, name, cost, description, stock):
+        with transaction(conn):
+            # stock 컬럼이 없는 DB 에서는 stock 변경을 무시
+            if self.schema.has_column(conn, "rewards", "stock"):
+                cur = conn.execute("UPDATE rewards SET name=?, cost=?, description=?, stock=? WHERE id=?",
+                                   (name, cost, description, stock, rid))
+            else:
+                cur = conn.execute("UPDATE rewards SET name=?, cost=?, description=? WHERE id=?",
+                                   (name, cost, description, rid))
+        return cur.rowcount > 0
+
+    def delete_reward(self, rid):
+        deleted = self._write(self._delete_reward, rid)
+        self.catalog.invalidate()
+        return deleted
+
+    def _delete_reward(self, conn, rid):
+        with transaction(conn):
+            cur = conn.execute("DELETE FROM rewards WHERE id=?", (rid,))
+        return cur.rowcount > 0
+
+    def purchase_reward(self, user_id, reward_id):
+        result = self._write(services.purchase_reward, user_id, reward_id)
+        # 한정 수량 보상의 재고가 줄었으면 목록의 재고 표시도 바뀌어야 한다
+        if result.ok and result.stock is not None and result.stock >= 0:
+            self.catalog.invalidate()
+        return result
+
+    def list_purchases(self, user_id, limit, cursor=None):
+        with self.pool.connection() as conn:
+            return services.list_purchases(conn, user_id, limit, cursor)
+
+    # ---------- 랭킹 / 통계 ----------
+    def analytics_snapshot(self):
+        # 프로세스 단위 캐시 (analytics.AnalyticsCache). TTL 이 지났을 때만 새 원장을 반영하고 다시 읽는다.
+        return self.analytics.get(self._load_analytics)
+
+    def _load_analytics(self):
+        self._refresh_analytics()
+        with self.pool.connection() as conn:
+            return analytics.load(conn)
+
+    def _refresh_analytics(self):
+        # 먼저 읽기만으로 확인해서 새 원장이 없을 때(대부분의 TTL 만료)는 쓰기 트랜잭션을 열지 않는다
+        with self.pool.connection() as conn:
+            if not analytics.has_pending(conn):
+                return 0
+        return self._write(analytics.refresh)
+
+    def user_rank(self, user_id):
+        with self.pool.connection() as conn:
+            return analytics.user_rank(conn, user_id)
+
+    def refresh_analytics(self, full=False):
+        # full 이면 원장 전체로 다시 만든다. 반영한 원장 행 수를 돌려준다.
+        # 전체 재계산은 보관 파일을 ATTACH 해야 하므로 그룹 커밋 배치가 아닌 자기 연결에서 한다.
+        if full:
+            with self.pool.connection() as conn:
+                applied = analytics.rebuild(conn)
+        else:
+            applied = self._refresh_analytics()
+        self.analytics.invalidate()
+        return applied
+
+    # ---------- 보관 / 내보내기 ----------
+    def archive_old(self, older_than_days=None, batch=None):
+        with self.pool.connection() as conn:
+            return archive.archive_old(conn, older_than_days, batch)
+
+    def archive_counts(self):
+        with self.pool.connection() as conn:
+            return archive.archive_counts(conn)
+
+    def export_history(self, user_id, kind="todos", fmt="csv"):
+        # 제너레이터가 끝날 때까지 연결을 빌려 두므로 같은 스레드에서 끝까지 읽어야 한다
+        with self.pool.connection() as conn:
+            yield from archive.export_history(conn, user_id, kind, fmt)